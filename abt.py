@@ -1,87 +1,65 @@
 import streamlit as st
-import sqlite3
+
+import authz
+import bootstrap
+import bulk
+import cache
+import db
+import diagnostics
+import live
+import migrations
+import writer
 
 # ---------------- DATABASE ----------------
+bootstrap.init()
+
+
 def get_connection():
-    return sqlite3.connect("ngo_about_v2.db", check_same_thread=False)
+    return db.get_connection("about")
 
 conn = get_connection()
 cur = conn.cursor()
 
-cur.execute("CREATE TABLE IF NOT EXISTS story (text TEXT)")
-cur.execute("CREATE TABLE IF NOT EXISTS core_values (value TEXT)")
-cur.execute("CREATE TABLE IF NOT EXISTS programs (program TEXT)")
-cur.execute("CREATE TABLE IF NOT EXISTS team (name TEXT, role TEXT)")
-cur.execute("CREATE TABLE IF NOT EXISTS impact (detail TEXT)")
-conn.commit()
-
-# ---------------- SEED DATA ----------------
-def insert_default_data():
-    if cur.execute("SELECT COUNT(*) FROM story").fetchone()[0] == 0:
-        cur.execute(
-            "INSERT INTO story VALUES ('We are a non-profit organization working for social development.')"
-        )
-
-    if cur.execute("SELECT COUNT(*) FROM core_values").fetchone()[0] == 0:
-        cur.executemany(
-            "INSERT INTO core_values VALUES (?)",
-            [("Transparency",), ("Empathy",), ("Community Service",)]
-        )
-
-    if cur.execute("SELECT COUNT(*) FROM programs").fetchone()[0] == 0:
-        cur.executemany(
-            "INSERT INTO programs VALUES (?)",
-            [("Child Education",), ("Free Medical Checkups",), ("Skill Development",)]
-        )
-
-    if cur.execute("SELECT COUNT(*) FROM team").fetchone()[0] == 0:
-        cur.executemany(
-            "INSERT INTO team VALUES (?,?)",
-            [("Amit Kulkarni", "Director"), ("Pooja Deshmukh", "Manager")]
-        )
-
-    if cur.execute("SELECT COUNT(*) FROM impact").fetchone()[0] == 0:
-        cur.executemany(
-            "INSERT INTO impact VALUES (?)",
-            [("5,000+ lives impacted",), ("50+ active volunteers",)]
-        )
-
-    conn.commit()
-
-insert_default_data()
-
-# ---------------- SESSION ----------------
-if "logged_in" not in st.session_state:
-    st.session_state.logged_in = False
+migrations.ensure("about")
 
 # ---------------- SIDEBAR ----------------
 st.sidebar.title("NGO Management")
 menu = st.sidebar.radio("Navigate", ["About Us", "Admin Login"])
 
 # ---------------- ABOUT US ----------------
-def about_us_page():
-    st.title("🌍 About Our NGO")
-    st.write("Building a better future together")
+# Redrawn on its own when an admin edits any of these tables, without
+# rerunning the page
+@live.fragment("story", "core_values", "programs", "team", "impact")
+def about_sections():
+    cur = get_connection().cursor()
 
     st.subheader("📘 Our Story")
-    st.info(cur.execute("SELECT text FROM story").fetchone()[0])
+    story = cache.fetchone(cur, "story", "SELECT text FROM story WHERE tenant=?", (db.TENANT,))
+    st.info(story[0] if story else "Our story is coming soon.")
 
     st.subheader("⭐ Core Values")
-    for val in cur.execute("SELECT value FROM core_values"):
+    for val in cache.fetchall(cur, "core_values", "SELECT value FROM core_values WHERE tenant=?", (db.TENANT,)):
         st.write("•", val[0])
 
     st.subheader("🛠 Our Programs")
-    for p in cur.execute("SELECT program FROM programs"):
+    for p in cache.fetchall(cur, "programs", "SELECT program FROM programs WHERE tenant=?", (db.TENANT,)):
         st.write("•", p[0])
 
     st.subheader("👥 Our Team")
-    for t in cur.execute("SELECT name, role FROM team"):
+    for t in cache.fetchall(cur, "team", "SELECT name, role FROM team WHERE tenant=?", (db.TENANT,)):
         st.write(f"{t[0]}** – {t[1]}")
 
     st.subheader("📊 Impact")
-    for i in cur.execute("SELECT detail FROM impact"):
+    for i in cache.fetchall(cur, "impact", "SELECT detail FROM impact WHERE tenant=?", (db.TENANT,)):
         st.write("•", i[0])
 
+
+def about_us_page():
+    st.title("🌍 About Our NGO")
+    st.write("Building a better future together")
+
+    about_sections()
+
     col1, col2 = st.columns(2)
     col1.button("Donate Now")
     col2.button("Become a Volunteer")
@@ -91,55 +69,71 @@ def admin_panel():
     st.title("🔐 Admin Dashboard")
 
     st.markdown("### Update Story")
-    story_text = st.text_area(
-        "Story",
-        cur.execute("SELECT text FROM story").fetchone()[0]
-    )
+    story = cur.execute("SELECT text FROM story WHERE tenant=?", (db.TENANT,)).fetchone()
+    story_text = st.text_area("Story", story[0] if story else "")
 
     if st.button("Update Story"):
-        cur.execute("DELETE FROM story")
-        cur.execute("INSERT INTO story VALUES (?)", (story_text,))
-        conn.commit()
-        st.success("Story updated successfully")
+        def replace_story(conn):
+            conn.execute("DELETE FROM story WHERE tenant=?", (db.TENANT,))
+            conn.execute("INSERT INTO story (tenant, text) VALUES (?,?)", (db.TENANT, story_text))
+
+        saved, _ = writer.wait(writer.submit("about", replace_story, invalidate=("story",)))
+        if saved:
+            st.success("Story updated successfully")
+        else:
+            st.warning(writer.PENDING)
 
     st.markdown("### Add Core Value")
     value = st.text_input("Core Value")
     if st.button("Save Value"):
-        cur.execute("INSERT INTO core_values VALUES (?)", (value,))
-        conn.commit()
-        st.success("Value added")
+        saved, _ = writer.wait(writer.execute(
+            "about", "INSERT INTO core_values (tenant, value) VALUES (?,?)", (db.TENANT, value),
+            invalidate=("core_values",)
+        ))
+        if saved:
+            st.success("Value added")
+        else:
+            st.warning(writer.PENDING)
 
     st.markdown("### Add Program")
     program = st.text_input("Program")
     if st.button("Save Program"):
-        cur.execute("INSERT INTO programs VALUES (?)", (program,))
-        conn.commit()
-        st.success("Program added")
+        saved, _ = writer.wait(writer.execute(
+            "about", "INSERT INTO programs (tenant, program) VALUES (?,?)", (db.TENANT, program),
+            invalidate=("programs",)
+        ))
+        if saved:
+            st.success("Program added")
+        else:
+            st.warning(writer.PENDING)
 
     st.markdown("### Add Team Member")
     name = st.text_input("Name")
     role = st.text_input("Role")
     if st.button("Save Team Member"):
-        cur.execute("INSERT INTO team VALUES (?,?)", (name, role))
-        conn.commit()
-        st.success("Team member added")
+        saved, _ = writer.wait(writer.execute(
+            "about", "INSERT INTO team (tenant, name, role) VALUES (?,?,?)", (db.TENANT, name, role),
+            invalidate=("team",)
+        ))
+        if saved:
+            st.success("Team member added")
+        else:
+            st.warning(writer.PENDING)
+
+    if authz.can("bulk.import"):
+        st.markdown("### Bulk Import / Export")
+        with st.expander("Import or export many entries at once"):
+            bulk.render(["story", "core_values", "programs", "team", "impact"])
+
+    if authz.can("diagnostics.view"):
+        st.markdown("### Diagnostics")
+        with st.expander("Query statistics"):
+            diagnostics.render()
 
 # ---------------- PAGE LOGIC ----------------
 if menu == "About Us":
     about_us_page()
 
 elif menu == "Admin Login":
-    if not st.session_state.logged_in:
-        st.subheader("Admin Login")
-        u = st.text_input("Username")
-        p = st.text_input("Password", type="password")
-
-        if st.button("Login"):
-            if u == "admin" and p == "admin123":
-                st.session_state.logged_in = True
-                st.success("Login successful")
-            else:
-                st.error("Wrong credentials")
-
-    if st.session_state.logged_in:
+    if authz.require("about.edit"):
         admin_panel()
\ No newline at end of file
@@ -0,0 +1,25 @@
+import streamlit as st
+
+import bootstrap
+
+# ---------------- PAGE CONFIG ----------------
+st.set_page_config(
+    page_title="Helping Hands NGO",
+    page_icon="🌱",
+    layout="wide"
+)
+
+# ---------------- BOOTSTRAP ----------------
+# One entry point for the whole site: setup runs once per process, and a
+# page script (with the modules it imports) only runs when it is opened.
+bootstrap.init()
+
+# ---------------- NAVIGATION ----------------
+page = st.navigation([
+    st.Page("ngo.py", title="Home", icon="🌱", default=True),
+    st.Page("our.py", title="Our Projects", icon="📁", url_path="projects"),
+    st.Page("abt.py", title="About Us", icon="🌍", url_path="about"),
+    st.Page("media.py", title="Media", icon="📰", url_path="media"),
+    st.Page("appauth.py", title="Account", icon="🔐", url_path="account"),
+])
+page.run()
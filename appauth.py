@@ -1,5 +1,9 @@
 import streamlit as st
 
+import authz
+import bootstrap
+import user_store
+
 # Page configuration
 st.set_page_config(
     page_title="User Authentication System",
@@ -7,16 +11,23 @@ st.set_page_config(
     layout="centered"
 )
 
-# In-memory user database (dictionary)
-if "users" not in st.session_state:
-    st.session_state.users = {}
+bootstrap.init()
 
+# Accounts live in the shared SQLite user store (see user_store.py); the
+# login itself is authz.login, shared with every admin page
 if "logged_in" not in st.session_state:
     st.session_state.logged_in = False
 
 if "current_user" not in st.session_state:
     st.session_state.current_user = ""
 
+# Pick up a server-side session after a refresh or on another replica
+if not st.session_state.logged_in:
+    restored_user = authz.current_user()
+    if restored_user:
+        st.session_state.logged_in = True
+        st.session_state.current_user = restored_user
+
 # App Title
 st.markdown("<h1 style='text-align:center;'>🔐 User Authentication App</h1>", unsafe_allow_html=True)
 
@@ -34,12 +45,19 @@ if choice == "Signup":
     if st.button("Sign Up"):
         if new_user == "" or new_pass == "":
             st.warning("⚠ Please fill all fields")
-        elif new_user in st.session_state.users:
+        elif user_store.user_exists(new_user):
             st.error("❌ Username already exists")
         else:
-            st.session_state.users[new_user] = new_pass
-            st.success("✅ Account created successfully")
-            st.info("👉 Go to Login page")
+            try:
+                created = user_store.create_user(new_user, new_pass)
+            except user_store.HashingBusy as e:
+                st.error(f"⏳ {e}")
+            else:
+                if created:
+                    st.success("✅ Account created successfully")
+                    st.info("👉 Go to Login page")
+                else:
+                    st.error("❌ Username already exists")
 
 # ---------------- LOGIN ----------------
 elif choice == "Login":
@@ -49,18 +67,21 @@ elif choice == "Login":
     pwd = st.text_input("Password", type="password")
 
     if st.button("Login"):
-        if user in st.session_state.users and st.session_state.users[user] == pwd:
+        error = authz.login(user, pwd)
+        if error:
+            st.error(f"❌ {error}")
+        else:
             st.session_state.logged_in = True
             st.session_state.current_user = user
             st.success("✅ Login successful")
-        else:
-            st.error("❌ Invalid username or password")
 
 # ---------------- DASHBOARD ----------------
 elif choice == "Dashboard":
     if st.session_state.logged_in:
         st.subheader("🏠 Dashboard")
         st.success(f"Welcome, {st.session_state.current_user} 🎉")
+        roles = authz.roles_of(st.session_state.current_user)
+        st.caption("Admin roles: " + (", ".join(roles) if roles else "none"))
 
         st.markdown("""
         ### What you can do:
@@ -70,9 +91,14 @@ elif choice == "Dashboard":
         """)
 
         if st.button("Logout"):
+            authz.logout()
             st.session_state.logged_in = False
             st.session_state.current_user = ""
             st.success("🚪 Logged out successfully")
+
+        if authz.can("users.manage"):
+            st.subheader("👥 Admin Roles")
+            authz.render_roles()
     else:
         st.warning("⚠ Please login to access dashboard")
 
@@ -84,7 +110,7 @@ elif choice == "About":
 
     - Built using Python & Streamlit
     - Includes Signup, Login, Logout
-    - Uses session-based authentication
+    - Passwords are salted and hashed (scrypt) in SQLite
     - Developed for internship assignment
     """)
 
@@ -0,0 +1,236 @@
+import argparse
+import secrets
+import sys
+import threading
+import time
+
+import streamlit as st
+
+import db
+import migrations
+import rate_limit
+import sessions
+import user_store
+import writer
+
+# ---------------- PERMISSIONS ----------------
+# One bit per page action, so a session's rights are a single int
+PERMISSIONS = {
+    name: 1 << bit for bit, name in enumerate((
+        "home.edit",         # ngo.py admin: vision, mission, statistics, initiatives
+        "projects.edit",     # our.py admin: projects and their images
+        "about.edit",        # abt.py admin
+        "media.edit",        # media.py admin
+        "bulk.import",       # bulk import/export on the pages one can edit
+        "jobs.run",          # site-wide background jobs (reindex, static export)
+        "diagnostics.view",  # query and write-queue statistics
+        "users.manage",      # assign roles
+    ))
+}
+ALL = sum(PERMISSIONS.values())
+
+
+def _bits(*names):
+    return sum(PERMISSIONS[name] for name in names)
+
+
+ROLES = {
+    "content_editor": _bits("home.edit", "projects.edit", "about.edit", "bulk.import"),
+    "media_manager": _bits("media.edit", "bulk.import"),
+    "super_admin": ALL,
+}
+
+# ---------------- SETTINGS ----------------
+SCOPE = "appauth"     # one login for every page: the appauth.py accounts
+REFRESH_AFTER = 300   # seconds before a session's permissions are read again
+SESSION_KEY = "authz"
+
+_lock = threading.Lock()
+_generation = 0       # bumped when roles change in this process
+
+
+# ---------------- ROLES ----------------
+def _conn():
+    migrations.ensure("users")
+    return db.get_connection("users")
+
+
+def roles_of(username):
+    row = _conn().execute("SELECT roles FROM users WHERE username=?", (username,)).fetchone()
+    return [r for r in (row[0].split(",") if row and row[0] else []) if r in ROLES]
+
+
+def resolve(username):
+    # Roles -> permission bits
+    bits = 0
+    for role in roles_of(username):
+        bits |= ROLES[role]
+    return bits
+
+
+def set_roles(username, roles):
+    # -> whether the change committed in time (see writer.wait); cached
+    # permissions are refreshed whenever it does
+    unknown = set(roles) - set(ROLES)
+    if unknown:
+        raise ValueError(f"Unknown roles: {', '.join(sorted(unknown))}")
+    future = writer.execute(
+        "users",
+        "UPDATE users SET roles=? WHERE username=?",
+        (",".join(sorted(roles)), username),
+    )
+    future.add_done_callback(_roles_changed)
+    saved, _ = writer.wait(future)
+    return saved
+
+
+def _roles_changed(future):
+    global _generation
+    with _lock:
+        _generation += 1
+
+
+def users_with_roles():
+    # -> [(username, [roles])] for accounts holding any role
+    rows = _conn().execute("SELECT username, roles FROM users WHERE roles <> '' ORDER BY username").fetchall()
+    return [(username, roles.split(",")) for username, roles in rows]
+
+
+# ---------------- SESSION ----------------
+def current_user():
+    return sessions.restore(SCOPE)
+
+
+def permissions():
+    # This session's permission bits, resolved once and kept in session
+    # state; role changes made in this process apply on the next rerun
+    username = current_user()
+    if username is None:
+        st.session_state.pop(SESSION_KEY, None)
+        return 0
+
+    cached = st.session_state.get(SESSION_KEY)
+    if cached and cached[0] == username and cached[1] == _generation and cached[2] > time.monotonic():
+        return cached[3]
+
+    bits = resolve(username)
+    st.session_state[SESSION_KEY] = (username, _generation, time.monotonic() + REFRESH_AFTER, bits)
+    return bits
+
+
+def can(permission):
+    return bool(permissions() & PERMISSIONS[permission])
+
+
+def login(username, password):
+    # Shared credential check for every login form -> error message or None
+    allowed, retry_after = rate_limit.check_login(SCOPE, username)
+    if not allowed:
+        return f"Too many login attempts. Try again in {retry_after} seconds"
+
+    if "auth_session_key" not in st.session_state:
+        st.session_state.auth_session_key = secrets.token_hex(16)
+    try:
+        ok = user_store.verify(username, password, st.session_state.auth_session_key)
+    except user_store.HashingBusy as e:
+        return str(e)
+    if not ok:
+        return "Invalid username or password"
+
+    rate_limit.login_succeeded(SCOPE, username)
+    sessions.login(SCOPE, username)
+    st.session_state.pop(SESSION_KEY, None)
+    return None
+
+
+def logout():
+    session_key = st.session_state.pop("auth_session_key", None)
+    if session_key:
+        user_store.forget_session(session_key)
+    sessions.logout(SCOPE)
+    st.session_state.pop(SESSION_KEY, None)
+
+
+def require(permission):
+    # Gate for an admin page or section: True if allowed, otherwise shows
+    # a login form (signed out) or a notice (signed in without the right)
+    if can(permission):
+        return True
+
+    if current_user() is None:
+        box = st.empty()
+        with box.container():
+            st.subheader("🔐 Admin Login")
+            with st.form(f"login_{permission}"):
+                username = st.text_input("Username")
+                password = st.text_input("Password", type="password")
+                submitted = st.form_submit_button("Login")
+        if submitted:
+            error = login(username, password)
+            if error:
+                st.error(error)
+            elif can(permission):
+                # Carry on in this run rather than st.rerun(): the browser
+                # has to receive it to store the session cookie
+                box.empty()
+                return True
+            else:
+                st.warning(f"{username} is signed in but may not use this page.")
+    else:
+        st.warning(f"Your account cannot use this section ({permission}). Ask a super admin for a role.")
+    return False
+
+
+# ---------------- ADMIN UI ----------------
+def render_roles():
+    # Role assignment for super admins
+    username = st.text_input("Username", key="authz_user")
+    if username and not user_store.user_exists(username):
+        st.caption("No such account")
+        return
+    if username:
+        roles = st.multiselect("Roles", list(ROLES), default=roles_of(username), key=f"authz_roles_{username}")
+        if st.button("Save roles", key="authz_save"):
+            if set_roles(username, roles):
+                st.success(f"Roles of {username} saved")
+            else:
+                st.warning(writer.PENDING)
+
+    holders = users_with_roles()
+    if holders:
+        st.dataframe([{"user": u, "roles": ", ".join(r)} for u, r in holders])
+
+
+# ---------------- CLI ----------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Assign admin roles to user accounts")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    grant = commands.add_parser("grant", help="add roles to an account")
+    grant.add_argument("username")
+    grant.add_argument("roles", nargs="+", choices=list(ROLES))
+
+    revoke = commands.add_parser("revoke", help="remove roles from an account")
+    revoke.add_argument("username")
+    revoke.add_argument("roles", nargs="+", choices=list(ROLES))
+
+    commands.add_parser("list", help="show accounts holding roles")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for username, roles in users_with_roles():
+            print(f"{username}: {', '.join(roles)}")
+        return 0
+
+    if not user_store.user_exists(args.username):
+        parser.error(f"no account named {args.username}; sign up in appauth.py first")
+    roles = set(roles_of(args.username))
+    roles = roles | set(args.roles) if args.command == "grant" else roles - set(args.roles)
+    if not set_roles(args.username, roles):
+        print(writer.PENDING)
+    print(f"{args.username}: {', '.join(sorted(roles)) or 'no roles'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
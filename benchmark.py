@@ -0,0 +1,313 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+APPS = ["app.py", "our.py", "abt.py", "media.py", "ngo.py", "appauth.py"]
+BATCH = 10_000
+
+# Startup budget per app, as medians over fresh processes (see cold_start).
+# tests/test_startup_budget.py holds every app to it. The slowest app
+# measures about 1.1 s and 0.4 s on an empty database, so a 2x slowdown
+# fails; slower machines (CI runners) raise the limits through the
+# environment rather than loosening them for everyone.
+COLD_START_BUDGET_MS = float(os.environ.get("NGO_COLD_START_BUDGET_MS", 2000))
+FIRST_PAINT_BUDGET_MS = float(os.environ.get("NGO_FIRST_PAINT_BUDGET_MS", 800))
+
+# 1x1 PNG so seeded image rows point at a real file
+PIXEL_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010802000000907753de"
+    "0000000c4944415478da63f8ffff3f0005fe02fe331295140000000049454e44ae426082"
+)
+
+
+# ---------------- HELPERS ----------------
+def parse_scale(text):
+    # "1k" -> 1000, "100k" -> 100000, "1M" -> 1000000
+    units = {"k": 1_000, "m": 1_000_000}
+    text = text.strip().lower()
+    if text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def peak_rss_mb():
+    # Peak of this whole process, so only meaningful in a fresh one per
+    # app (first_paint); the benchmark process also holds the seeding
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def total_queries():
+    import db
+    return sum(row["calls"] for row in db.query_stats())
+
+
+def count_elements(at):
+    return len(list(at.main)) + len(list(at.sidebar))
+
+
+# ---------------- SEEDING ----------------
+def _batched(rows, conn, sql):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH:
+            conn.executemany(sql, batch)
+            batch.clear()
+    if batch:
+        conn.executemany(sql, batch)
+    conn.commit()
+
+
+def seed(projects, images, releases, rng):
+    import db
+    import migrations
+
+    for name in ("projects", "about", "media"):
+        migrations.ensure(name)
+
+    os.makedirs("uploads", exist_ok=True)
+    pixel = os.path.join("uploads", "pixel.png")
+    with open(pixel, "wb") as f:
+        f.write(PIXEL_PNG)
+
+    statuses = ["Ongoing", "Completed", "Upcoming"]
+    cities = ["Pune", "Mumbai", "Nagpur", "Nashik", "Kolhapur", "Satara"]
+    words = ["water", "school", "health", "women", "rural", "skills", "food", "camp"]
+    start = date(2020, 1, 1)
+
+    def project_rows():
+        for i in range(projects):
+            begin = start + timedelta(days=rng.randrange(2000))
+            yield (
+                db.TENANT,
+                f"Project {i} {rng.choice(words)}",
+                " ".join(rng.choice(words) for _ in range(30)),
+                rng.choice(statuses),
+                str(begin),
+                str(begin + timedelta(days=rng.randrange(30, 400))),
+                rng.choice(cities),
+            )
+
+    conn = db.get_connection("projects")
+    _batched(project_rows(), conn,
+             "INSERT INTO projects (tenant, title, description, status, start_date, end_date, location) "
+             "VALUES (?,?,?,?,?,?,?)")
+    _batched(((db.TENANT, rng.randrange(1, projects + 1), pixel) for _ in range(images)), conn,
+             "INSERT INTO project_images (tenant, project_id, image_path) VALUES (?,?,?)")
+
+    conn = db.get_connection("media")
+    _batched(((db.TENANT, f"Release {i}", " ".join(rng.choice(words) for _ in range(40)),
+               str(start + timedelta(days=rng.randrange(2000)))) for i in range(releases)), conn,
+             "INSERT INTO press_releases (tenant, title, description, release_date) VALUES (?,?,?,?)")
+    _batched(((db.TENANT, pixel) for _ in range(images)), conn,
+             "INSERT INTO image_gallery (tenant, image_path) VALUES (?,?)")
+
+
+# ---------------- RUNNER ----------------
+def run_session(app, reruns, timeout):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, app), default_timeout=timeout)
+    timings = []
+    for _ in range(reruns + 1):
+        start = time.perf_counter()
+        at.run()
+        timings.append(time.perf_counter() - start)
+
+    errors = [str(e.value) for e in at.exception]
+    return timings, count_elements(at), errors
+
+
+def bench_app(app, sessions, reruns, concurrency, timeout):
+    queries_before = total_queries()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: run_session(app, reruns, timeout), range(sessions)))
+
+    first = [r[0][0] * 1000 for r in results]
+    warm = [t * 1000 for r in results for t in r[0][1:]]
+    runs = sum(len(r[0]) for r in results)
+
+    return {
+        "sessions": sessions,
+        "reruns_per_session": reruns,
+        "first_run_ms": {"p50": percentile(first, 50), "p95": percentile(first, 95)},
+        "rerun_ms": {
+            "p50": percentile(warm, 50),
+            "p95": percentile(warm, 95),
+            "p99": percentile(warm, 99),
+            "mean": statistics.fmean(warm) if warm else 0.0,
+        },
+        "queries_per_rerun": (total_queries() - queries_before) / runs,
+        "elements": max(r[1] for r in results),
+        "errors": sorted({e for r in results for e in r[2]}),
+    }
+
+
+def first_paint(app, timeout):
+    # Runs in a fresh interpreter (see cold_start): time to load the
+    # Streamlit test harness, then to finish the first script run
+    start = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    loaded = time.perf_counter()
+
+    at = AppTest.from_file(os.path.join(ROOT, app), default_timeout=timeout).run()
+    done = time.perf_counter()
+    print(json.dumps({
+        "import_ms": (loaded - start) * 1000,
+        "first_paint_ms": (done - loaded) * 1000,
+        "peak_rss_mb": peak_rss_mb(),
+        "errors": [str(e.value) for e in at.exception],
+    }))
+
+
+def cold_start(app, runs, timeout):
+    # Median over `runs` new processes, as after a container restart.
+    # cold_start_ms is interpreter start to the end of the first page run;
+    # peak_rss_mb is the memory that took, for this app alone.
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        out = subprocess.run(
+            [sys.executable, "-c",
+             f"import sys; sys.path.insert(0, {ROOT!r}); import benchmark; "
+             f"benchmark.first_paint({app!r}, {timeout!r})"],
+            capture_output=True, text=True, timeout=timeout, check=True,
+        )
+        sample = json.loads(out.stdout.strip().splitlines()[-1])
+        sample["cold_start_ms"] = (time.perf_counter() - start) * 1000
+        samples.append(sample)
+
+    return {
+        "cold_start_ms": statistics.median(s["cold_start_ms"] for s in samples),
+        "first_paint_ms": statistics.median(s["first_paint_ms"] for s in samples),
+        "peak_rss_mb": None if resource is None else statistics.median(s["peak_rss_mb"] for s in samples),
+        "errors": sorted({e for s in samples for e in s["errors"]}),
+    }
+
+
+def over_budget(results, cold_budget, paint_budget):
+    # -> apps whose cold start or first paint exceeded the budget (ms)
+    failed = []
+    for app, stats in results["apps"].items():
+        cold = stats["cold"]
+        if (cold_budget and cold["cold_start_ms"] > cold_budget) or \
+                (paint_budget and cold["first_paint_ms"] > paint_budget):
+            print(f"{app:12} over budget: cold start {cold['cold_start_ms']:.0f} ms, "
+                  f"first paint {cold['first_paint_ms']:.0f} ms")
+            failed.append(app)
+    return failed
+
+
+def compare(results, baseline, max_regression):
+    # Print p95 rerun deltas against a previous run; returns the apps that
+    # regressed by more than max_regression (a fraction).
+    regressed = []
+    for app, current in results["apps"].items():
+        before = baseline.get("apps", {}).get(app)
+        if not before:
+            continue
+        old, new = before["rerun_ms"]["p95"], current["rerun_ms"]["p95"]
+        change = (new - old) / old if old else 0.0
+        print(f"{app:12} p95 rerun {old:8.2f} ms -> {new:8.2f} ms ({change:+.0%})")
+        if change > max_regression:
+            regressed.append(app)
+    return regressed
+
+
+# ---------------- CLI ----------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless load test for the Streamlit apps")
+    parser.add_argument("--apps", nargs="+", default=APPS, choices=APPS)
+    parser.add_argument("--projects", default="1k", help="rows to seed, e.g. 1k, 100k, 1M")
+    parser.add_argument("--images", default="1k")
+    parser.add_argument("--releases", default="1k")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--reruns", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workdir", help="where the databases go (default: a temp dir)")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="previous results JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    parser.add_argument("--cold-runs", type=int, default=3, help="fresh processes per app for cold start")
+    parser.add_argument("--cold-start-budget", type=float, default=COLD_START_BUDGET_MS, metavar="MS",
+                        help="fail if an app's median cold start exceeds this (0: no limit)")
+    parser.add_argument("--first-paint-budget", type=float, default=FIRST_PAINT_BUDGET_MS, metavar="MS",
+                        help="fail if an app's median first run in a fresh process exceeds this (0: no limit)")
+    args = parser.parse_args(argv)
+
+    output = os.path.abspath(args.output)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="ngo-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    sys.path.insert(0, ROOT)
+
+    scale = {
+        "projects": parse_scale(args.projects),
+        "images": parse_scale(args.images),
+        "releases": parse_scale(args.releases),
+    }
+    start = time.perf_counter()
+    seed(scale["projects"], scale["images"], scale["releases"], random.Random(args.seed))
+    print(f"Seeded {scale} in {time.perf_counter() - start:.1f}s ({workdir})")
+
+    results = {"scale": scale, "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "apps": {}}
+    for app in args.apps:
+        cold = cold_start(app, args.cold_runs, args.timeout)
+        results["apps"][app] = stats = bench_app(
+            app, args.sessions, args.reruns, args.concurrency, args.timeout
+        )
+        stats["cold"] = cold
+        print(f"{app:12} rerun p50 {stats['rerun_ms']['p50']:8.2f} ms  "
+              f"p99 {stats['rerun_ms']['p99']:8.2f} ms  "
+              f"queries/rerun {stats['queries_per_rerun']:6.2f}  "
+              f"elements {stats['elements']}  "
+              f"cold start {cold['cold_start_ms']:7.0f} ms  "
+              f"first paint {cold['first_paint_ms']:6.0f} ms  "
+              f"peak rss {cold['peak_rss_mb'] or 0:6.1f} MB")
+
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {output}")
+
+    if not args.workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    failed = over_budget(results, args.cold_start_budget, args.first_paint_budget)
+    if baseline and compare(results, baseline, args.max_regression):
+        failed.append("regression")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+import json
+import threading
+
+import streamlit as st
+
+import content_store
+import migrations
+import sessions
+
+# ---------------- SETTINGS ----------------
+# static/ as served by server.enableStaticServing (.streamlit/config.toml),
+# relative to the page so a baseUrlPath is kept
+STATIC_URL = "app/static"
+
+# Every schema a page reads, brought up to date before the first page runs
+SCHEMAS = ("projects", "about", "media", "changes", "users", "sessions", "storage", "jobs")
+
+_lock = threading.Lock()
+_done = False
+
+
+# ---------------- BOOTSTRAP ----------------
+def init():
+    # Process-wide setup shared by every page. The first session pays for
+    # it once; later sessions and page switches go straight to rendering.
+    global _done
+    if _done:
+        return
+    with _lock:
+        if not _done:
+            for name in SCHEMAS:
+                migrations.ensure(name)
+            sessions.get_store()
+            content_store.snapshot()
+            _done = True
+
+
+# ---------------- STATIC FILES ----------------
+def stylesheet(name):
+    # Link static/<name> into the page once per browser session. The
+    # browser fetches and caches the file; later reruns send nothing, and
+    # the <link> stays in the document head when this element is gone.
+    key = f"stylesheet_{name}"
+    if st.session_state.get(key):
+        return
+    st.session_state[key] = True
+    link_id = json.dumps(f"static-{name}")
+    href = json.dumps(f"{STATIC_URL}/{name}")
+    st.html(
+        f"""<script>
+        if (!document.getElementById({link_id})) {{
+            const link = document.createElement("link");
+            link.id = {link_id};
+            link.rel = "stylesheet";
+            link.href = {href};
+            document.head.appendChild(link);
+        }}
+        </script>""",
+        unsafe_allow_javascript=True
+    )
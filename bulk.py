@@ -0,0 +1,422 @@
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import streamlit as st
+
+import cache
+import db
+import images
+import jobs
+import migrations
+import storage
+import writer
+
+# ---------------- SETTINGS ----------------
+BATCH_SIZE = 5000
+IMAGE_WORKERS = os.cpu_count() or 2
+EXPORT_FETCH = 1000
+MAX_ERRORS = 100
+FORMATS = ("csv", "jsonl")
+
+# table -> (database, importable columns, required columns)
+TABLES = {
+    "projects": ("projects", ("title", "description", "status", "start_date", "end_date", "location", "images"),
+                 ("title",)),
+    "project_images": ("projects", ("project_id", "image"), ("project_id", "image")),
+    "press_releases": ("media", ("title", "description", "release_date"), ("title", "description", "release_date")),
+    "media_coverage": ("media", ("title", "url"), ("title", "url")),
+    "image_gallery": ("media", ("image",), ("image",)),
+    "videos": ("media", ("video_url",), ("video_url",)),
+    "story": ("about", ("text",), ("text",)),
+    "core_values": ("about", ("value",), ("value",)),
+    "programs": ("about", ("program",), ("program",)),
+    "team": ("about", ("name", "role"), ("name",)),
+    "impact": ("about", ("detail",), ("detail",)),
+}
+
+# Columns naming files inside the images zip. "images" on a project is a
+# list (JSONL) or "|"-separated names (CSV) and becomes project_images rows.
+IMAGE_COLUMNS = {"projects": "images", "project_images": "image", "image_gallery": "image"}
+DATE_COLUMNS = {"start_date", "end_date", "release_date"}
+CHOICES = {"status": ("Ongoing", "Completed", "Upcoming")}
+
+
+# ---------------- PARSING ----------------
+def _format(filename):
+    ext = os.path.splitext(filename)[1].lower().lstrip(".")
+    if ext not in FORMATS:
+        raise ValueError(f"Unsupported file type: {filename} (expected .csv or .jsonl)")
+    return ext
+
+
+def _records(text, fmt):
+    # -> (line number, row dict or None, error or None), one row at a time
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row, None
+        return
+
+    for n, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield n, None, f"invalid JSON: {e}"
+            continue
+        if isinstance(row, dict):
+            yield n, row, None
+        else:
+            yield n, None, "expected a JSON object"
+
+
+def _clean(table, row):
+    _, columns, required = TABLES[table]
+    clean = {}
+    for column in columns:
+        value = row.get(column)
+        if isinstance(value, str):
+            value = value.strip() or None
+        if value is None:
+            if column in required:
+                raise ValueError(f"missing {column}")
+        elif column in DATE_COLUMNS:
+            try:
+                value = date.fromisoformat(str(value)).isoformat()
+            except ValueError:
+                raise ValueError(f"{column} is not a YYYY-MM-DD date: {value!r}")
+        elif column in CHOICES and value not in CHOICES[column]:
+            raise ValueError(f"{column} must be one of {', '.join(CHOICES[column])}")
+        elif column == "project_id":
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"project_id is not a number: {value!r}")
+        elif column == "images":
+            if isinstance(value, str):
+                value = value.split("|")
+            if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+                raise ValueError("images must be a list of file names")
+            value = [v.strip() for v in value if v.strip()]
+        clean[column] = value
+
+    if table == "projects" and clean["images"] is None:
+        clean["images"] = []
+    return clean
+
+
+def _image_names(table, row):
+    column = IMAGE_COLUMNS.get(table)
+    if column is None:
+        return []
+    value = row[column]
+    return value if isinstance(value, list) else [value]
+
+
+# ---------------- IMPORT ----------------
+def _store_image(archive, name):
+    # Copy one image out of the zip into blob storage and build its variants
+    with archive.open(name) as f:
+        path = storage.store(f, name)
+    return path, json.dumps(images.make_variants(path))
+
+
+def _next_id(conn, table):
+    # Under the write lock: the ids the next inserts will get, so child
+    # rows can be written in the same executemany batch
+    return conn.execute(
+        "SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name=?), 0), "
+        f"COALESCE((SELECT MAX(id) FROM {table}), 0)) + 1",
+        (table,)
+    ).fetchone()[0]
+
+
+def _foreign_projects(conn, rows):
+    # Indexes of project_images rows whose project_id is not one of this
+    # organization's projects
+    ids = sorted({row["project_id"] for row in rows})
+    own = set()
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        own.update(r[0] for r in conn.execute(
+            f"SELECT id FROM projects WHERE tenant=? AND id IN ({', '.join('?' * len(chunk))})",
+            (db.TENANT, *chunk)
+        ))
+    return {i for i, row in enumerate(rows) if row["project_id"] not in own}
+
+
+def _write_batch(name, table, rows):
+    # -> indexes of rows refused, nothing written for them
+    conn = db.get_connection(name)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Checked under the write lock, so the projects cannot change in between
+        refused = _foreign_projects(conn, rows) if table == "project_images" else set()
+        rows = [row for i, row in enumerate(rows) if i not in refused]
+        if not rows:
+            conn.rollback()
+            return refused
+
+        children = []
+        if table == "projects":
+            first_id = _next_id(conn, table)
+            for i, row in enumerate(rows):
+                row["id"] = first_id + i
+                children += [(row["id"], path, variants) for path, variants in row.pop("images")]
+
+        for row in rows:
+            row["tenant"] = db.TENANT
+        columns = list(rows[0])
+        conn.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            [tuple(row[c] for c in columns) for row in rows]
+        )
+        if children:
+            conn.executemany(
+                "INSERT INTO project_images (tenant, project_id, image_path, variants) VALUES (?, ?, ?, ?)",
+                [(db.TENANT, *child) for child in children]
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return refused
+
+
+def _flush(name, table, batch, archive, pool):
+    # -> (rows written, [(line, error)] for rows refused)
+    names = [n for _, row in batch for n in _image_names(table, row)]
+    stored = list(pool.map(lambda n: _store_image(archive, n), names)) if names else []
+
+    # Swap the zip names for stored paths, in the order they were queued
+    it = iter(stored)
+    rows = []
+    for _, row in batch:
+        if table == "projects":
+            row["images"] = [next(it) for _ in row["images"]]
+        elif table in IMAGE_COLUMNS:
+            row["image_path"], row["variants"] = next(it)
+            del row["image"]
+        rows.append(row)
+
+    try:
+        refused = _write_batch(name, table, rows)
+    except Exception:
+        for path, _ in stored:
+            storage.release(path)
+        raise
+
+    # Images of refused rows were stored for nothing
+    for i in refused:
+        storage.release(rows[i]["image_path"])
+    errors = [(batch[i][0], f"project {rows[i]['project_id']} does not exist") for i in sorted(refused)]
+    return len(rows) - len(refused), errors
+
+
+def import_rows(table, fileobj, fmt, images_zip=None, batch_size=BATCH_SIZE, progress=None):
+    # Validate and insert a CSV/JSONL stream batch by batch. Bad rows are
+    # skipped and reported; each batch is one transaction.
+    if table not in TABLES:
+        raise ValueError(f"Unknown table: {table}")
+    name = TABLES[table][0]
+    migrations.ensure(name)
+
+    report = {"inserted": 0, "errors": 0, "messages": []}
+
+    def reject(line, message):
+        report["errors"] += 1
+        if len(report["messages"]) < MAX_ERRORS:
+            report["messages"].append((line, message))
+
+    archive = zipfile.ZipFile(images_zip) if images_zip is not None else None
+    members = set(archive.namelist()) if archive else set()
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    try:
+        with ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="import") as pool:
+            batch = []
+            for line, row, error in _records(text, fmt):
+                if error:
+                    reject(line, error)
+                    continue
+                try:
+                    row = _clean(table, row)
+                except ValueError as e:
+                    reject(line, str(e))
+                    continue
+                missing = [n for n in _image_names(table, row) if n not in members]
+                if missing:
+                    reject(line, f"not in the images zip: {', '.join(missing)}")
+                    continue
+
+                batch.append((line, row))
+                if len(batch) >= batch_size:
+                    written, errors = _flush(name, table, batch, archive, pool)
+                    report["inserted"] += written
+                    for error in errors:
+                        reject(*error)
+                    batch = []
+                    if progress:
+                        progress(report["inserted"])
+
+            if batch:
+                written, errors = _flush(name, table, batch, archive, pool)
+                report["inserted"] += written
+                for error in errors:
+                    reject(*error)
+                if progress:
+                    progress(report["inserted"])
+    finally:
+        # Leave the caller's file open
+        text.detach()
+        if archive:
+            archive.close()
+        cache.invalidate(table, "project_images")
+
+    return report
+
+
+# ---------------- EXPORT ----------------
+def export_table(table, out, fmt, progress=None):
+    # Stream every row of one table to a text file, EXPORT_FETCH at a time
+    name = TABLES[table][0]
+    migrations.ensure(name)
+    cur = db.get_connection(name).cursor()
+    cur.execute(f"SELECT * FROM {table} WHERE tenant=? ORDER BY id", (db.TENANT,))
+    columns = [d[0] for d in cur.description]
+
+    writer = csv.writer(out) if fmt == "csv" else None
+    if writer:
+        writer.writerow(columns)
+
+    count = 0
+    while True:
+        rows = cur.fetchmany(EXPORT_FETCH)
+        if not rows:
+            break
+        if writer:
+            writer.writerows(rows)
+        else:
+            out.writelines(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n" for row in rows)
+        count += len(rows)
+        if progress:
+            progress(count)
+    return count
+
+
+def export_all(out_dir, fmt, tables=None):
+    os.makedirs(out_dir, exist_ok=True)
+    counts = {}
+    for table in tables or TABLES:
+        with open(os.path.join(out_dir, f"{table}.{fmt}"), "w", newline="", encoding="utf-8") as f:
+            counts[table] = export_table(table, f, fmt)
+    return counts
+
+
+# ---------------- ADMIN UPLOAD ----------------
+def _show_report(job):
+    report = job["result"]
+    st.caption(f"Imported {report['inserted']} rows into {job['payload']['table']}")
+    if report["errors"]:
+        st.warning(f"{report['errors']} rows skipped")
+        st.dataframe([{"line": line, "error": message} for line, message in report["messages"]])
+
+
+def _show_export(job):
+    result, payload = job["result"], job["payload"]
+    if not os.path.exists(result["path"]):
+        st.caption("This export has been cleaned up; prepare it again.")
+        return
+    # The file is opened only when the download is requested, never kept
+    # in this session's memory
+    st.download_button(
+        f"Download {result['rows']} rows", lambda: open(result["path"], "rb"),
+        file_name=f"{payload['table']}.{payload['format']}",
+        key=f"bulk_download_{job['id']}", on_click="ignore"
+    )
+
+
+def render(tables):
+    table = st.selectbox("Table", tables, key="bulk_table")
+    st.caption("Columns: " + ", ".join(TABLES[table][1]))
+
+    data = st.file_uploader("CSV or JSONL file", type=list(FORMATS), key="bulk_data")
+    archive = None
+    if table in IMAGE_COLUMNS:
+        archive = st.file_uploader("Images (zip)", type=["zip"], key="bulk_zip")
+
+    # The import runs in a job worker; this page only follows its progress
+    if st.button("Import", key="bulk_import", disabled=data is None):
+        job_id = jobs.enqueue(
+            "bulk_import",
+            {"table": table, "path": jobs.spool(data), "format": _format(data.name),
+             "images": jobs.spool(archive) if archive else None},
+            invalidate=(table, "project_images")
+        )
+        if job_id is None:
+            st.warning(writer.PENDING)
+        else:
+            st.session_state.bulk_job = job_id
+
+    if "bulk_job" in st.session_state:
+        jobs.watch(st.session_state.bulk_job, _show_report)
+
+    # Exports are written to a file by a job worker as well
+    fmt = st.radio("Export format", FORMATS, horizontal=True, key="bulk_format")
+    if st.button("Prepare export", key="bulk_export"):
+        job_id = jobs.enqueue("bulk_export", {"table": table, "format": fmt})
+        if job_id is None:
+            st.warning(writer.PENDING)
+        else:
+            st.session_state.bulk_export_job = job_id
+
+    if "bulk_export_job" in st.session_state:
+        jobs.watch(st.session_state.bulk_export_job, _show_export)
+
+
+# ---------------- CLI ----------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import and export of site content")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    imp = commands.add_parser("import", help="import a CSV/JSONL file into one table")
+    imp.add_argument("table", choices=list(TABLES))
+    imp.add_argument("file")
+    imp.add_argument("--images", help="zip holding the images the rows refer to")
+    imp.add_argument("--format", choices=FORMATS, help="default: from the file extension")
+    imp.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    exp = commands.add_parser("export", help="export tables to one file each")
+    exp.add_argument("--out", default="export")
+    exp.add_argument("--format", choices=FORMATS, default="jsonl")
+    exp.add_argument("--tables", nargs="+", choices=list(TABLES))
+
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        counts = export_all(args.out, args.format, args.tables)
+        for table, count in counts.items():
+            print(f"{table}: {count} rows")
+        return 0
+
+    with open(args.file, "rb") as f:
+        report = import_rows(
+            args.table, f, args.format or _format(args.file), args.images, args.batch_size,
+            progress=lambda n: print(f"\r{n} rows imported", end="", file=sys.stderr)
+        )
+    print(file=sys.stderr)
+    print(f"Imported {report['inserted']} rows into {args.table}, skipped {report['errors']}")
+    for line, message in report["messages"]:
+        print(f"  line {line}: {message}")
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
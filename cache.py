@@ -0,0 +1,88 @@
+import threading
+import time
+from collections import OrderedDict
+
+# ---------------- SETTINGS ----------------
+# Public pages only change when an admin writes something, so reads are
+# served from memory until they expire or a write invalidates their tables.
+DEFAULT_TTL = 300  # seconds
+MAX_ENTRIES = 512
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # key -> (expires_at, tables, value)
+_by_table = {}            # table -> set of keys reading from it
+_generations = {}         # table -> invalidations so far; clear() bumps None
+
+
+# ---------------- READ-THROUGH ----------------
+def read(tables, sql, params, loader, ttl=DEFAULT_TTL):
+    if isinstance(tables, str):
+        tables = (tables,)
+    key = (tuple(tables), sql, tuple(params))
+    now = time.monotonic()
+
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                _entries.move_to_end(key)
+                return entry[2]
+            _drop(key)
+        generation = _generation(key[0])
+
+    value = loader()
+
+    with _lock:
+        # A write committed while loading may have read the old rows; its
+        # invalidate() came too early to drop them, so do not keep them
+        if _generation(key[0]) != generation:
+            return value
+        _entries[key] = (now + ttl, key[0], value)
+        _entries.move_to_end(key)
+        for table in key[0]:
+            _by_table.setdefault(table, set()).add(key)
+        while len(_entries) > MAX_ENTRIES:
+            _drop(next(iter(_entries)))
+
+    return value
+
+
+def _generation(tables):
+    return tuple(_generations.get(t, 0) for t in (None, *tables))
+
+
+def fetchall(cur, tables, sql, params=(), ttl=DEFAULT_TTL):
+    return read(tables, sql, params, lambda: cur.execute(sql, params).fetchall(), ttl)
+
+
+def fetchone(cur, tables, sql, params=(), ttl=DEFAULT_TTL):
+    rows = fetchall(cur, tables, sql, params, ttl)
+    return rows[0] if rows else None
+
+
+# ---------------- INVALIDATION ----------------
+def invalidate(*tables):
+    with _lock:
+        for table in tables:
+            _generations[table] = _generations.get(table, 0) + 1
+            for key in list(_by_table.get(table, ())):
+                _drop(key)
+
+
+def clear():
+    with _lock:
+        _generations[None] = _generations.get(None, 0) + 1
+        _entries.clear()
+        _by_table.clear()
+
+
+def _drop(key):
+    entry = _entries.pop(key, None)
+    if entry is None:
+        return
+    for table in entry[1]:
+        keys = _by_table.get(table)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del _by_table[table]
@@ -0,0 +1,248 @@
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+
+import cache
+import db
+import migrations
+import storage
+
+# ---------------- SETTINGS ----------------
+# Where each app kept its tables before they moved into one shared file
+LEGACY_DATABASES = {
+    "projects": "ngo.db",
+    "about": "ngo_about_v2.db",
+    "media": "media.db",
+    "users": "users.db",
+    "storage": "storage.db",
+}
+
+# app -> content tables copied under a tenant with shifted ids, parents first
+CONTENT_TABLES = {
+    "projects": ["projects", "project_images"],
+    "about": ["story", "core_values", "programs", "team", "impact"],
+    "media": ["press_releases", "media_coverage", "image_gallery", "videos"],
+}
+# child table -> {column: parent table}
+PARENTS = {"project_images": {"project_id": "projects"}}
+# content table -> column holding a stored blob that each row references
+BLOBS = {"project_images": "image_path", "image_gallery": "image_path"}
+
+
+# ---------------- COPY ----------------
+def _columns(conn, schema, table):
+    return [r[1] for r in conn.execute(f"PRAGMA {schema}.table_info({table})").fetchall()]
+
+
+def _next_id(conn, table):
+    # Same rule as bulk.py: past every id in use or ever handed out
+    return conn.execute(
+        "SELECT MAX(COALESCE((SELECT seq FROM main.sqlite_sequence WHERE name=?), 0), "
+        f"COALESCE((SELECT MAX(id) FROM main.{table}), 0)) + 1",
+        (table,)
+    ).fetchone()[0]
+
+
+def existing_content(conn, name, tenant):
+    # -> {table: rows} the organization already has in the shared file
+    counts = {}
+    for table in CONTENT_TABLES.get(name, ()):
+        n = conn.execute(f"SELECT COUNT(*) FROM main.{table} WHERE tenant=?", (tenant,)).fetchone()[0]
+        if n:
+            counts[table] = n
+    return counts
+
+
+def _refusal(tenant, existing):
+    return (f"{tenant} already has content ("
+            + ", ".join(f"{table} {n}" for table, n in existing.items())
+            + "); pass --replace to delete it and its stored images")
+
+
+def _copy_content(conn, name, tenant, replace):
+    # With replace, the moved-in rows replace the organization's current
+    # ones (e.g. the seed rows of a fresh database); otherwise those have
+    # to be absent. Ids are shifted past the rows already in the shared
+    # file, so several organizations can be moved in.
+    # -> ({table: rows}, blob paths whose references were dropped)
+    existing = existing_content(conn, name, tenant)
+    if existing and not replace:
+        raise ValueError(_refusal(tenant, existing))
+    released = []
+    for table in reversed(CONTENT_TABLES[name]):
+        if table in BLOBS:
+            released += [r[0] for r in conn.execute(
+                f"DELETE FROM main.{table} WHERE tenant=? RETURNING {BLOBS[table]}", (tenant,)
+            ).fetchall() if r[0]]
+        else:
+            conn.execute(f"DELETE FROM main.{table} WHERE tenant=?", (tenant,))
+
+    offsets = {}
+    counts = {}
+    for table in CONTENT_TABLES[name]:
+        offsets[table] = _next_id(conn, table) - 1
+        shifted = {"id": "id + ?"}
+        params = [offsets[table]]
+        for column, parent in PARENTS.get(table, {}).items():
+            shifted[column] = f"{column} + ?"
+            params.append(offsets[parent])
+
+        # location_id points into the legacy locations table; the insert
+        # triggers look the location up again in the shared one
+        columns = [c for c in _columns(conn, "legacy", table) if c not in ("tenant", "location_id")]
+        select = [shifted.get(c, c) for c in columns]
+        cur = conn.execute(
+            f"INSERT INTO main.{table} (tenant, {', '.join(columns)}) "
+            f"SELECT ?, {', '.join(select)} FROM legacy.{table} ORDER BY id",
+            [tenant] + params
+        )
+        counts[table] = cur.rowcount
+    return counts, released
+
+
+def _copy_settings(conn, tenant):
+    # Admin-entered statistics and home page content; the moved-in values win
+    conn.execute("""
+    INSERT INTO main.stats_overrides (tenant, label, value)
+    SELECT ?, label, value FROM legacy.stats_overrides WHERE true ORDER BY rowid
+    ON CONFLICT (tenant, label) DO UPDATE SET value = excluded.value
+    """, (tenant,))
+    conn.execute("""
+    INSERT INTO main.site_content (tenant, key, value)
+    SELECT ?, key, value FROM legacy.site_content WHERE true
+    ON CONFLICT (tenant, key) DO UPDATE SET value = excluded.value
+    """, (tenant,))
+    # New version, so running apps reload the content
+    conn.execute("""
+    INSERT INTO main.content_version (tenant, version) VALUES (?, 1)
+    ON CONFLICT (tenant) DO UPDATE SET version = version + 1
+    """, (tenant,))
+
+
+def _copy_users(conn):
+    # Accounts are shared by every organization; existing names are kept
+    columns = [c for c in _columns(conn, "legacy", "users") if c in _columns(conn, "main", "users")]
+    cur = conn.execute(
+        f"INSERT OR IGNORE INTO main.users ({', '.join(columns)}) "
+        f"SELECT {', '.join(columns)} FROM legacy.users"
+    )
+    return {"users": cur.rowcount}
+
+
+def _copy_blobs(conn):
+    cur = conn.execute("""
+    INSERT INTO main.blobs (path, refs)
+    SELECT path, refs FROM legacy.blobs WHERE true
+    ON CONFLICT (path) DO UPDATE SET refs = refs + excluded.refs
+    """)
+    return {"blobs": cur.rowcount}
+
+
+def consolidate_file(name, path, tenant, replace=False):
+    # Move one legacy per-app file into the shared database -> {table: rows}
+    migrations.ensure(name)
+    released = []
+
+    # Work on an up-to-date snapshot, so the legacy file itself is not
+    # altered and nothing still in its WAL is missed
+    fd, snapshot = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        src = sqlite3.connect(path)
+        dst = sqlite3.connect(snapshot)
+        try:
+            src.backup(dst)
+            migrations.migrate(name, dst)
+        finally:
+            src.close()
+            dst.close()
+
+        conn = db.get_connection(name)
+        conn.execute("ATTACH DATABASE ? AS legacy", (snapshot,))
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if name in CONTENT_TABLES:
+                    counts, released = _copy_content(conn, name, tenant, replace)
+                    if name == "projects":
+                        _copy_settings(conn, tenant)
+                elif name == "users":
+                    counts = _copy_users(conn)
+                else:
+                    counts = _copy_blobs(conn)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        finally:
+            conn.execute("DETACH DATABASE legacy")
+    finally:
+        os.remove(snapshot)
+
+    # The blob references go once the rows holding them are gone for good;
+    # release() takes its own write lock, so not inside the copy's
+    for blob in released:
+        storage.release(blob)
+    cache.clear()
+    return counts
+
+
+def retire(path):
+    # Keep the old file as a backup under a name nothing opens
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.replace(path + suffix, path + ".migrated" + suffix)
+
+
+# ---------------- CLI ----------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=f"Move the per-app SQLite files into the shared database ({db.DATABASE})"
+    )
+    parser.add_argument("--tenant", default=db.TENANT,
+                        help="organization the content belongs to")
+    parser.add_argument("--replace", action="store_true",
+                        help="delete the organization's current content instead of refusing to run")
+    parser.add_argument("--dir", default=".", help="folder holding the legacy files")
+    for name, filename in LEGACY_DATABASES.items():
+        parser.add_argument(f"--{name}", default=filename, metavar="FILE", help=f"default: {filename}")
+    parser.add_argument("--keep", action="store_true", help="leave the legacy files where they are")
+    args = parser.parse_args(argv)
+
+    found = {}
+    for name in LEGACY_DATABASES:
+        path = os.path.join(args.dir, getattr(args, name))
+        if not os.path.exists(path):
+            continue
+        if os.path.abspath(path) == os.path.abspath(db.DATABASE):
+            parser.error(f"{path} is the shared database itself")
+        found[name] = path
+
+    # Check every file before moving any, so a refusal leaves nothing half done
+    if not args.replace:
+        for name in found:
+            if name not in CONTENT_TABLES:
+                continue
+            migrations.ensure(name)
+            existing = existing_content(db.get_connection(name), name, args.tenant)
+            if existing:
+                parser.error(_refusal(args.tenant, existing))
+
+    moved = 0
+    for name, path in found.items():
+        counts = consolidate_file(name, path, args.tenant, args.replace)
+        if not args.keep:
+            retire(path)
+        moved += 1
+        print(f"{path} -> {db.DATABASE} [{args.tenant}]: "
+              + ", ".join(f"{table} {n}" for table, n in counts.items()))
+
+    if not moved:
+        print("No legacy database files found")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+import json
+import threading
+import time
+from types import MappingProxyType
+
+import db
+import migrations
+import writer
+
+# ---------------- SETTINGS ----------------
+# Other processes' edits are noticed within this many seconds; the check
+# is a single-row primary key read.
+VERSION_CHECK_INTERVAL = 5
+
+# What an organization shows before its admin saves anything
+DEFAULTS = {
+    "vision": "Empowering lives through compassion.",
+    "mission": "Education, healthcare, and social welfare.",
+    "initiatives": ["Free Education Program", "Women Empowerment", "Rural Health Support"],
+}
+
+_lock = threading.Lock()
+_version = None
+_content = MappingProxyType({})
+_checked_at = 0.0
+
+
+class VersionConflict(Exception):
+    pass
+
+
+# ---------------- READS ----------------
+def _conn():
+    migrations.ensure("projects")
+    return db.get_connection("projects")
+
+
+def _freeze(value):
+    # Shared by every session, so hand out read-only values
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    return value
+
+
+def _current_version(conn):
+    row = conn.execute("SELECT version FROM content_version WHERE tenant=?", (db.TENANT,)).fetchone()
+    return row[0] if row else 0
+
+
+def _load(conn):
+    global _version, _content
+    version = _current_version(conn)
+    if version != _version:
+        rows = conn.execute("SELECT key, value FROM site_content WHERE tenant=?", (db.TENANT,)).fetchall()
+        content = {k: _freeze(v) for k, v in DEFAULTS.items()}
+        content.update((k, _freeze(json.loads(v))) for k, v in rows)
+        _content = MappingProxyType(content)
+        _version = version
+
+
+def snapshot():
+    # -> (version, read-only content) shared by the whole process
+    global _checked_at
+    now = time.monotonic()
+    if _version is None or now - _checked_at >= VERSION_CHECK_INTERVAL:
+        with _lock:
+            if _version is None or now - _checked_at >= VERSION_CHECK_INTERVAL:
+                _load(_conn())
+                _checked_at = now
+    return _version, _content
+
+
+def get(key, default=None):
+    return snapshot()[1].get(key, default)
+
+
+# ---------------- WRITES ----------------
+def update(changes, expected_version=None):
+    # Save several keys as one new version -> that version, or None while
+    # the write is still pending (see writer.wait). With expected_version,
+    # the write fails if someone else saved in between.
+    global _checked_at
+
+    def save(conn):
+        # Runs on the writer thread, where the version check and the new
+        # values share one transaction
+        version = _current_version(conn)
+        if expected_version is not None and version != expected_version:
+            raise VersionConflict("Content was changed by someone else, please reload")
+        conn.executemany(
+            "INSERT INTO site_content (tenant, key, value) VALUES (?, ?, ?) "
+            "ON CONFLICT (tenant, key) DO UPDATE SET value = excluded.value",
+            [(db.TENANT, k, json.dumps(v)) for k, v in changes.items()]
+        )
+        conn.execute(
+            "INSERT INTO content_version (tenant, version) VALUES (?, 1) "
+            "ON CONFLICT (tenant) DO UPDATE SET version = version + 1",
+            (db.TENANT,)
+        )
+
+    conn = _conn()
+    saved, _ = writer.wait(writer.submit("projects", save))
+    if not saved:
+        return None
+    with _lock:
+        _load(conn)
+        _checked_at = time.monotonic()
+    return _version
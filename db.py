@@ -0,0 +1,327 @@
+import bisect
+import functools
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import weakref
+from collections import deque
+
+# ---------------- DATABASES ----------------
+# Every app keeps its tables in one shared file; the names only group the
+# migrations. consolidate.py moves the old per-app files into it.
+DATABASE = os.environ.get("NGO_DATABASE", "ngo_site.db")
+DATABASES = dict.fromkeys(("projects", "about", "media", "changes", "users", "sessions", "storage", "jobs"), DATABASE)
+
+# Organization whose content this process serves. Content tables carry a
+# tenant column, so one database can host many NGOs.
+TENANT = os.environ.get("NGO_TENANT", "default")
+
+# ---------------- SETTINGS ----------------
+BUSY_TIMEOUT_MS = 5000
+MMAP_SIZE = 64 * 1024 * 1024
+CACHE_SIZE_KB = 16 * 1024
+MAX_IDLE = 8  # idle connections kept per database file
+
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", 100))
+SLOW_LOG_SIZE = 100
+HISTOGRAM_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)  # bucket upper bounds
+_HELPER_FILES = {"db.py", "cache.py"}
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+_lock = threading.Lock()
+_idle = {}   # path -> connections handed back by finished threads
+_stats = {}  # normalized sql -> calls, timings, rows, callers, histogram
+_slow = deque(maxlen=SLOW_LOG_SIZE)
+
+
+# ---------------- TIMED CURSOR ----------------
+class TimedCursor(sqlite3.Cursor):
+    # Times every statement together with the fetches that follow it and
+    # feeds the per-process and per-run query stats.
+    _trace = None
+
+    def execute(self, sql, params=()):
+        self._finish()
+        self._trace = _Trace(self.connection, sql, params)
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, params)
+        finally:
+            self._trace.add(time.perf_counter() - start)
+            if self.description is None:
+                self._trace.add(0, max(self.rowcount, 0))
+                self._finish()
+
+    def executemany(self, sql, seq_of_params):
+        self._finish()
+        self._trace = _Trace(self.connection, sql, None)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_params)
+        finally:
+            self._trace.add(time.perf_counter() - start, max(self.rowcount, 0))
+            self._finish()
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        if self._trace is not None:
+            self._trace.add(time.perf_counter() - start, 0 if row is None else 1)
+            self._finish()
+        return row
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        if self._trace is not None:
+            self._trace.add(time.perf_counter() - start, len(rows))
+            self._finish()
+        return rows
+
+    def _finish(self):
+        if self._trace is not None and not self._trace.finished:
+            self._trace.finish()
+
+    def __del__(self):
+        # Statements whose rows were never fetched finish here
+        self._finish()
+
+
+class PooledConnection(sqlite3.Connection):
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+
+# ---------------- POOL ----------------
+def _open(path):
+    conn = sqlite3.connect(
+        path,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        check_same_thread=False,
+        factory=PooledConnection,
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+    return conn
+
+
+def get_connection(name):
+    # Each script-run thread gets one connection per database file, shared
+    # by every app name mapped to it; it goes back to the pool when the
+    # thread object is collected.
+    path = DATABASES[name]
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+
+    conn = conns.get(path)
+    if conn is None:
+        with _lock:
+            idle = _idle.get(path)
+            conn = idle.pop() if idle else None
+        if conn is None:
+            conn = _open(path)
+        conns[path] = conn
+        weakref.finalize(threading.current_thread(), _release, path, conn)
+
+    return conn
+
+
+def _release(path, conn):
+    try:
+        if conn.in_transaction:
+            conn.rollback()
+    except sqlite3.Error:
+        conn.close()
+        return
+
+    with _lock:
+        idle = _idle.setdefault(path, [])
+        if len(idle) < MAX_IDLE:
+            idle.append(conn)
+            return
+    conn.close()
+
+
+def close_all():
+    with _lock:
+        idle = [conn for conns in _idle.values() for conn in conns]
+        _idle.clear()
+    for conn in idle:
+        conn.close()
+    for conn in getattr(_local, "conns", {}).values():
+        conn.close()
+    _local.conns = {}
+
+
+# ---------------- QUERY STATS ----------------
+@functools.lru_cache(maxsize=1024)
+def normalize(sql):
+    # Same statement with different literals -> same key
+    sql = re.sub(r"'(?:[^']|'')*'", "?", sql)
+    sql = re.sub(r"\b\d+(?:\.\d+)?\b", "?", sql)
+    return re.sub(r"\s+", " ", sql).strip()
+
+
+def _caller():
+    # First frame outside the database helpers, e.g. "our.py:fetch_projects_page"
+    frame = sys._getframe(3)
+    while frame is not None and os.path.basename(frame.f_code.co_filename) in _HELPER_FILES:
+        frame = frame.f_back
+    if frame is None:
+        return "?"
+    return f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}"
+
+
+def _bucket(ms):
+    return bisect.bisect_left(HISTOGRAM_MS, ms)
+
+
+def _new_histogram():
+    return [0] * (len(HISTOGRAM_MS) + 1)
+
+
+def _run():
+    run = getattr(_local, "run", None)
+    if run is None:
+        run = _local.run = {"queries": 0, "total_ms": 0.0, "rows": 0, "histogram": _new_histogram()}
+    return run
+
+
+class _Trace:
+    __slots__ = ("conn", "sql", "params", "key", "caller", "elapsed", "rows", "finished")
+
+    def __init__(self, conn, sql, params):
+        self.conn = conn
+        self.sql = sql
+        self.params = params
+        self.key = normalize(sql)
+        self.caller = _caller()
+        self.elapsed = 0.0
+        self.rows = 0
+        self.finished = False
+
+        with _lock:
+            entry = _stats.get(self.key)
+            if entry is None:
+                entry = _stats[self.key] = {
+                    "calls": 0, "total": 0.0, "max": 0.0, "rows": 0,
+                    "callers": {}, "histogram": _new_histogram(),
+                }
+            entry["calls"] += 1
+            entry["callers"][self.caller] = entry["callers"].get(self.caller, 0) + 1
+        _run()["queries"] += 1
+
+    def add(self, seconds, rows=0):
+        self.elapsed += seconds
+        self.rows += rows
+        with _lock:
+            entry = _stats[self.key]
+            entry["total"] += seconds
+            entry["rows"] += rows
+        run = _run()
+        run["total_ms"] += seconds * 1000
+        run["rows"] += rows
+
+    def finish(self):
+        self.finished = True
+        ms = self.elapsed * 1000
+        with _lock:
+            entry = _stats[self.key]
+            entry["max"] = max(entry["max"], self.elapsed)
+            entry["histogram"][_bucket(ms)] += 1
+        _run()["histogram"][_bucket(ms)] += 1
+
+        if ms >= SLOW_QUERY_MS:
+            _log_slow(self, ms)
+
+
+def _explain(conn, sql, params):
+    if params is None or not sql.lstrip().upper().startswith(("SELECT", "WITH")):
+        return []
+    try:
+        # Plain sqlite3 execute, so the plan lookup is not traced itself
+        rows = sqlite3.Connection.execute(conn, "EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    except sqlite3.Error:
+        return []
+    return [row[-1] for row in rows]
+
+
+def _log_slow(trace, ms):
+    plan = _explain(trace.conn, trace.sql, trace.params)
+    entry = {
+        "sql": trace.key, "ms": ms, "rows": trace.rows,
+        "caller": trace.caller, "plan": plan, "at": time.time(),
+    }
+    with _lock:
+        _slow.append(entry)
+    logger.warning(
+        "slow query (%.1f ms, %d rows) from %s: %s\n  plan: %s",
+        ms, trace.rows, trace.caller, trace.key, "; ".join(plan) or "-"
+    )
+
+
+def query_stats():
+    # Per-process totals by normalized statement, slowest in total first
+    with _lock:
+        rows = [
+            {
+                "sql": sql,
+                "calls": e["calls"],
+                "total_ms": e["total"] * 1000,
+                "avg_ms": e["total"] * 1000 / e["calls"] if e["calls"] else 0.0,
+                "max_ms": e["max"] * 1000,
+                "rows": e["rows"],
+                "callers": dict(e["callers"]),
+                "histogram": list(e["histogram"]),
+            }
+            for sql, e in _stats.items()
+        ]
+    return sorted(rows, key=lambda r: r["total_ms"], reverse=True)
+
+
+def histogram():
+    # Per-process latency histogram over all statements -> {"<=1ms": n, ...}
+    totals = _new_histogram()
+    with _lock:
+        for e in _stats.values():
+            totals = [a + b for a, b in zip(totals, e["histogram"])]
+    return _label(totals)
+
+
+def run_stats():
+    # Queries issued by the current script run (its thread) so far
+    run = _run()
+    return {**run, "histogram": _label(run["histogram"])}
+
+
+def slow_queries():
+    with _lock:
+        return list(_slow)
+
+
+def _label(counts):
+    labels = [f"<={ms}ms" for ms in HISTOGRAM_MS] + [f">{HISTOGRAM_MS[-1]}ms"]
+    return dict(zip(labels, counts))
+
+
+def reset_stats():
+    with _lock:
+        _stats.clear()
+        _slow.clear()
+    _local.run = None
@@ -0,0 +1,60 @@
+import streamlit as st
+
+import db
+import writer
+
+TOP_N = 20
+
+
+# ---------------- QUERY DIAGNOSTICS ----------------
+def render(top_n=TOP_N):
+    run = db.run_stats()
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Queries this run", run["queries"])
+    col2.metric("Query time this run", f"{run['total_ms']:.1f} ms")
+    col3.metric("Rows this run", run["rows"])
+
+    st.markdown(f"#### Top {top_n} queries by total time")
+    stats = db.query_stats()[:top_n]
+    if stats:
+        st.dataframe(
+            [
+                {
+                    "query": s["sql"],
+                    "calls": s["calls"],
+                    "total ms": round(s["total_ms"], 2),
+                    "avg ms": round(s["avg_ms"], 2),
+                    "max ms": round(s["max_ms"], 2),
+                    "rows": s["rows"],
+                    "called from": ", ".join(sorted(s["callers"], key=s["callers"].get, reverse=True)),
+                }
+                for s in stats
+            ],
+        )
+    else:
+        st.info("No queries recorded yet.")
+
+    st.markdown("#### Latency histogram (this process)")
+    st.dataframe([db.histogram()])
+
+    st.markdown(f"#### Slow queries (≥ {db.SLOW_QUERY_MS:g} ms)")
+    slow = db.slow_queries()
+    if not slow:
+        st.info("No slow queries logged.")
+    for q in reversed(slow):
+        with st.expander(f"{q['ms']:.1f} ms · {q['rows']} rows · {q['caller']}"):
+            st.code(q["sql"], language="sql")
+            for step in q["plan"] or ["(no plan)"]:
+                st.write("•", step)
+
+    st.markdown("#### Write queue")
+    w = writer.metrics()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Queue depth", w["queue_depth"])
+    col2.metric("Mutations applied", w["applied"], f"{w['failed']} failed", delta_color="off")
+    col3.metric("Commit p50 / p99", f"{w['commit_p50_ms']:.1f} / {w['commit_p99_ms']:.1f} ms")
+    col4.metric("Avg batch", f"{w['avg_batch']:.1f}")
+
+    if st.button("Reset query statistics"):
+        db.reset_stats()
+        st.success("Statistics cleared")
@@ -0,0 +1,324 @@
+import argparse
+import hashlib
+import html
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+import content_store
+import db
+import images
+import impact
+import migrations
+
+# ---------------- SETTINGS ----------------
+OUT_DIR = "static_site"
+STATE_FILE = ".export_state.json"
+PROJECTS_PER_PAGE = 100
+
+# page -> {database: tables it is rendered from}
+PAGES = {
+    "index": {
+        "projects": {"site_content", "stats_overrides", "projects"},
+        "media": {"press_releases", "media_coverage", "image_gallery", "videos"},
+    },
+    "about": {"about": {"story", "core_values", "programs", "team", "impact"}},
+    "media": {"media": {"press_releases", "media_coverage", "image_gallery", "videos"}},
+    "projects": {"projects": {"projects", "project_images"}},
+}
+
+NAV = [("index.html", "Home"), ("about.html", "About Us"),
+       ("projects.html", "Our Projects"), ("media.html", "Media")]
+
+CSS = """
+body { font-family: system-ui, sans-serif; margin: 0; color: #222; background: #f6f8f7; }
+nav { background: #1e8449; padding: 12px 24px; }
+nav a { color: white; margin-right: 20px; text-decoration: none; font-weight: 600; }
+main { max-width: 960px; margin: 0 auto; padding: 24px; }
+.header { font-size: 42px; font-weight: bold; text-align: center; color: #1e8449; }
+.card { background: white; padding: 20px; border-radius: 12px;
+        box-shadow: 0 4px 8px rgba(0,0,0,0.08); margin-bottom: 20px; }
+.stats { display: flex; flex-wrap: wrap; gap: 24px; }
+.stat b { display: block; font-size: 28px; }
+.gallery img, .card img { max-width: 100%; border-radius: 8px; margin: 4px; }
+.pager { display: flex; justify-content: space-between; }
+"""
+
+PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title}</title>
+<link rel="stylesheet" href="{css}">
+</head>
+<body>
+<nav>{nav}</nav>
+<main>
+{body}
+</main>
+</body>
+</html>
+"""
+
+esc = html.escape
+
+
+# ---------------- OUTPUT ----------------
+class Site:
+    def __init__(self, out_dir):
+        self.out_dir = out_dir
+        self.assets_dir = os.path.join(out_dir, "assets")
+        os.makedirs(self.assets_dir, exist_ok=True)
+        self._assets = {}
+        self.css = self._write_asset(CSS.encode(), "site", ".css")
+
+    def _write_asset(self, data, prefix, ext):
+        name = f"{prefix}.{hashlib.sha256(data).hexdigest()[:16]}{ext}"
+        path = os.path.join(self.assets_dir, name)
+        if not os.path.exists(path):
+            _write_atomic(path, data)
+        return f"assets/{name}"
+
+    def asset(self, src_path):
+        # Copy a file under a content-hashed name, once per export
+        if src_path not in self._assets:
+            if not os.path.exists(src_path):
+                self._assets[src_path] = None
+            else:
+                sha = hashlib.sha256()
+                with open(src_path, "rb") as f:
+                    for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                        sha.update(chunk)
+                ext = os.path.splitext(src_path)[1].lower()
+                name = f"{sha.hexdigest()[:16]}{ext}"
+                target = os.path.join(self.assets_dir, name)
+                if not os.path.exists(target):
+                    shutil.copyfile(src_path, target + ".tmp")
+                    os.replace(target + ".tmp", target)
+                self._assets[src_path] = f"assets/{name}"
+        return self._assets[src_path]
+
+    def write(self, filename, title, body):
+        nav = "".join(f'<a href="{href}">{esc(label)}</a>' for href, label in NAV)
+        page = PAGE.format(title=esc(title), css=self.css, nav=nav, body=body)
+        _write_atomic(os.path.join(self.out_dir, filename), page.encode())
+
+
+def _write_atomic(path, data):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _img(site, path, variants, width):
+    url = site.asset(images.pick(path, variants, width))
+    return f'<img src="{url}" width="{width}" loading="lazy" alt="">' if url else ""
+
+
+def _rows(name, sql, params=()):
+    return db.get_connection(name).execute(sql, params).fetchall()
+
+
+# ---------------- PAGES ----------------
+def render_index(site):
+    _, content = content_store.snapshot()
+    stats = "".join(
+        f'<div class="stat"><b>{esc(str(v))}</b>{esc(k)}</div>'
+        for k, v in impact.impact_stats().items()
+    )
+    initiatives = "".join(f"<li>{esc(i)}</li>" for i in content["initiatives"])
+    site.write("index.html", "Helping Hands NGO", f"""
+<div class="header">Helping Hands NGO</div>
+<div class="card"><h2>🌟 Vision</h2><p>{esc(content["vision"])}</p></div>
+<div class="card"><h2>🎯 Mission</h2><p>{esc(content["mission"])}</p></div>
+<div class="card"><h2>📊 Impact Statistics</h2><div class="stats">{stats}</div></div>
+<div class="card"><h2>🚀 Our Initiatives</h2><ul>{initiatives}</ul></div>
+<p>📩 Contact us at: support@helpinghands.org</p>
+""")
+    return ["index.html"]
+
+
+def render_about(site):
+    def items(sql):
+        return "".join(f"<li>{esc(r[0])}</li>" for r in _rows("about", sql, (db.TENANT,)))
+
+    story = _rows("about", "SELECT text FROM story WHERE tenant=? ORDER BY id LIMIT 1", (db.TENANT,))
+    team = "".join(
+        f"<li><b>{esc(n or '')}</b> – {esc(r or '')}</li>"
+        for n, r in _rows("about", "SELECT name, role FROM team WHERE tenant=? ORDER BY id", (db.TENANT,))
+    )
+    site.write("about.html", "About Our NGO", f"""
+<h1>🌍 About Our NGO</h1>
+<p>Building a better future together</p>
+<div class="card"><h2>📘 Our Story</h2><p>{esc(story[0][0]) if story else ""}</p></div>
+<div class="card"><h2>⭐ Core Values</h2><ul>{items("SELECT value FROM core_values WHERE tenant=? ORDER BY id")}</ul></div>
+<div class="card"><h2>🛠 Our Programs</h2><ul>{items("SELECT program FROM programs WHERE tenant=? ORDER BY id")}</ul></div>
+<div class="card"><h2>👥 Our Team</h2><ul>{team}</ul></div>
+<div class="card"><h2>📊 Impact</h2><ul>{items("SELECT detail FROM impact WHERE tenant=? ORDER BY id")}</ul></div>
+""")
+    return ["about.html"]
+
+
+def render_media(site):
+    releases = "".join(
+        f"<div class=\"card\"><h3>{esc(t)}</h3><p>{esc(d)}</p><small>Date: {esc(str(r))}</small></div>"
+        for t, d, r in _rows(
+            "media",
+            "SELECT title, description, release_date FROM press_releases WHERE tenant=? ORDER BY release_date DESC",
+            (db.TENANT,)
+        )
+    ) or "<p>No press releases available.</p>"
+    coverage = "".join(
+        f'<li><b>{esc(t)}</b> — <a href="{esc(u)}">View Article</a></li>'
+        for t, u in _rows("media", "SELECT title, url FROM media_coverage WHERE tenant=? ORDER BY id", (db.TENANT,))
+    ) or "<li>No media coverage available.</li>"
+    gallery = "".join(
+        _img(site, p, v, 250)
+        for p, v in _rows("media", "SELECT image_path, variants FROM image_gallery WHERE tenant=? ORDER BY id",
+                          (db.TENANT,))
+    ) or "<p>No images uploaded yet.</p>"
+    videos = "".join(
+        f'<li><a href="{esc(u)}">{esc(u)}</a></li>'
+        for (u,) in _rows("media", "SELECT video_url FROM videos WHERE tenant=? ORDER BY id", (db.TENANT,))
+    ) or "<li>No videos available.</li>"
+
+    site.write("media.html", "NGO Media Page", f"""
+<h1>NGO Media Page</h1>
+<h2>📰 Press Releases</h2>{releases}
+<h2>🌐 Media Coverage</h2><ul>{coverage}</ul>
+<h2>🖼 Image Gallery</h2><div class="gallery">{gallery}</div>
+<h2>🎥 Videos</h2><ul>{videos}</ul>
+<hr><p>📩 <b>Contact for Media:</b> media@ngo.org</p>
+""")
+    return ["media.html"]
+
+
+def _projects_file(page):
+    return "projects.html" if page == 1 else f"projects-{page}.html"
+
+
+def render_projects(site):
+    # Streams the projects in id order, PROJECTS_PER_PAGE per file
+    cur = db.get_connection("projects").cursor()
+    cur.execute("""
+    SELECT p.id, p.title, p.description, p.status, p.location,
+           json_group_array(json_array(i.image_path, i.variants))
+               FILTER (WHERE i.id IS NOT NULL)
+    FROM projects p
+    LEFT JOIN project_images i ON i.project_id = p.id
+    WHERE p.tenant = ?
+    GROUP BY p.id
+    ORDER BY p.id
+    """, (db.TENANT,))
+
+    written = []
+    page = 1
+    batch = cur.fetchmany(PROJECTS_PER_PAGE)
+    while True:
+        upcoming = cur.fetchmany(PROJECTS_PER_PAGE) if batch else []
+        cards = "".join(
+            f"""<div class="card"><h2>{esc(title or "")}</h2><p>{esc(desc or "")}</p>
+<p>📍 Location: {esc(location or "")}<br>📅 Status: {esc(status or "")}</p>
+{"".join(_img(site, path, variants, 300) for path, variants in json.loads(imgs))}</div>"""
+            for _, title, desc, status, location, imgs in batch
+        ) or "<p>No projects yet.</p>"
+
+        prev_link = f'<a href="{_projects_file(page - 1)}">⬅ Previous</a>' if page > 1 else "<span></span>"
+        next_link = f'<a href="{_projects_file(page + 1)}">Next ➡</a>' if upcoming else "<span></span>"
+        site.write(_projects_file(page), "Our Projects", f"""
+<h1>Our Projects</h1>
+<p>Making a difference through our initiatives</p>
+{cards}
+<div class="pager">{prev_link}<span>Page {page}</span>{next_link}</div>
+""")
+        written.append(_projects_file(page))
+        if not upcoming:
+            break
+        batch = upcoming
+        page += 1
+
+    # Drop pages left over from a larger export
+    stale = page + 1
+    while os.path.exists(os.path.join(site.out_dir, _projects_file(stale))):
+        os.remove(os.path.join(site.out_dir, _projects_file(stale)))
+        stale += 1
+    return written
+
+
+RENDERERS = {
+    "index": render_index,
+    "about": render_about,
+    "media": render_media,
+    "projects": render_projects,
+}
+
+
+# ---------------- INCREMENTAL BUILD ----------------
+def _load_state(out_dir):
+    try:
+        with open(os.path.join(out_dir, STATE_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def changes_since(state):
+    # -> ({database: changed tables}, {database: newest change_log seq})
+    changed, seqs = {}, {}
+    for name in ("projects", "about", "media"):
+        rows = _rows(name, "SELECT table_name, MAX(seq) FROM change_log "
+                           "WHERE tenant = ? AND seq > ? GROUP BY table_name",
+                     (db.TENANT, state.get(name, 0)))
+        changed[name] = {table for table, _ in rows}
+        seqs[name] = max([seq for _, seq in rows], default=state.get(name, 0))
+    return changed, seqs
+
+
+def export(out_dir=OUT_DIR, full=False):
+    for name in ("projects", "about", "media", "changes"):
+        migrations.ensure(name)
+    os.makedirs(out_dir, exist_ok=True)
+
+    state = _load_state(out_dir)
+    # Read the log position before rendering, so anything written while
+    # we render is picked up by the next export
+    changed, seqs = changes_since(state)
+
+    if full or not state:
+        pages = list(RENDERERS)
+    else:
+        pages = [
+            page for page, sources in PAGES.items()
+            if any(changed[name] & tables for name, tables in sources.items())
+        ]
+
+    site = Site(out_dir)
+    written = []
+    for page in pages:
+        written += RENDERERS[page](site)
+
+    _write_atomic(os.path.join(out_dir, STATE_FILE), json.dumps(seqs).encode())
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the public pages as static HTML")
+    parser.add_argument("--out", default=OUT_DIR)
+    parser.add_argument("--full", action="store_true", help="rebuild every page")
+    args = parser.parse_args(argv)
+
+    written = export(args.out, args.full)
+    if written:
+        print(f"Rebuilt {len(written)} file(s) in {args.out}: {', '.join(written[:10])}"
+              + (" …" if len(written) > 10 else ""))
+    else:
+        print("Nothing changed since the last export")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
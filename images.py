@@ -0,0 +1,115 @@
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import cache
+import db
+import jobs
+
+# ---------------- SETTINGS ----------------
+VARIANT_WIDTHS = (150, 300, 1200)
+VARIANT_FORMAT = "WEBP"
+VARIANT_QUALITY = 80
+WORKERS = 2
+
+_pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="thumbs")
+
+
+# ---------------- VARIANTS ----------------
+def variant_path(src_path, width):
+    folder, name = os.path.split(src_path)
+    stem = os.path.splitext(name)[0]
+    return os.path.join(folder, "variants", f"{stem}_{width}.webp")
+
+
+def make_variants(src_path):
+    # Resized, re-encoded copies narrower than the original -> {width: path}.
+    # Pillow is imported here: only job workers build variants, so pages
+    # never pay for loading it.
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:  # Pillow is optional; pages fall back to the originals
+        return {}
+
+    variants = {}
+    with Image.open(src_path) as original:
+        original = ImageOps.exif_transpose(original)
+        if original.mode not in ("RGB", "RGBA"):
+            original = original.convert("RGBA" if "A" in original.getbands() else "RGB")
+
+        for width in VARIANT_WIDTHS:
+            if width >= original.width:
+                break
+            height = round(original.height * width / original.width)
+            path = variant_path(src_path, width)
+            if os.path.exists(path):
+                # Blobs are content addressed, so an existing variant
+                # already holds exactly these pixels
+                variants[str(width)] = path
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            os.close(fd)
+            original.resize((width, height), Image.LANCZOS).save(
+                tmp, VARIANT_FORMAT, quality=VARIANT_QUALITY, method=4
+            )
+            os.replace(tmp, path)
+            variants[str(width)] = path
+
+    return variants
+
+
+def build_variants(name, table, row_id, src_path):
+    variants = make_variants(src_path)
+    conn = db.get_connection(name)
+    conn.execute(
+        f"UPDATE {table} SET variants=? WHERE id=?",
+        (json.dumps(variants), row_id)
+    )
+    conn.commit()
+    cache.invalidate(table)
+    return variants
+
+
+def schedule(name, table, row_id, src_path):
+    # Build the variants for one uploaded image in a job worker -> job id
+    return jobs.enqueue(
+        "image_variants",
+        {"name": name, "table": table, "row_id": row_id, "path": src_path},
+        invalidate=(table,)
+    )
+
+
+def backfill(name, table):
+    # Run from the command line, so the work stays in this process
+    rows = db.get_connection(name).execute(
+        f"SELECT id, image_path FROM {table} WHERE variants IS NULL"
+    ).fetchall()
+    return [_pool.submit(build_variants, name, table, row_id, path) for row_id, path in rows]
+
+
+# ---------------- RENDERING ----------------
+def pick(image_path, variants, width):
+    # Smallest variant at least `width` pixels wide, else the original
+    if not variants:
+        return image_path
+    if isinstance(variants, str):
+        variants = json.loads(variants)
+
+    fits = [int(w) for w in variants if int(w) >= width]
+    if not fits:
+        return image_path
+    path = variants[str(min(fits))]
+    return path if os.path.exists(path) else image_path
+
+
+if __name__ == "__main__":
+    import migrations
+
+    migrations.ensure("projects")
+    migrations.ensure("media")
+    futures = backfill("projects", "project_images") + backfill("media", "image_gallery")
+    for future in futures:
+        future.result()
+    print(f"Generated variants for {len(futures)} images")
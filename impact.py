@@ -0,0 +1,80 @@
+import cache
+import db
+import migrations
+import writer
+
+# ---------------- SETTINGS ----------------
+# Counters are kept current by triggers (see migrations.py); the short TTL
+# only bounds how stale another process's writes can look here.
+STATS_TTL = 30
+
+# label -> (database, counter table, keys summed for the metric)
+METRICS = {
+    "Ongoing Projects": ("projects", "project_stats", ("status:Ongoing",)),
+    "Completed Projects": ("projects", "project_stats", ("status:Completed",)),
+    "Press Releases": ("media", "media_stats", ("press_releases",)),
+    "Media Items": ("media", "media_stats", ("media_coverage", "image_gallery", "videos")),
+}
+
+
+# ---------------- READS ----------------
+def _cursor(name):
+    migrations.ensure(name)
+    return db.get_connection(name).cursor()
+
+
+def _counters(name, table):
+    rows = cache.fetchall(
+        _cursor(name), table, f"SELECT key, value FROM {table} WHERE tenant=?", (db.TENANT,),
+        ttl=STATS_TTL
+    )
+    return dict(rows)
+
+
+def computed():
+    counters = {}
+    stats = {}
+    for label, (name, table, keys) in METRICS.items():
+        if table not in counters:
+            counters[table] = _counters(name, table)
+        stats[label] = sum(counters[table].get(key, 0) for key in keys)
+    return stats
+
+
+def overrides():
+    rows = cache.fetchall(
+        _cursor("projects"), "stats_overrides",
+        "SELECT label, value FROM stats_overrides WHERE tenant=? ORDER BY rowid", (db.TENANT,)
+    )
+    return dict(rows)
+
+
+def impact_stats():
+    # Admin-entered values first, then the live counters; an override with
+    # the same label as a counter replaces it.
+    stats = overrides()
+    for label, value in computed().items():
+        stats.setdefault(label, value)
+    return stats
+
+
+# ---------------- ADMIN OVERRIDES ----------------
+# Both -> whether the change committed in time (see writer.wait)
+def set_override(label, value):
+    saved, _ = writer.wait(writer.execute(
+        "projects",
+        "INSERT INTO stats_overrides (tenant, label, value) VALUES (?, ?, ?) "
+        "ON CONFLICT (tenant, label) DO UPDATE SET value = excluded.value",
+        (db.TENANT, label, value),
+        invalidate=("stats_overrides",)
+    ))
+    return saved
+
+
+def remove_override(label):
+    saved, _ = writer.wait(writer.execute(
+        "projects",
+        "DELETE FROM stats_overrides WHERE tenant=? AND label=?", (db.TENANT, label),
+        invalidate=("stats_overrides",)
+    ))
+    return saved
@@ -0,0 +1,476 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import streamlit as st
+
+import cache
+import db
+import migrations
+import writer
+
+# ---------------- SETTINGS ----------------
+# Heavy admin work runs in separate worker processes that take jobs from
+# the jobs table, so a Streamlit rerun only queues the job and polls it.
+# Queued and half-done jobs survive restarts of both sides.
+WORKERS = 2
+MAX_ATTEMPTS = 3
+RETRY_BACKOFF = 5        # seconds before the first retry, doubled per attempt
+POLL_INTERVAL = 0.5      # how often an idle worker looks for jobs
+HEARTBEAT = 5            # seconds between liveness updates
+STALE_AFTER = 60         # a job or pool silent this long is presumed dead
+IDLE_EXIT = 300          # a pool started on demand exits after this long without work
+PROGRESS_INTERVAL = 0.5  # minimum seconds between progress writes
+UI_POLL = 2              # seconds between progress refreshes on admin pages
+SPOOL_DIR = "job_files"  # uploads waiting for their job, exports waiting for download
+EXPORT_KEEP = 24 * 3600  # seconds an export file is kept for download
+LOG_FILE = "jobs.log"
+
+LABELS = {
+    "image_variants": "Image variants",
+    "bulk_import": "Bulk import",
+    "bulk_export": "Bulk export",
+    "search_reindex": "Search index rebuild",
+    "static_export": "Static site export",
+}
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_launched_at = 0.0
+_synced_at = time.time()
+
+
+# ---------------- HANDLERS ----------------
+# Handlers run in a worker process as fn(payload, progress) and return a
+# JSON-able result; progress(done, total=None, message=None) reports how
+# far they got.
+def _image_variants(payload, progress):
+    import images
+
+    return images.build_variants(payload["name"], payload["table"], payload["row_id"], payload["path"])
+
+
+def _bulk_import(payload, progress):
+    import bulk
+
+    with open(payload["path"], "rb") as f:
+        report = bulk.import_rows(
+            payload["table"], f, payload["format"], payload.get("images"),
+            progress=lambda n: progress(n, message=f"{n} rows imported")
+        )
+    for path in (payload["path"], payload.get("images")):
+        if path:
+            os.remove(path)
+    return report
+
+
+def _bulk_export(payload, progress):
+    import bulk
+
+    # Old exports go first; the admin page serves this one from disk
+    now = time.time()
+    for entry in os.scandir(SPOOL_DIR) if os.path.isdir(SPOOL_DIR) else ():
+        if "_export_" in entry.name and entry.stat().st_mtime < now - EXPORT_KEEP:
+            os.remove(entry.path)
+
+    path = spool_path(f"export_{payload['table']}.{payload['format']}")
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        rows = bulk.export_table(
+            payload["table"], f, payload["format"],
+            progress=lambda n: progress(n, message=f"{n} rows written")
+        )
+    return {"path": path, "rows": rows}
+
+
+def _search_reindex(payload, progress):
+    import search
+
+    return search.reindex(progress)
+
+
+def _static_export(payload, progress):
+    import export_static
+
+    written = export_static.export(payload.get("out_dir", export_static.OUT_DIR), payload.get("full", False))
+    return {"written": len(written)}
+
+
+# kind -> (handler, attempts)
+HANDLERS = {
+    "image_variants": (_image_variants, MAX_ATTEMPTS),
+    "bulk_import": (_bulk_import, 1),  # a retry would insert the finished batches again
+    "bulk_export": (_bulk_export, MAX_ATTEMPTS),
+    "search_reindex": (_search_reindex, MAX_ATTEMPTS),
+    "static_export": (_static_export, MAX_ATTEMPTS),
+}
+
+
+def retryable(kind):
+    # Handlers allowed a single attempt are not safe to run twice, neither
+    # automatically nor from the Retry button
+    return kind in HANDLERS and HANDLERS[kind][1] > 1
+
+
+# ---------------- QUEUE ----------------
+def enqueue(kind, payload, invalidate=(), start=True):
+    # Durably queue one job -> its id, or None while the insert is still
+    # pending (see writer.wait). invalidate: tables whose cached reads are
+    # dropped once the job has finished.
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    migrations.ensure("jobs")
+    _, job_id = writer.wait(writer.execute(
+        "jobs",
+        "INSERT INTO jobs (tenant, kind, payload, invalidate, max_attempts, created_at, run_after) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (db.TENANT, kind, json.dumps(payload), json.dumps(list(invalidate)),
+         HANDLERS[kind][1], time.time(), time.time()),
+    ))
+    if start:
+        ensure_workers()
+    return job_id
+
+
+def spool_path(filename):
+    # Fresh absolute path in the spool folder for filename
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    return os.path.abspath(os.path.join(SPOOL_DIR, f"{time.time_ns()}_{os.path.basename(filename)}"))
+
+
+def spool(upload):
+    # Keep an uploaded file on disk until a worker has used it -> path
+    path = spool_path(upload.name)
+    with open(path, "wb") as f:
+        f.write(upload.getbuffer())
+    return path
+
+
+def get(job_id):
+    migrations.ensure("jobs")
+    cur = db.get_connection("jobs").execute("SELECT * FROM jobs WHERE id=?", (job_id,))
+    row = cur.fetchone()
+    return _as_dict(cur, row) if row else None
+
+
+def recent(limit=20):
+    migrations.ensure("jobs")
+    cur = db.get_connection("jobs").execute(
+        "SELECT * FROM jobs WHERE tenant=? ORDER BY id DESC LIMIT ?", (db.TENANT, limit)
+    )
+    return [_as_dict(cur, row) for row in cur.fetchall()]
+
+
+def retry(job_id):
+    # Queue a failed job again with a fresh set of attempts -> whether it
+    # was (False too while the update is still pending)
+    kinds = [kind for kind in HANDLERS if retryable(kind)]
+    saved, changed = writer.wait(writer.submit(
+        "jobs",
+        lambda conn: conn.execute(
+            "UPDATE jobs SET status='queued', attempts=0, error=NULL, progress=NULL, message=NULL, run_after=? "
+            f"WHERE id=? AND status='failed' AND kind IN ({', '.join('?' * len(kinds))})",
+            (time.time(), job_id, *kinds),
+        ).rowcount,
+    ))
+    if changed or not saved:
+        ensure_workers()
+    return bool(changed)
+
+
+def sync():
+    # Drop cached reads of tables changed by jobs that finished since the
+    # last call; the workers' own invalidations stay in their process
+    global _synced_at
+    rows = db.get_connection("jobs").execute(
+        "SELECT finished_at, invalidate FROM jobs WHERE status='done' AND finished_at > ?", (_synced_at,)
+    ).fetchall()
+    tables = {t for _, invalidate in rows for t in json.loads(invalidate or "[]")}
+    if tables:
+        cache.invalidate(*tables)
+    if rows:
+        _synced_at = max(finished for finished, _ in rows)
+
+
+def _as_dict(cur, row):
+    job = dict(zip([d[0] for d in cur.description], row))
+    for key in ("payload", "result", "invalidate"):
+        if job.get(key):
+            job[key] = json.loads(job[key])
+    return job
+
+
+# ---------------- WORKER POOL ----------------
+def ensure_workers():
+    # Start a detached pool unless one is alive. It outlives this process,
+    # so queued jobs keep running across Streamlit restarts.
+    global _launched_at
+    with _lock:
+        now = time.time()
+        if now - _launched_at < STALE_AFTER:
+            return
+        alive = db.get_connection("jobs").execute(
+            "SELECT 1 FROM job_workers WHERE heartbeat > ?", (now - STALE_AFTER,)
+        ).fetchone()
+        if alive:
+            return
+        _launched_at = now
+        with open(LOG_FILE, "ab") as log:
+            subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), "work", "--idle-exit", str(IDLE_EXIT)],
+                stdin=subprocess.DEVNULL, stdout=log, stderr=log, start_new_session=True,
+            )
+
+
+def _claim(conn, worker):
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute("""
+        UPDATE jobs SET status='running', attempts=attempts+1, worker=?, started_at=?, heartbeat=?,
+                        progress=NULL, message=NULL
+        WHERE id = (SELECT id FROM jobs WHERE status='queued' AND run_after <= ? ORDER BY run_after, id LIMIT 1)
+        RETURNING id, tenant, kind, payload
+        """, (worker, now, now, now)).fetchone()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return row
+
+
+def _retry_or_fail(conn, where, params, error):
+    # Running jobs matching where: back in the queue after a backoff while
+    # attempts are left, otherwise failed
+    now = time.time()
+    conn.execute(f"""
+    UPDATE jobs SET
+        status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END,
+        run_after = ? + ? * (1 << (attempts - 1)),
+        finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE ? END,
+        error = ?, worker = NULL
+    WHERE status='running' AND {where}
+    """, (now, RETRY_BACKOFF, now, error, *params))
+    conn.commit()
+
+
+def _heartbeat(job_id, stop):
+    # Liveness of a long job that does not report progress
+    while not stop.wait(HEARTBEAT):
+        conn = db.get_connection("jobs")
+        conn.execute("UPDATE jobs SET heartbeat=? WHERE id=?", (time.time(), job_id))
+        conn.commit()
+
+
+def _run(conn, job_id, tenant, kind, payload):
+    last = [0.0]
+
+    def progress(done, total=None, message=None):
+        now = time.time()
+        if now - last[0] < PROGRESS_INTERVAL and (total is None or done < total):
+            return
+        last[0] = now
+        conn.execute(
+            "UPDATE jobs SET progress=?, message=?, heartbeat=? WHERE id=?",
+            (done / total if total else None, message, now, job_id)
+        )
+        conn.commit()
+
+    stop = threading.Event()
+    beat = threading.Thread(target=_heartbeat, args=(job_id, stop), daemon=True)
+    beat.start()
+    try:
+        db.TENANT = tenant  # the job works on its organization's rows
+        result = HANDLERS[kind][0](json.loads(payload), progress)
+    except Exception as e:
+        logger.exception("job %d (%s) failed", job_id, kind)
+        _retry_or_fail(conn, "id=?", (job_id,), f"{type(e).__name__}: {e}")
+    else:
+        conn.execute(
+            "UPDATE jobs SET status='done', progress=1, result=?, finished_at=?, error=NULL, worker=NULL "
+            "WHERE id=?",
+            (json.dumps(result, default=str), time.time(), job_id)
+        )
+        conn.commit()
+    finally:
+        stop.set()
+        beat.join()
+
+
+def _work(stop):
+    # One worker process: take jobs one at a time until told to stop, or
+    # until the supervisor is gone (killed before it could say so)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C is the supervisor's to handle
+    migrations.ensure("jobs")
+    conn = db.get_connection("jobs")
+    worker = os.getpid()
+    parent = multiprocessing.parent_process()
+    while not stop.is_set():
+        if parent is not None and not parent.is_alive():
+            logger.warning("supervisor %s is gone, worker %s exiting", parent.pid, worker)
+            return
+        job = _claim(conn, worker)
+        if job is None:
+            stop.wait(POLL_INTERVAL)
+            continue
+        _run(conn, *job)
+
+
+def _shutdown(signum, frame):
+    # SIGTERM unwinds serve() like Ctrl+C does, so its workers are stopped
+    raise SystemExit(128 + signum)
+
+
+def serve(workers=WORKERS, idle_exit=0):
+    # Supervise a pool of worker processes: restart crashed ones, retry
+    # their jobs and jobs of pools that died, and exit after idle_exit
+    # seconds without queued or running jobs (0 = never)
+    migrations.ensure("jobs")
+    conn = db.get_connection("jobs")
+    ctx = multiprocessing.get_context("spawn")
+    stop = ctx.Event()
+    procs = []
+    pid = os.getpid()
+    busy_at = time.time()
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, _shutdown)
+        signal.signal(signal.SIGINT, _shutdown)
+
+    def start():
+        proc = ctx.Process(target=_work, args=(stop,), name="job-worker", daemon=True)
+        proc.start()
+        return proc
+
+    try:
+        procs = [start() for _ in range(workers)]
+        while True:
+            now = time.time()
+            conn.execute(
+                "INSERT INTO job_workers (pid, heartbeat, started_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (pid) DO UPDATE SET heartbeat = excluded.heartbeat",
+                (pid, now, now)
+            )
+            conn.execute("DELETE FROM job_workers WHERE heartbeat <= ?", (now - STALE_AFTER,))
+            conn.commit()
+
+            _retry_or_fail(conn, "heartbeat <= ?", (now - STALE_AFTER,), "worker stopped responding")
+            for i, proc in enumerate(procs):
+                if not proc.is_alive():
+                    logger.warning("worker %s exited with %s, restarting", proc.pid, proc.exitcode)
+                    _retry_or_fail(conn, "worker=?", (proc.pid,), f"worker exited with code {proc.exitcode}")
+                    procs[i] = start()
+
+            if conn.execute("SELECT 1 FROM jobs WHERE status IN ('queued', 'running') LIMIT 1").fetchone():
+                busy_at = now
+            elif idle_exit and now - busy_at > idle_exit:
+                return
+            time.sleep(HEARTBEAT)
+    finally:
+        stop.set()
+        for proc in procs:
+            proc.join(HEARTBEAT)
+            if proc.is_alive():
+                proc.terminate()
+        conn.execute("DELETE FROM job_workers WHERE pid=?", (pid,))
+        conn.commit()
+
+
+# ---------------- ADMIN UI ----------------
+def _show(job):
+    label = f"#{job['id']} {LABELS.get(job['kind'], job['kind'])}"
+    if job["status"] == "done":
+        st.success(f"{label}: done")
+    elif job["status"] == "failed":
+        st.error(f"{label}: failed after {job['attempts']} attempt(s) – {job['error']}")
+        if retryable(job["kind"]):
+            st.button("Retry", key=f"job_retry_{job['id']}", on_click=retry, args=(job["id"],))
+        else:
+            st.caption("Work finished before the failure is kept, so this job cannot be retried; "
+                       "start a new one for what is missing.")
+    elif job["status"] == "running":
+        st.progress(job["progress"] or 0.0, text=f"{label}: {job['message'] or 'running…'}")
+    else:
+        retrying = f" (retrying: {job['error']})" if job["error"] else ""
+        st.info(f"{label}: queued{retrying}")
+
+
+def watch(job_id, on_done=None):
+    # Live status of one job; polls only while it is unfinished.
+    # on_done(job) renders the result once it is there.
+    job = get(job_id)
+    if job is None:
+        return None
+
+    def panel():
+        current = get(job_id)
+        _show(current)
+        if current["status"] == "done":
+            sync()
+            if on_done:
+                on_done(current)
+
+    active = job["status"] in ("queued", "running")
+    st.fragment(panel, run_every=UI_POLL if active else None)()
+    return job
+
+
+def render(kinds=("search_reindex", "static_export")):
+    # Buttons for whole-site jobs and the organization's recent jobs
+    cols = st.columns(len(kinds))
+    for col, kind in zip(cols, kinds):
+        if col.button(LABELS[kind], key=f"job_start_{kind}") and enqueue(kind, {}) is None:
+            st.warning(writer.PENDING)
+
+    jobs = recent()
+    active = any(job["status"] in ("queued", "running") for job in jobs)
+
+    def panel():
+        sync()
+        current = recent()
+        if not current:
+            st.caption("No background jobs yet.")
+        for job in current:
+            _show(job)
+
+    st.fragment(panel, run_every=UI_POLL if active else None)()
+
+
+# ---------------- CLI ----------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Background job workers and queue")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    work = commands.add_parser("work", help="run a worker pool in the foreground")
+    work.add_argument("--workers", type=int, default=WORKERS)
+    work.add_argument("--idle-exit", type=float, default=0,
+                      help="exit after this many seconds without jobs (default: never)")
+
+    run = commands.add_parser("enqueue", help="queue a job")
+    run.add_argument("kind", choices=list(HANDLERS))
+    run.add_argument("--payload", default="{}", help="JSON object")
+
+    commands.add_parser("list", help="show recent jobs")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(process)d %(message)s")
+
+    if args.command == "work":
+        serve(args.workers, args.idle_exit)
+    elif args.command == "enqueue":
+        print(enqueue(args.kind, json.loads(args.payload), start=False))
+    else:
+        for job in recent(50):
+            print(f"#{job['id']} {job['kind']} {job['status']} attempts={job['attempts']} "
+                  f"{job['error'] or ''}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+import functools
+import threading
+import time
+from collections import deque
+
+import streamlit as st
+
+import cache
+import db
+import migrations
+
+# ---------------- SETTINGS ----------------
+# Open pages ask "what changed since seq N?" this often. The answer comes
+# from one indexed read of change_log per process per interval, shared by
+# every session, so an idle page costs no queries.
+POLL_INTERVAL = 10   # seconds
+HISTORY = 500        # polls with changes remembered for sessions behind
+
+# Counter tables kept by triggers on the content they count; a change to
+# the content is a change to its counters
+DERIVED = {
+    "projects": ("project_stats",),
+    "press_releases": ("media_stats",),
+    "media_coverage": ("media_stats",),
+    "image_gallery": ("media_stats",),
+    "videos": ("media_stats",),
+}
+
+_lock = threading.Lock()
+_head = None                     # newest change_log seq this process has seen
+_polls = deque(maxlen=HISTORY)   # (seq before, seq after, changed tables)
+_checked_at = 0.0
+
+
+# ---------------- CHANGE FEED ----------------
+def _conn():
+    # change_log comes from the content schemas, its tenant column from
+    # the "changes" one, which has to follow them
+    for name in ("projects", "about", "media", "changes"):
+        migrations.ensure(name)
+    return db.get_connection("changes")
+
+
+def _poll(conn):
+    global _head
+    if _head is None:
+        _head = conn.execute(
+            "SELECT COALESCE(MAX(seq), 0) FROM change_log WHERE tenant=?", (db.TENANT,)
+        ).fetchone()[0]
+        return
+
+    rows = conn.execute(
+        "SELECT table_name, MAX(seq) FROM change_log WHERE tenant=? AND seq > ? GROUP BY table_name",
+        (db.TENANT, _head)
+    ).fetchall()
+    if not rows:
+        return
+    tables = frozenset(t for table, _ in rows for t in (table, *DERIVED.get(table, ())))
+    newest = max(seq for _, seq in rows)
+    _polls.append((_head, newest, tables))
+    _head = newest
+    # Writes from this process already dropped their entries; this catches
+    # the ones made elsewhere (job workers, other servers)
+    cache.invalidate(*tables)
+
+
+def head():
+    # Newest change_log seq for this organization, read at most once per
+    # POLL_INTERVAL whatever the number of sessions asking
+    global _checked_at
+    now = time.monotonic()
+    if _head is None or now - _checked_at >= POLL_INTERVAL:
+        with _lock:
+            if _head is None or now - _checked_at >= POLL_INTERVAL:
+                _poll(_conn())
+                _checked_at = now
+    return _head
+
+
+def changes_since(seq):
+    # -> (newest seq, tables changed after seq). The tables are None when
+    # seq is older than the history kept, i.e. anything may have changed.
+    newest = head()
+    if seq is not None and seq >= newest:
+        return newest, frozenset()
+    with _lock:
+        polls = list(_polls)
+    if seq is None or not polls or seq < polls[0][0]:
+        return newest, None
+    return newest, frozenset().union(*(tables for _, after, tables in polls if after > seq))
+
+
+# ---------------- SECTIONS ----------------
+def fragment(*tables, notice=None):
+    # Decorator for a page section that keeps itself current without full
+    # reruns: it reruns alone every POLL_INTERVAL, and reads that find
+    # nothing new are served from the cache. When one of tables changed
+    # since the session last drew it, the section's queries run again and
+    # notice (if any) is shown as a toast.
+    def decorate(fn):
+        key = f"live_{fn.__module__}_{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def section(*args, **kwargs):
+            seen = st.session_state.get(key)
+            seq, changed = changes_since(seen)
+            if seen is not None and notice and (changed is None or changed & set(tables)):
+                st.toast(notice)
+            st.session_state[key] = seq
+            return fn(*args, **kwargs)
+
+        return st.fragment(section, run_every=POLL_INTERVAL)
+    return decorate
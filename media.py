@@ -1,8 +1,21 @@
 import streamlit as st
-import sqlite3
-import os
+import re
 from datetime import date
 
+import authz
+import bootstrap
+import bulk
+import cache
+import db
+import diagnostics
+import images
+import jobs
+import live
+import migrations
+import search
+import storage
+import writer
+
 # --------------------------------------------------
 # PAGE CONFIGURATION
 # --------------------------------------------------
@@ -11,98 +24,74 @@ st.set_page_config(
     layout="wide"
 )
 
-# --------------------------------------------------
-# IMPORTANT NOTE (FOR INTERNSHIP REVIEW)
-# --------------------------------------------------
-# NOTE:
-# Hardcoded admin credentials are used ONLY for demo/testing purposes.
-# In real-world production systems, credentials should be stored securely
-# in a database with password hashing and proper authentication mechanisms.
-
-# Admin Credentials (Demo Only)
-ADMIN_USERNAME = "admin"
-ADMIN_PASSWORD = "admin123"
+bootstrap.init()
 
 # --------------------------------------------------
 # DATABASE CONNECTION
 # --------------------------------------------------
-conn = sqlite3.connect("media.db", check_same_thread=False)
+conn = db.get_connection("media")
 cur = conn.cursor()
 
 # --------------------------------------------------
 # DATABASE TABLES
 # --------------------------------------------------
-cur.execute("""
-CREATE TABLE IF NOT EXISTS press_releases (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    title TEXT NOT NULL,
-    description TEXT NOT NULL,
-    release_date DATE NOT NULL
-)
-""")
+migrations.ensure("media")
 
-cur.execute("""
-CREATE TABLE IF NOT EXISTS media_coverage (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    title TEXT NOT NULL,
-    url TEXT NOT NULL
-)
-""")
+# --------------------------------------------------
+# LIVE SECTIONS
+# --------------------------------------------------
+# Each public section is a live fragment: it picks up an admin's new
+# release, article, image or video within live.POLL_INTERVAL seconds,
+# without rerunning the rest of the page.
+GALLERY_PAGE_SIZE = 24
+VIDEO_PAGE_SIZE = 6
 
-cur.execute("""
-CREATE TABLE IF NOT EXISTS image_gallery (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    image_path TEXT NOT NULL
-)
-""")
+YOUTUBE_ID = re.compile(r"(?:youtube\.com/(?:watch\?(?:.*&)?v=|embed/|shorts/)|youtu\.be/)([\w-]{11})")
 
-cur.execute("""
-CREATE TABLE IF NOT EXISTS videos (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    video_url TEXT NOT NULL
-)
-""")
 
-conn.commit()
+def fetch_window(table, columns, after_id, limit):
+    # One window of rows after the id cursor, and whether more follow.
+    # Fragments rerun on their own thread, so take a fresh cursor here.
+    rows = cache.fetchall(
+        db.get_connection("media").cursor(), table,
+        f"SELECT id, {columns} FROM {table} WHERE tenant = ? AND id > ? ORDER BY id LIMIT ?",
+        (db.TENANT, after_id, limit + 1)
+    )
+    return rows[:limit], len(rows) > limit
 
-# --------------------------------------------------
-# SESSION STATE
-# --------------------------------------------------
-if "admin_logged" not in st.session_state:
-    st.session_state.admin_logged = False
 
-# --------------------------------------------------
-# ADMIN LOGIN
-# --------------------------------------------------
-def admin_login():
-    st.subheader("🔐 Admin Login")
+def pager(key, rows, has_next):
+    # Buttons move the cursor in callbacks, so the fragment's own rerun
+    # already renders the new window
+    cursors = st.session_state.setdefault(key, [0])
+    col1, col2, col3 = st.columns([1, 2, 1])
+    col1.button("⬅ Previous", key=f"{key}_prev", disabled=len(cursors) == 1,
+                on_click=cursors.pop)
+    col2.caption(f"Page {len(cursors)}")
+    col3.button("Next ➡", key=f"{key}_next", disabled=not has_next,
+                on_click=cursors.append, args=(rows[-1][0],))
 
-    username = st.text_input("Username")
-    password = st.text_input("Password", type="password")
 
-    if st.button("Login"):
-        if username == ADMIN_USERNAME and password == ADMIN_PASSWORD:
-            st.session_state.admin_logged = True
-            st.success("Admin login successful")
-        else:
-            st.error("Invalid username or password")
+def play_video(video_id):
+    st.session_state.playing_video = video_id
 
-# --------------------------------------------------
-# FRONTEND: MEDIA PAGE
-# --------------------------------------------------
-def media_page():
-    st.title("NGO Media Page")
 
-    st.markdown("""
-    **Welcome to our Media Page.**  
-    This page highlights our NGO’s activities, achievements, and impact through
-    press releases, media coverage, images, and videos.
-    """)
+def video_thumbnail(url):
+    match = YOUTUBE_ID.search(url)
+    return f"https://img.youtube.com/vi/{match.group(1)}/hqdefault.jpg" if match else None
 
-    # ---------------- PRESS RELEASES ----------------
-    st.header("📰 Press Releases")
-    cur.execute("SELECT title, description, release_date FROM press_releases ORDER BY release_date DESC")
-    releases = cur.fetchall()
+
+@live.fragment("press_releases", notice="📰 Press releases were updated")
+def press_releases_section(release_search):
+    if release_search.strip():
+        releases = [r[1:] for r in search.search_press_releases(release_search)]
+    else:
+        releases = cache.fetchall(
+            db.get_connection("media").cursor(), "press_releases",
+            "SELECT title, description, release_date FROM press_releases WHERE tenant=? "
+            "ORDER BY release_date DESC",
+            (db.TENANT,)
+        )
 
     if releases:
         for pr in releases:
@@ -110,13 +99,18 @@ def media_page():
             st.write(pr[1])
             st.caption(f"Date: {pr[2]}")
             st.divider()
+    elif release_search.strip():
+        st.info("No matching press releases.")
     else:
         st.info("No press releases available.")
 
-    # ---------------- MEDIA COVERAGE ----------------
-    st.header("🌐 Media Coverage")
-    cur.execute("SELECT title, url FROM media_coverage")
-    coverage = cur.fetchall()
+
+@live.fragment("media_coverage")
+def coverage_section():
+    coverage = cache.fetchall(
+        db.get_connection("media").cursor(), "media_coverage",
+        "SELECT title, url FROM media_coverage WHERE tenant=?", (db.TENANT,)
+    )
 
     if coverage:
         for mc in coverage:
@@ -124,31 +118,239 @@ def media_page():
     else:
         st.info("No media coverage available.")
 
-    # ---------------- IMAGE GALLERY ----------------
-    st.header("🖼 Image Gallery")
-    cur.execute("SELECT image_path FROM image_gallery")
-    images = [img[0] for img in cur.fetchall()]
 
-    if images:
-        st.image(images, width=250)
-    else:
+@live.fragment("image_gallery")
+def gallery_section():
+    cursors = st.session_state.setdefault("gallery_cursors", [0])
+    rows, has_next = fetch_window("image_gallery", "image_path, variants", cursors[-1], GALLERY_PAGE_SIZE)
+
+    if not rows:
         st.info("No images uploaded yet.")
+        return
 
-    # ---------------- VIDEOS ----------------
-    st.header("🎥 Videos")
-    cur.execute("SELECT video_url FROM videos")
-    videos = cur.fetchall()
+    st.image([images.pick(img[1], img[2], 250) for img in rows], width=250)
+    pager("gallery_cursors", rows, has_next)
 
-    if videos:
-        for v in videos:
-            st.video(v[0])
-    else:
+
+@live.fragment("videos")
+def videos_section():
+    cursors = st.session_state.setdefault("video_cursors", [0])
+    rows, has_next = fetch_window("videos", "video_url", cursors[-1], VIDEO_PAGE_SIZE)
+
+    if not rows:
         st.info("No videos available.")
+        return
+
+    # Only the clicked video gets a real player; the rest are thumbnails
+    playing = st.session_state.get("playing_video")
+    cols = st.columns(3)
+    for i, (video_id, url) in enumerate(rows):
+        with cols[i % 3]:
+            if video_id == playing:
+                st.video(url)
+                continue
+            thumbnail = video_thumbnail(url)
+            if thumbnail:
+                st.image(thumbnail)
+            else:
+                st.caption(url)
+            st.button("▶ Play", key=f"play_{video_id}", on_click=play_video, args=(video_id,))
+
+    pager("video_cursors", rows, has_next)
+
+
+# --------------------------------------------------
+# FRONTEND: MEDIA PAGE
+# --------------------------------------------------
+def media_page():
+    st.title("NGO Media Page")
+
+    st.markdown("""
+    **Welcome to our Media Page.**  
+    This page highlights our NGO’s activities, achievements, and impact through
+    press releases, media coverage, images, and videos.
+    """)
+
+    # ---------------- PRESS RELEASES ----------------
+    st.header("📰 Press Releases")
+    release_search = st.text_input("🔍 Search press releases")
+    press_releases_section(release_search)
+
+    # ---------------- MEDIA COVERAGE ----------------
+    st.header("🌐 Media Coverage")
+    coverage_section()
+
+    # ---------------- IMAGE GALLERY ----------------
+    st.header("🖼 Image Gallery")
+    gallery_section()
+
+    # ---------------- VIDEOS ----------------
+    st.header("🎥 Videos")
+    videos_section()
 
     # ---------------- CONTACT ----------------
     st.markdown("---")
     st.markdown("📩 **Contact for Media:** media@ngo.org")
 
+# --------------------------------------------------
+# ADMIN: BATCH EDIT & DELETE
+# --------------------------------------------------
+# table -> columns editable inline (all NOT NULL)
+EDITABLE = {
+    "press_releases": ("title", "description", "release_date"),
+    "media_coverage": ("title", "url"),
+    "videos": ("video_url",),
+}
+# table -> column holding a stored blob, released when its row is deleted
+BLOBS = {"image_gallery": "image_path"}
+
+
+def apply_changes(table, changes, deleted_ids):
+    # Every edit and delete as one mutation, so they commit together and
+    # refresh the cache once -> blobs released, or None while the write is
+    # still pending. Only rows this delete actually removed give up their
+    # blob: a row another admin already deleted must not drop a reference
+    # twice.
+    def mutate(conn):
+        for row_id, values in changes:
+            conn.execute(
+                f"UPDATE {table} SET {', '.join(f'{c}=?' for c in values)} WHERE id=? AND tenant=?",
+                (*values.values(), row_id, db.TENANT)
+            )
+        if table not in BLOBS:
+            conn.executemany(
+                f"DELETE FROM {table} WHERE id=? AND tenant=?", [(i, db.TENANT) for i in deleted_ids]
+            )
+            return []
+        removed = []
+        for row_id in deleted_ids:
+            removed += [r[0] for r in conn.execute(
+                f"DELETE FROM {table} WHERE id=? AND tenant=? RETURNING {BLOBS[table]}",
+                (row_id, db.TENANT)
+            )]
+        return removed
+
+    future = writer.submit("media", mutate, invalidate=(table,))
+    saved, released = writer.wait(future)
+    if not saved:
+        # The blobs go once the delete commits, from the writer thread
+        future.add_done_callback(lambda f: f.exception() or _release(f.result()))
+        return None
+    _release(released)
+    return released
+
+
+def _release(paths):
+    # release() takes its own write lock, so not inside the mutation
+    for path in paths:
+        storage.release(path)
+
+
+def show_result(key):
+    result = st.session_state.pop(key, None)
+    if result:
+        getattr(st, result[0])(result[1])
+
+
+def save_edits(table, ids, editor_key):
+    # Callback: runs before the fragment reruns, so it renders fresh rows
+    changes, deleted = [], []
+    for index, values in st.session_state[editor_key]["edited_rows"].items():
+        values = dict(values)
+        row_id = ids[int(index)]
+        if values.pop("delete", False):
+            deleted.append(row_id)
+            continue
+        for column, value in values.items():
+            value = str(value or "").strip()
+            if not value:
+                st.session_state[f"{table}_result"] = ("error", f"{column} cannot be empty")
+                return
+            if column == "release_date":
+                try:
+                    value = date.fromisoformat(value[:10]).isoformat()
+                except ValueError:
+                    st.session_state[f"{table}_result"] = ("error", f"Invalid date: {value}")
+                    return
+            values[column] = value
+        if values:
+            changes.append((row_id, values))
+
+    if not changes and not deleted:
+        return
+    saved = apply_changes(table, changes, deleted) is not None
+    st.session_state[f"{table}_editor_version"] += 1
+    st.session_state[f"{table}_result"] = (
+        ("success", f"Updated {len(changes)}, deleted {len(deleted)}") if saved else ("warning", writer.PENDING)
+    )
+
+
+@st.fragment
+def manage_table(table):
+    version = st.session_state.setdefault(f"{table}_editor_version", 0)
+    editor_key = f"{table}_editor_{version}"
+    columns = EDITABLE[table]
+
+    show_result(f"{table}_result")
+    rows = db.get_connection("media").execute(
+        f"SELECT id, {', '.join(columns)} FROM {table} WHERE tenant=? ORDER BY id", (db.TENANT,)
+    ).fetchall()
+    if not rows:
+        st.info("Nothing here yet.")
+        return
+
+    st.data_editor(
+        [{"id": r[0], **dict(zip(columns, r[1:])), "delete": False} for r in rows],
+        key=editor_key,
+        disabled=["id"],
+        hide_index=True,
+        column_config={"delete": st.column_config.CheckboxColumn("Delete")},
+    )
+    st.button(
+        "Apply changes", key=f"{table}_apply",
+        on_click=save_edits, args=(table, [r[0] for r in rows], editor_key)
+    )
+
+
+def delete_images(ids):
+    selected = [img_id for img_id in ids if st.session_state.get(f"img_sel_{img_id}")]
+    if not selected:
+        return
+    released = apply_changes("image_gallery", [], selected)
+    for img_id in selected:
+        del st.session_state[f"img_sel_{img_id}"]
+    if released is None:
+        st.session_state.image_gallery_result = ("warning", writer.PENDING)
+        return
+
+    cursors = st.session_state.admin_gallery_cursors
+    if len(selected) == len(ids) and len(cursors) > 1:
+        cursors.pop()
+    st.session_state.image_gallery_result = ("success", f"Deleted {len(released)} images")
+
+
+@st.fragment
+def manage_gallery():
+    cursors = st.session_state.setdefault("admin_gallery_cursors", [0])
+    show_result("image_gallery_result")
+    rows, has_next = fetch_window("image_gallery", "image_path, variants", cursors[-1], GALLERY_PAGE_SIZE)
+    if not rows:
+        st.info("No images uploaded yet.")
+        return
+
+    cols = st.columns(6)
+    for i, (img_id, path, variants) in enumerate(rows):
+        with cols[i % 6]:
+            st.image(images.pick(path, variants, 150), width=150)
+            st.checkbox("Select", key=f"img_sel_{img_id}")
+
+    st.button(
+        "Delete selected", key="img_delete",
+        on_click=delete_images, args=([r[0] for r in rows],)
+    )
+    pager("admin_gallery_cursors", rows, has_next)
+
+
 # --------------------------------------------------
 # ADMIN DASHBOARD
 # --------------------------------------------------
@@ -159,7 +361,10 @@ def admin_dashboard():
         "Press Releases",
         "Media Coverage",
         "Image Gallery",
-        "Videos"
+        "Videos",
+        "Bulk Import/Export",
+        "Background Jobs",
+        "Diagnostics"
     ])
 
     # ---------------- PRESS RELEASE MANAGEMENT ----------------
@@ -171,22 +376,19 @@ def admin_dashboard():
         release_date = st.date_input("Release Date", date.today())
 
         if st.button("Add Press Release"):
-            cur.execute(
-                "INSERT INTO press_releases VALUES (NULL, ?, ?, ?)",
-                (title, description, release_date)
-            )
-            conn.commit()
-            st.success("Press release added successfully")
+            saved, _ = writer.wait(writer.execute(
+                "media",
+                "INSERT INTO press_releases (tenant, title, description, release_date) VALUES (?, ?, ?, ?)",
+                (db.TENANT, title, description, release_date),
+                invalidate=("press_releases",)
+            ))
+            if saved:
+                st.success("Press release added successfully")
+            else:
+                st.warning(writer.PENDING)
 
         st.subheader("Existing Press Releases")
-        cur.execute("SELECT id, title, release_date FROM press_releases")
-        for pr in cur.fetchall():
-            col1, col2 = st.columns([4, 1])
-            col1.write(f"{pr[1]} ({pr[2]})")
-            if col2.button("Delete", key=f"pr_{pr[0]}"):
-                cur.execute("DELETE FROM press_releases WHERE id=?", (pr[0],))
-                conn.commit()
-                st.experimental_rerun()
+        manage_table("press_releases")
 
     # ---------------- MEDIA COVERAGE MANAGEMENT ----------------
     with tabs[1]:
@@ -196,21 +398,19 @@ def admin_dashboard():
         mc_url = st.text_input("Media URL")
 
         if st.button("Add Media Coverage"):
-            cur.execute(
-                "INSERT INTO media_coverage VALUES (NULL, ?, ?)",
-                (mc_title, mc_url)
-            )
-            conn.commit()
-            st.success("Media coverage added successfully")
-
-        cur.execute("SELECT id, title FROM media_coverage")
-        for mc in cur.fetchall():
-            col1, col2 = st.columns([4, 1])
-            col1.write(mc[1])
-            if col2.button("Delete", key=f"mc_{mc[0]}"):
-                cur.execute("DELETE FROM media_coverage WHERE id=?", (mc[0],))
-                conn.commit()
-                st.experimental_rerun()
+            saved, _ = writer.wait(writer.execute(
+                "media",
+                "INSERT INTO media_coverage (tenant, title, url) VALUES (?, ?, ?)",
+                (db.TENANT, mc_title, mc_url),
+                invalidate=("media_coverage",)
+            ))
+            if saved:
+                st.success("Media coverage added successfully")
+            else:
+                st.warning(writer.PENDING)
+
+        st.subheader("Existing Media Coverage")
+        manage_table("media_coverage")
 
     # ---------------- IMAGE GALLERY MANAGEMENT ----------------
     with tabs[2]:
@@ -218,28 +418,26 @@ def admin_dashboard():
 
         image = st.file_uploader("Choose an image", type=["jpg", "png", "jpeg"])
 
-        if image:
-            os.makedirs("uploads/gallery", exist_ok=True)
-            path = f"uploads/gallery/{image.name}"
-
-            with open(path, "wb") as f:
-                f.write(image.getbuffer())
-
-            cur.execute(
-                "INSERT INTO image_gallery VALUES (NULL, ?)",
-                (path,)
-            )
-            conn.commit()
-            st.success("Image uploaded successfully")
-
-        cur.execute("SELECT id, image_path FROM image_gallery")
-        for img in cur.fetchall():
-            col1, col2 = st.columns([4, 1])
-            col1.image(img[1], width=150)
-            if col2.button("Delete", key=f"img_{img[0]}"):
-                cur.execute("DELETE FROM image_gallery WHERE id=?", (img[0],))
-                conn.commit()
-                st.experimental_rerun()
+        # The uploader keeps its file across reruns, so only store it once
+        if image and st.session_state.get("gallery_upload_id") != image.file_id:
+            st.session_state.gallery_upload_id = image.file_id
+            path = storage.store(image, image.name)
+
+            saved, image_id = writer.wait(writer.execute(
+                "media",
+                "INSERT INTO image_gallery (tenant, image_path) VALUES (?, ?)",
+                (db.TENANT, path),
+                invalidate=("image_gallery",)
+            ))
+            if saved:
+                images.schedule("media", "image_gallery", image_id, path)
+                st.success("Image uploaded successfully")
+            else:
+                # Pages show the original until `python images.py` builds its variants
+                st.warning(writer.PENDING)
+
+        st.subheader("Existing Images")
+        manage_gallery()
 
     # ---------------- VIDEO MANAGEMENT ----------------
     with tabs[3]:
@@ -248,21 +446,34 @@ def admin_dashboard():
         video_url = st.text_input("Video URL (YouTube, etc.)")
 
         if st.button("Add Video"):
-            cur.execute(
-                "INSERT INTO videos VALUES (NULL, ?)",
-                (video_url,)
-            )
-            conn.commit()
-            st.success("Video added successfully")
-
-        cur.execute("SELECT id, video_url FROM videos")
-        for v in cur.fetchall():
-            col1, col2 = st.columns([4, 1])
-            col1.write(v[1])
-            if col2.button("Delete", key=f"vid_{v[0]}"):
-                cur.execute("DELETE FROM videos WHERE id=?", (v[0],))
-                conn.commit()
-                st.experimental_rerun()
+            saved, _ = writer.wait(writer.execute(
+                "media",
+                "INSERT INTO videos (tenant, video_url) VALUES (?, ?)",
+                (db.TENANT, video_url),
+                invalidate=("videos",)
+            ))
+            if saved:
+                st.success("Video added successfully")
+            else:
+                st.warning(writer.PENDING)
+
+        st.subheader("Existing Videos")
+        manage_table("videos")
+
+    # ---------------- BULK IMPORT / EXPORT ----------------
+    with tabs[4]:
+        if authz.require("bulk.import"):
+            bulk.render(["press_releases", "media_coverage", "image_gallery", "videos"])
+
+    # ---------------- BACKGROUND JOBS ----------------
+    with tabs[5]:
+        if authz.require("jobs.run"):
+            jobs.render()
+
+    # ---------------- QUERY DIAGNOSTICS ----------------
+    with tabs[6]:
+        if authz.require("diagnostics.view"):
+            diagnostics.render()
 
 # --------------------------------------------------
 # MAIN NAVIGATION
@@ -271,8 +482,7 @@ menu = st.sidebar.radio("Navigation", ["Media Page", "Admin"])
 
 if menu == "Media Page":
     media_page()
-else:
-    if st.session_state.admin_logged:
-        admin_dashboard()
-    else:
-        admin_login()
+# Admins sign in with their appauth.py account; the media_manager or
+# super_admin role (see authz.py) opens the dashboard
+elif authz.require("media.edit"):
+    admin_dashboard()
@@ -0,0 +1,685 @@
+import threading
+
+import db
+
+
+def change_log(tables):
+    # Append-only log of content changes with a monotonic sequence number,
+    # written by triggers on every listed table
+    statements = [
+        """
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            op TEXT NOT NULL,
+            row_id INTEGER,
+            changed_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_change_log_table ON change_log (table_name, seq)",
+    ]
+    for table in tables:
+        for event, row in (("INSERT", "new"), ("UPDATE", "new"), ("DELETE", "old")):
+            statements.append(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_change_{event.lower()} AFTER {event} ON {table} BEGIN
+                INSERT INTO change_log (table_name, op, row_id) VALUES ('{table}', '{event}', {row}.rowid);
+            END
+            """)
+    return statements
+
+
+def tenant_change_log(tables, when=None):
+    # Recreate the change_log triggers of tables so each entry records the
+    # organization of its row. when: {(table, event): condition} for
+    # triggers that only log some changes
+    when = when or {}
+    statements = []
+    for table in tables:
+        for event, row in (("INSERT", "new"), ("UPDATE", "new"), ("DELETE", "old")):
+            condition = when.get((table, event))
+            statements += [
+                f"DROP TRIGGER IF EXISTS {table}_change_{event.lower()}",
+                f"""
+                CREATE TRIGGER {table}_change_{event.lower()} AFTER {event} ON {table}
+                {f"WHEN {condition} " if condition else ""}BEGIN
+                    INSERT INTO change_log (tenant, table_name, op, row_id)
+                    VALUES ({row}.tenant, '{table}', '{event}', {row}.rowid);
+                END
+                """,
+            ]
+    return statements
+
+
+def add_tenant(tables):
+    # Tenant column on content tables; rows from before multi-tenancy
+    # belong to the 'default' organization
+    return [
+        f"ALTER TABLE {table} ADD COLUMN tenant TEXT NOT NULL DEFAULT 'default'"
+        for table in tables
+    ] + [
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_tenant ON {table} (tenant, id)"
+        for table in tables
+    ]
+
+
+def tenant_counters(counters, rows):
+    # Rebuild a key/value counter table keyed by (tenant, key). rows are
+    # (key expression, source table, WHERE clause) for the initial counts.
+    return [
+        f"DROP TABLE IF EXISTS {counters}",
+        f"""
+        CREATE TABLE {counters} (
+            tenant TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value INTEGER NOT NULL,
+            PRIMARY KEY (tenant, key)
+        ) WITHOUT ROWID
+        """,
+    ] + [
+        f"""
+        INSERT INTO {counters} (tenant, key, value)
+        SELECT tenant, {key}, COUNT(*) FROM {table} WHERE {where} GROUP BY tenant, {key}
+        """
+        for key, table, where in rows
+    ]
+
+
+# ---------------- MIGRATIONS ----------------
+# Versioned schema and seed steps for each database. Applied versions are
+# recorded in schema_migrations, so every step runs exactly once per
+# database, and ensure() is memoized so reruns skip this module entirely.
+MIGRATIONS = {
+    "projects": [
+        (1, [
+            """
+            CREATE TABLE IF NOT EXISTS projects (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT,
+                description TEXT,
+                status TEXT,
+                start_date TEXT,
+                end_date TEXT,
+                location TEXT
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS project_images (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                project_id INTEGER,
+                image_path TEXT
+            )
+            """,
+        ]),
+        (2, [
+            "CREATE INDEX IF NOT EXISTS idx_project_images_project_id ON project_images (project_id)",
+            "CREATE INDEX IF NOT EXISTS idx_projects_status ON projects (status, id)",
+        ]),
+        # Resized variants of each image as JSON {width: path}
+        (3, [
+            "ALTER TABLE project_images ADD COLUMN variants TEXT",
+        ]),
+        # Full-text index over projects, kept in sync by triggers
+        (4, [
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS projects_fts USING fts5(
+                title, description, location,
+                content='projects', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS projects_fts_insert AFTER INSERT ON projects BEGIN
+                INSERT INTO projects_fts (rowid, title, description, location)
+                VALUES (new.id, new.title, new.description, new.location);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS projects_fts_delete AFTER DELETE ON projects BEGIN
+                INSERT INTO projects_fts (projects_fts, rowid, title, description, location)
+                VALUES ('delete', old.id, old.title, old.description, old.location);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS projects_fts_update
+            AFTER UPDATE OF title, description, location ON projects BEGIN
+                INSERT INTO projects_fts (projects_fts, rowid, title, description, location)
+                VALUES ('delete', old.id, old.title, old.description, old.location);
+                INSERT INTO projects_fts (rowid, title, description, location)
+                VALUES (new.id, new.title, new.description, new.location);
+            END
+            """,
+            "INSERT INTO projects_fts (projects_fts) VALUES ('rebuild')",
+        ]),
+        # Precomputed project counters for the ngo.py home page, kept up
+        # to date by triggers, plus admin-entered statistics
+        (5, [
+            """
+            CREATE TABLE IF NOT EXISTS project_stats (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            ) WITHOUT ROWID
+            """,
+            "INSERT INTO project_stats (key, value) SELECT 'total', COUNT(*) FROM projects",
+            """
+            INSERT INTO project_stats (key, value)
+            SELECT 'status:' || status, COUNT(*) FROM projects WHERE status IS NOT NULL GROUP BY status
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS project_stats_insert AFTER INSERT ON projects BEGIN
+                UPDATE project_stats SET value = value + 1 WHERE key = 'total';
+                INSERT INTO project_stats (key, value) VALUES ('status:' || new.status, 1)
+                ON CONFLICT (key) DO UPDATE SET value = value + 1;
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS project_stats_delete AFTER DELETE ON projects BEGIN
+                UPDATE project_stats SET value = value - 1
+                WHERE key IN ('total', 'status:' || old.status);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS project_stats_status
+            AFTER UPDATE OF status ON projects WHEN old.status IS NOT new.status BEGIN
+                UPDATE project_stats SET value = value - 1 WHERE key = 'status:' || old.status;
+                INSERT INTO project_stats (key, value) VALUES ('status:' || new.status, 1)
+                ON CONFLICT (key) DO UPDATE SET value = value + 1;
+            END
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS stats_overrides (
+                label TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            )
+            """,
+            """
+            INSERT OR IGNORE INTO stats_overrides (label, value)
+            VALUES ('Children Helped', '1200+'), ('Active Volunteers', '300+')
+            """,
+        ]),
+        # Shared, versioned site content for ngo.py (values are JSON)
+        (6, [
+            """
+            CREATE TABLE IF NOT EXISTS site_content (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS content_version (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL
+            )
+            """,
+            """
+            INSERT OR IGNORE INTO site_content (key, value) VALUES
+                ('vision', '"Empowering lives through compassion."'),
+                ('mission', '"Education, healthcare, and social welfare."'),
+                ('initiatives', '["Free Education Program", "Women Empowerment", "Rural Health Support"]')
+            """,
+            "INSERT OR IGNORE INTO content_version (id, version) VALUES (1, 1)",
+        ]),
+        (7, change_log(["projects", "project_images", "stats_overrides", "site_content"])),
+        # Multi-tenancy: per-organization rows, counters, overrides and content
+        (8, add_tenant(["projects", "project_images"]) + [
+            "CREATE INDEX IF NOT EXISTS idx_projects_tenant_status ON projects (tenant, status, id)",
+            "DROP TRIGGER IF EXISTS project_stats_insert",
+            "DROP TRIGGER IF EXISTS project_stats_delete",
+            "DROP TRIGGER IF EXISTS project_stats_status",
+        ] + tenant_counters("project_stats", [
+            ("'total'", "projects", "1"),
+            ("'status:' || status", "projects", "status IS NOT NULL"),
+        ]) + [
+            """
+            CREATE TRIGGER project_stats_insert AFTER INSERT ON projects BEGIN
+                INSERT INTO project_stats (tenant, key, value) VALUES (new.tenant, 'total', 1)
+                ON CONFLICT (tenant, key) DO UPDATE SET value = value + 1;
+                INSERT INTO project_stats (tenant, key, value)
+                SELECT new.tenant, 'status:' || new.status, 1 WHERE new.status IS NOT NULL
+                ON CONFLICT (tenant, key) DO UPDATE SET value = value + 1;
+            END
+            """,
+            """
+            CREATE TRIGGER project_stats_delete AFTER DELETE ON projects BEGIN
+                UPDATE project_stats SET value = value - 1
+                WHERE tenant = old.tenant AND key IN ('total', 'status:' || old.status);
+            END
+            """,
+            """
+            CREATE TRIGGER project_stats_status
+            AFTER UPDATE OF status ON projects WHEN old.status IS NOT new.status BEGIN
+                UPDATE project_stats SET value = value - 1
+                WHERE tenant = old.tenant AND key = 'status:' || old.status;
+                INSERT INTO project_stats (tenant, key, value)
+                SELECT new.tenant, 'status:' || new.status, 1 WHERE new.status IS NOT NULL
+                ON CONFLICT (tenant, key) DO UPDATE SET value = value + 1;
+            END
+            """,
+
+            """
+            CREATE TABLE stats_overrides_new (
+                tenant TEXT NOT NULL DEFAULT 'default',
+                label TEXT NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (tenant, label)
+            )
+            """,
+            "INSERT INTO stats_overrides_new (label, value) SELECT label, value FROM stats_overrides ORDER BY rowid",
+            "DROP TABLE stats_overrides",
+            "ALTER TABLE stats_overrides_new RENAME TO stats_overrides",
+
+            """
+            CREATE TABLE site_content_new (
+                tenant TEXT NOT NULL DEFAULT 'default',
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (tenant, key)
+            )
+            """,
+            "INSERT INTO site_content_new (key, value) SELECT key, value FROM site_content",
+            "DROP TABLE site_content",
+            "ALTER TABLE site_content_new RENAME TO site_content",
+
+            """
+            CREATE TABLE content_version_new (
+                tenant TEXT PRIMARY KEY,
+                version INTEGER NOT NULL
+            ) WITHOUT ROWID
+            """,
+            "INSERT INTO content_version_new (tenant, version) SELECT 'default', version FROM content_version",
+            "DROP TABLE content_version",
+            "ALTER TABLE content_version_new RENAME TO content_version",
+        ] + change_log(["stats_overrides", "site_content"])),
+        # Date-range and location browsing: dates as integer days since
+        # 1970-01-01 (a missing end date means open-ended) and locations
+        # normalized into their own table
+        (9, [
+            "ALTER TABLE projects ADD COLUMN start_day INTEGER "
+            "GENERATED ALWAYS AS (CAST(julianday(start_date) - 2440587.5 AS INTEGER)) VIRTUAL",
+            "ALTER TABLE projects ADD COLUMN end_day INTEGER "
+            "GENERATED ALWAYS AS (CAST(julianday(COALESCE(end_date, '9999-12-31')) - 2440587.5 AS INTEGER)) VIRTUAL",
+            """
+            CREATE TABLE IF NOT EXISTS locations (
+                id INTEGER PRIMARY KEY,
+                tenant TEXT NOT NULL,
+                name TEXT NOT NULL COLLATE NOCASE,
+                UNIQUE (tenant, name)
+            )
+            """,
+            "ALTER TABLE projects ADD COLUMN location_id INTEGER REFERENCES locations(id)",
+            """
+            INSERT OR IGNORE INTO locations (tenant, name)
+            SELECT tenant, trim(location) FROM projects WHERE trim(location) <> '' ORDER BY id
+            """,
+            """
+            UPDATE projects SET location_id = (
+                SELECT id FROM locations l WHERE l.tenant = projects.tenant AND l.name = trim(projects.location)
+            )
+            """,
+            # Interval overlap (start_day <= to AND end_day >= from): range
+            # scan on start_day, end_day checked from the index itself
+            "CREATE INDEX IF NOT EXISTS idx_projects_tenant_span ON projects (tenant, start_day, end_day)",
+            "CREATE INDEX IF NOT EXISTS idx_projects_tenant_location ON projects (tenant, location_id, start_day, end_day)",
+            """
+            CREATE TRIGGER projects_location_insert
+            AFTER INSERT ON projects WHEN trim(new.location) <> '' BEGIN
+                INSERT OR IGNORE INTO locations (tenant, name) VALUES (new.tenant, trim(new.location));
+                UPDATE projects SET location_id = (
+                    SELECT id FROM locations WHERE tenant = new.tenant AND name = trim(new.location)
+                ) WHERE id = new.id;
+            END
+            """,
+            """
+            CREATE TRIGGER projects_location_update AFTER UPDATE OF tenant, location ON projects BEGIN
+                INSERT OR IGNORE INTO locations (tenant, name)
+                SELECT new.tenant, trim(new.location) WHERE trim(new.location) <> '';
+                UPDATE projects SET location_id = (
+                    SELECT id FROM locations WHERE tenant = new.tenant AND name = trim(new.location)
+                ) WHERE id = new.id;
+            END
+            """,
+            # Setting location_id from the triggers above is bookkeeping,
+            # not a content change
+            "DROP TRIGGER IF EXISTS projects_change_update",
+            """
+            CREATE TRIGGER projects_change_update AFTER UPDATE ON projects
+            WHEN old.location_id IS new.location_id OR old.location IS NOT new.location BEGIN
+                INSERT INTO change_log (table_name, op, row_id) VALUES ('projects', 'UPDATE', new.rowid);
+            END
+            """,
+        ]),
+    ],
+    "about": [
+        (1, [
+            "CREATE TABLE IF NOT EXISTS story (text TEXT)",
+            "CREATE TABLE IF NOT EXISTS core_values (value TEXT)",
+            "CREATE TABLE IF NOT EXISTS programs (program TEXT)",
+            "CREATE TABLE IF NOT EXISTS team (name TEXT, role TEXT)",
+            "CREATE TABLE IF NOT EXISTS impact (detail TEXT)",
+        ]),
+        # Seed data, only for tables that are still empty
+        (2, [
+            """
+            INSERT INTO story
+            SELECT 'We are a non-profit organization working for social development.'
+            WHERE NOT EXISTS (SELECT 1 FROM story)
+            """,
+            """
+            INSERT INTO core_values
+            SELECT column1 FROM (VALUES ('Transparency'), ('Empathy'), ('Community Service'))
+            WHERE NOT EXISTS (SELECT 1 FROM core_values)
+            """,
+            """
+            INSERT INTO programs
+            SELECT column1 FROM (VALUES ('Child Education'), ('Free Medical Checkups'), ('Skill Development'))
+            WHERE NOT EXISTS (SELECT 1 FROM programs)
+            """,
+            """
+            INSERT INTO team
+            SELECT column1, column2 FROM (VALUES ('Amit Kulkarni', 'Director'), ('Pooja Deshmukh', 'Manager'))
+            WHERE NOT EXISTS (SELECT 1 FROM team)
+            """,
+            """
+            INSERT INTO impact
+            SELECT column1 FROM (VALUES ('5,000+ lives impacted'), ('50+ active volunteers'))
+            WHERE NOT EXISTS (SELECT 1 FROM impact)
+            """,
+        ]),
+        # Rebuild the content tables with primary keys
+        (3, [
+            "CREATE TABLE story_new (id INTEGER PRIMARY KEY AUTOINCREMENT, text TEXT)",
+            "INSERT INTO story_new (text) SELECT text FROM story ORDER BY rowid",
+            "DROP TABLE story",
+            "ALTER TABLE story_new RENAME TO story",
+
+            "CREATE TABLE core_values_new (id INTEGER PRIMARY KEY AUTOINCREMENT, value TEXT)",
+            "INSERT INTO core_values_new (value) SELECT value FROM core_values ORDER BY rowid",
+            "DROP TABLE core_values",
+            "ALTER TABLE core_values_new RENAME TO core_values",
+
+            "CREATE TABLE programs_new (id INTEGER PRIMARY KEY AUTOINCREMENT, program TEXT)",
+            "INSERT INTO programs_new (program) SELECT program FROM programs ORDER BY rowid",
+            "DROP TABLE programs",
+            "ALTER TABLE programs_new RENAME TO programs",
+
+            "CREATE TABLE team_new (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, role TEXT)",
+            "INSERT INTO team_new (name, role) SELECT name, role FROM team ORDER BY rowid",
+            "DROP TABLE team",
+            "ALTER TABLE team_new RENAME TO team",
+
+            "CREATE TABLE impact_new (id INTEGER PRIMARY KEY AUTOINCREMENT, detail TEXT)",
+            "INSERT INTO impact_new (detail) SELECT detail FROM impact ORDER BY rowid",
+            "DROP TABLE impact",
+            "ALTER TABLE impact_new RENAME TO impact",
+        ]),
+        (4, change_log(["story", "core_values", "programs", "team", "impact"])),
+        (5, add_tenant(["story", "core_values", "programs", "team", "impact"])),
+    ],
+    "media": [
+        (1, [
+            """
+            CREATE TABLE IF NOT EXISTS press_releases (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT NOT NULL,
+                description TEXT NOT NULL,
+                release_date DATE NOT NULL
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS media_coverage (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT NOT NULL,
+                url TEXT NOT NULL
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS image_gallery (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                image_path TEXT NOT NULL
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS videos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                video_url TEXT NOT NULL
+            )
+            """,
+        ]),
+        (2, [
+            "ALTER TABLE image_gallery ADD COLUMN variants TEXT",
+        ]),
+        # Full-text index over press releases, kept in sync by triggers
+        (3, [
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS press_releases_fts USING fts5(
+                title, description,
+                content='press_releases', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS press_releases_fts_insert AFTER INSERT ON press_releases BEGIN
+                INSERT INTO press_releases_fts (rowid, title, description)
+                VALUES (new.id, new.title, new.description);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS press_releases_fts_delete AFTER DELETE ON press_releases BEGIN
+                INSERT INTO press_releases_fts (press_releases_fts, rowid, title, description)
+                VALUES ('delete', old.id, old.title, old.description);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS press_releases_fts_update
+            AFTER UPDATE OF title, description ON press_releases BEGIN
+                INSERT INTO press_releases_fts (press_releases_fts, rowid, title, description)
+                VALUES ('delete', old.id, old.title, old.description);
+                INSERT INTO press_releases_fts (rowid, title, description)
+                VALUES (new.id, new.title, new.description);
+            END
+            """,
+            "INSERT INTO press_releases_fts (press_releases_fts) VALUES ('rebuild')",
+        ]),
+        # Precomputed media counters for the ngo.py home page
+        (4, [
+            """
+            CREATE TABLE IF NOT EXISTS media_stats (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            ) WITHOUT ROWID
+            """,
+            """
+            INSERT INTO media_stats (key, value)
+            SELECT 'press_releases', COUNT(*) FROM press_releases
+            UNION ALL SELECT 'media_coverage', COUNT(*) FROM media_coverage
+            UNION ALL SELECT 'image_gallery', COUNT(*) FROM image_gallery
+            UNION ALL SELECT 'videos', COUNT(*) FROM videos
+            """,
+        ] + [
+            f"""
+            CREATE TRIGGER IF NOT EXISTS media_stats_{table}_{event.lower()}
+            AFTER {event} ON {table} BEGIN
+                UPDATE media_stats SET value = value {op} 1 WHERE key = '{table}';
+            END
+            """
+            for table in ("press_releases", "media_coverage", "image_gallery", "videos")
+            for event, op in (("INSERT", "+"), ("DELETE", "-"))
+        ]),
+        (5, change_log(["press_releases", "media_coverage", "image_gallery", "videos"])),
+        (6, add_tenant(["press_releases", "media_coverage", "image_gallery", "videos"]) + [
+            "CREATE INDEX IF NOT EXISTS idx_press_releases_tenant_date ON press_releases (tenant, release_date)",
+        ] + [
+            f"DROP TRIGGER IF EXISTS media_stats_{table}_{event}"
+            for table in ("press_releases", "media_coverage", "image_gallery", "videos")
+            for event in ("insert", "delete")
+        ] + tenant_counters("media_stats", [
+            (f"'{table}'", table, "1")
+            for table in ("press_releases", "media_coverage", "image_gallery", "videos")
+        ]) + [
+            f"""
+            CREATE TRIGGER media_stats_{table}_insert AFTER INSERT ON {table} BEGIN
+                INSERT INTO media_stats (tenant, key, value) VALUES (new.tenant, '{table}', 1)
+                ON CONFLICT (tenant, key) DO UPDATE SET value = value + 1;
+            END
+            """
+            for table in ("press_releases", "media_coverage", "image_gallery", "videos")
+        ] + [
+            f"""
+            CREATE TRIGGER media_stats_{table}_delete AFTER DELETE ON {table} BEGIN
+                UPDATE media_stats SET value = value - 1 WHERE tenant = old.tenant AND key = '{table}';
+            END
+            """
+            for table in ("press_releases", "media_coverage", "image_gallery", "videos")
+        ]),
+    ],
+    # Organization of each change_log entry, so open pages polling for
+    # changes (live.py) only hear about their own. Replaces triggers of the
+    # three content schemas above, so it must be applied after them.
+    "changes": [
+        (1, [
+            "ALTER TABLE change_log ADD COLUMN tenant TEXT NOT NULL DEFAULT 'default'",
+            "CREATE INDEX IF NOT EXISTS idx_change_log_tenant ON change_log (tenant, seq)",
+        ] + tenant_change_log(
+            [
+                "projects", "project_images", "stats_overrides", "site_content",
+                "story", "core_values", "programs", "team", "impact",
+                "press_releases", "media_coverage", "image_gallery", "videos",
+            ],
+            when={("projects", "UPDATE"): "old.location_id IS new.location_id OR old.location IS NOT new.location"},
+        )),
+    ],
+    "users": [
+        (1, [
+            """
+            CREATE TABLE IF NOT EXISTS users (
+                username TEXT PRIMARY KEY,
+                password_hash TEXT NOT NULL,
+                created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+        ]),
+        # Comma-separated admin roles (see authz.py); new accounts have none
+        (2, ["ALTER TABLE users ADD COLUMN roles TEXT NOT NULL DEFAULT ''"]),
+    ],
+    "sessions": [
+        (1, [
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                id TEXT PRIMARY KEY,
+                scope TEXT NOT NULL,
+                username TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            ) WITHOUT ROWID
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions (expires_at)",
+            """
+            CREATE TABLE IF NOT EXISTS session_secret (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                secret TEXT NOT NULL
+            )
+            """,
+        ]),
+        # Address a session was issued to; its token is refused elsewhere
+        (2, ["ALTER TABLE sessions ADD COLUMN client TEXT"]),
+        # First session id of a login; every token rotated or branched
+        # from it shares it, and revoking one token ends them all
+        (3, [
+            "ALTER TABLE sessions ADD COLUMN login TEXT",
+            "UPDATE sessions SET login = id WHERE login IS NULL",
+            "CREATE INDEX IF NOT EXISTS idx_sessions_login ON sessions (login)",
+        ]),
+    ],
+    "storage": [
+        (1, [
+            """
+            CREATE TABLE IF NOT EXISTS blobs (
+                path TEXT PRIMARY KEY,
+                refs INTEGER NOT NULL
+            ) WITHOUT ROWID
+            """,
+        ]),
+    ],
+    # Background jobs run by jobs.py worker processes; times are epoch seconds
+    "jobs": [
+        (1, [
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY,
+                tenant TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                invalidate TEXT,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                progress REAL,
+                message TEXT,
+                result TEXT,
+                error TEXT,
+                worker INTEGER,
+                heartbeat REAL,
+                created_at REAL NOT NULL,
+                run_after REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs (status, run_after, id)",
+            "CREATE INDEX IF NOT EXISTS idx_jobs_tenant ON jobs (tenant, id)",
+            """
+            CREATE TABLE IF NOT EXISTS job_workers (
+                pid INTEGER PRIMARY KEY,
+                heartbeat REAL NOT NULL,
+                started_at REAL NOT NULL
+            )
+            """,
+        ]),
+    ],
+}
+
+_lock = threading.Lock()
+_done = set()
+
+
+# ---------------- RUNNER ----------------
+def ensure(name):
+    if name in _done:
+        return
+    with _lock:
+        if name not in _done:
+            migrate(name)
+            _done.add(name)
+
+
+def migrate(name, conn=None):
+    # conn: another database to bring up to date, e.g. a legacy file
+    if conn is None:
+        conn = db.get_connection(name)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        app TEXT NOT NULL,
+        version INTEGER NOT NULL,
+        applied_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (app, version)
+    )
+    """)
+
+    for version, statements in MIGRATIONS[name]:
+        # BEGIN IMMEDIATE takes the write lock, so two processes starting
+        # together cannot both apply the same version.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            applied = conn.execute(
+                "SELECT 1 FROM schema_migrations WHERE app=? AND version=?",
+                (name, version)
+            ).fetchone()
+            if not applied:
+                for sql in statements:
+                    conn.execute(sql)
+                conn.execute(
+                    "INSERT INTO schema_migrations (app, version) VALUES (?, ?)",
+                    (name, version)
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
@@ -1,5 +1,12 @@
 import streamlit as st
 
+import authz
+import bootstrap
+import content_store
+import impact
+import live
+import writer
+
 # ---------------- PAGE CONFIG ----------------
 st.set_page_config(
     page_title="NGO Management System",
@@ -7,39 +14,23 @@ st.set_page_config(
     layout="wide"
 )
 
-# ---------------- SESSION STATE ----------------
-st.session_state.setdefault("vision", "Empowering lives through compassion.")
-st.session_state.setdefault("mission", "Education, healthcare, and social welfare.")
-st.session_state.setdefault("stats", {
-    "Children Helped": "1200+",
-    "Active Volunteers": "300+",
-    "Ongoing Projects": "45+"
-})
-st.session_state.setdefault("initiatives", [
-    "Free Education Program",
-    "Women Empowerment",
-    "Rural Health Support"
-])
+bootstrap.init()
+
+# ---------------- SHARED CONTENT ----------------
+# Vision, mission and initiatives live in one process-wide store; each
+# session only remembers which version it last saw.
+def sync_content():
+    version, current = content_store.snapshot()
+    if st.session_state.get("content_version") not in (None, version):
+        st.toast("Page content was updated")
+    st.session_state.content_version = version
+    return version, current
+
+
+content_version, content = sync_content()
 
 # ---------------- CSS ----------------
-st.markdown("""
-<style>
-.header {
-    font-size: 42px;
-    font-weight: bold;
-    text-align: center;
-    color: #1e8449;
-}
-
-.card {
-    background: white;
-    padding: 20px;
-    border-radius: 12px;
-    box-shadow: 0 4px 8px rgba(0,0,0,0.08);
-    margin-bottom: 20px;
-}
-</style>
-""", unsafe_allow_html=True)
+bootstrap.stylesheet("ngo.css")
 
 # ---------------- SIDEBAR ----------------
 st.sidebar.title("🌍 NGO Panel")
@@ -48,42 +39,53 @@ page = st.sidebar.radio(
     ["Home", "Admin"]
 )
 
-# ================= HOME PAGE =================
-if page == "Home":
-    st.markdown('<div class="header">Helping Hands NGO</div>', unsafe_allow_html=True)
-    st.write("")
-
+# ---------------- LIVE HOME SECTION ----------------
+# Content, statistics and initiatives redraw on their own when an admin
+# changes them, without rerunning the page
+@live.fragment("site_content", "stats_overrides", "project_stats", "media_stats")
+def home_section():
+    _, content = sync_content()
     col1, col2 = st.columns(2)
 
     with col1:
         st.markdown('<div class="card">', unsafe_allow_html=True)
         st.subheader("🌟 Vision")
-        st.write(st.session_state.vision)
+        st.write(content["vision"])
         st.markdown('</div>', unsafe_allow_html=True)
 
     with col2:
         st.markdown('<div class="card">', unsafe_allow_html=True)
         st.subheader("🎯 Mission")
-        st.write(st.session_state.mission)
+        st.write(content["mission"])
         st.markdown('</div>', unsafe_allow_html=True)
 
     st.markdown('<div class="card">', unsafe_allow_html=True)
     st.subheader("📊 Impact Statistics")
-    cols = st.columns(len(st.session_state.stats))
-    for col, (k, v) in zip(cols, st.session_state.stats.items()):
-        col.metric(k, v)
+    stats = impact.impact_stats()
+    if stats:
+        cols = st.columns(len(stats))
+        for col, (k, v) in zip(cols, stats.items()):
+            col.metric(k, v)
     st.markdown('</div>', unsafe_allow_html=True)
 
     st.markdown('<div class="card">', unsafe_allow_html=True)
     st.subheader("🚀 Our Initiatives")
-    for item in st.session_state.initiatives:
+    for item in content["initiatives"]:
         st.write("✔️", item)
     st.markdown('</div>', unsafe_allow_html=True)
 
+
+# ================= HOME PAGE =================
+if page == "Home":
+    st.markdown('<div class="header">Helping Hands NGO</div>', unsafe_allow_html=True)
+    st.write("")
+
+    home_section()
+
     st.info("📩 Contact us at: support@helpinghands.org")
 
 # ================= ADMIN PAGE =================
-elif page == "Admin":
+elif page == "Admin" and authz.require("home.edit"):
     st.markdown('<div class="header">Admin Dashboard</div>', unsafe_allow_html=True)
 
     tabs = st.tabs(["Vision & Mission", "Statistics", "Initiatives"])
@@ -91,13 +93,22 @@ elif page == "Admin":
     # -------- TAB 1 --------
     with tabs[0]:
         st.subheader("Edit Vision & Mission")
-        new_vision = st.text_area("Vision", st.session_state.vision)
-        new_mission = st.text_area("Mission", st.session_state.mission)
+        new_vision = st.text_area("Vision", content["vision"])
+        new_mission = st.text_area("Mission", content["mission"])
 
         if st.button("Update"):
-            st.session_state.vision = new_vision
-            st.session_state.mission = new_mission
-            st.success("Updated successfully")
+            try:
+                saved = content_store.update(
+                    {"vision": new_vision, "mission": new_mission},
+                    expected_version=content_version
+                )
+            except content_store.VersionConflict as e:
+                st.error(str(e))
+            else:
+                if saved is None:
+                    st.warning(writer.PENDING)
+                else:
+                    st.success("Updated successfully")
 
     # -------- TAB 2 --------
     with tabs[1]:
@@ -107,11 +118,24 @@ elif page == "Admin":
 
         if st.button("Add / Update Statistic"):
             if label and value:
-                st.session_state.stats[label] = value
-                st.success("Statistic saved")
-
-        st.write("### Current Statistics")
-        st.write(st.session_state.stats)
+                if impact.set_override(label, value):
+                    st.success("Statistic saved")
+                else:
+                    st.warning(writer.PENDING)
+
+        st.write("### Live Counters")
+        st.caption("Computed from the projects and media databases. "
+                   "Add a statistic with the same name to override one.")
+        st.write(impact.computed())
+
+        st.write("### Custom Statistics")
+        for k, v in impact.overrides().items():
+            col1, col2 = st.columns([4, 1])
+            col1.write(f"**{k}**: {v}")
+            if col2.button("Remove", key=f"stat_{k}"):
+                if impact.remove_override(k):
+                    st.rerun()
+                st.warning(writer.PENDING)
 
     # -------- TAB 3 --------
     with tabs[2]:
@@ -120,8 +144,20 @@ elif page == "Admin":
 
         if st.button("Add Initiative"):
             if initiative:
-                st.session_state.initiatives.append(initiative)
-                st.success("Initiative added")
-
-        for i in st.session_state.initiatives:
+                try:
+                    saved = content_store.update(
+                        {"initiatives": list(content["initiatives"]) + [initiative]},
+                        expected_version=content_version
+                    )
+                except content_store.VersionConflict as e:
+                    st.error(str(e))
+                else:
+                    if saved is None:
+                        st.warning(writer.PENDING)
+                    else:
+                        content_version, content = content_store.snapshot()
+                        st.session_state.content_version = content_version
+                        st.success("Initiative added")
+
+        for i in content["initiatives"]:
             st.write("🔹", i)
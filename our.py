@@ -1,37 +1,198 @@
 import streamlit as st
-import sqlite3
-import os
+import json
 from datetime import date
 
+import authz
+import bootstrap
+import bulk
+import cache
+import db
+import images
+import jobs
+import live
+import migrations
+import search
+import storage
+import writer
+
 # ---------- DATABASE ----------
-conn = sqlite3.connect("ngo.db", check_same_thread=False)
+bootstrap.init()
+
+conn = db.get_connection("projects")
 cur = conn.cursor()
 
-cur.execute("""
-CREATE TABLE IF NOT EXISTS projects (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    title TEXT,
-    description TEXT,
-    status TEXT,
-    start_date TEXT,
-    end_date TEXT,
-    location TEXT
-)
-""")
-
-cur.execute("""
-CREATE TABLE IF NOT EXISTS project_images (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    project_id INTEGER,
-    image_path TEXT
-)
-""")
-
-conn.commit()
-
-# ---------- UPLOAD FOLDER ----------
-if not os.path.exists("uploads"):
-    os.mkdir("uploads")
+migrations.ensure("projects")
+
+# ---------- PAGINATION ----------
+PAGE_SIZE = 20
+
+# One grouped query per page: the projects on this page plus all of their
+# images. Paging is keyset based (id > last seen id), so deep pages cost the
+# same as the first one.
+PROJECTS_PAGE_SQL = """
+SELECT p.id, p.title, p.description, p.status, p.location, p.start_date, p.end_date,
+       json_group_array(json_array(i.image_path, i.variants))
+           FILTER (WHERE i.id IS NOT NULL)
+FROM (
+    SELECT id, title, description, status, location, start_date, end_date
+    FROM projects p
+    WHERE {where}
+    ORDER BY id
+    LIMIT ?
+) AS p
+LEFT JOIN project_images i ON i.project_id = p.id
+GROUP BY p.id
+ORDER BY p.id
+"""
+
+
+def range_filter(span, location_ids):
+    # Date range and location conditions on projects p -> (" AND ...", params).
+    # span is (from_day, to_day) in days since 1970-01-01; a project matches
+    # when it was active on any day of it.
+    sql = ""
+    params = []
+    if span:
+        sql += " AND p.start_day <= ? AND p.end_day >= ?"
+        params += [span[1], span[0]]
+    if location_ids:
+        sql += f" AND p.location_id IN ({', '.join('?' * len(location_ids))})"
+        params += list(location_ids)
+    return sql, params
+
+
+def fetch_projects_page(status, after_id, span=None, location_ids=()):
+    where, params = range_filter(span, location_ids)
+    if status == "All":
+        sql = PROJECTS_PAGE_SQL.format(where="p.tenant = ? AND p.id > ?" + where)
+        params = (db.TENANT, after_id, *params, PAGE_SIZE + 1)
+    else:
+        sql = PROJECTS_PAGE_SQL.format(where="p.tenant = ? AND p.status = ? AND p.id > ?" + where)
+        params = (db.TENANT, status, after_id, *params, PAGE_SIZE + 1)
+
+    # Also called from a fragment rerun, so take this thread's connection
+    rows = cache.fetchall(db.get_connection("projects").cursor(), ("projects", "project_images"), sql, params)
+    has_next = len(rows) > PAGE_SIZE
+    return rows[:PAGE_SIZE], has_next
+
+
+# ---------- FACETS ----------
+EPOCH = date(1970, 1, 1).toordinal()
+
+# Counts for the filter UI in one statement: projects per location under
+# every filter but the location one (so other locations can still be
+# picked), projects started per year and the total under all filters.
+FACETS_SQL = """
+SELECT 'location', p.location_id, COUNT(*) FROM projects p
+WHERE {base} AND p.location_id IS NOT NULL GROUP BY p.location_id
+UNION ALL
+SELECT 'year', strftime('%Y', p.start_day + 2440587.5), COUNT(*) FROM projects p
+WHERE {filtered} AND p.start_day IS NOT NULL GROUP BY 2
+UNION ALL
+SELECT 'total', NULL, COUNT(*) FROM projects p WHERE {filtered}
+"""
+
+
+def to_day(d):
+    return d.toordinal() - EPOCH
+
+
+def fetch_locations():
+    # -> {location id: name} for locations that have projects
+    rows = cache.fetchall(db.get_connection("projects").cursor(), ("projects",), """
+    SELECT l.id, l.name FROM locations l
+    WHERE l.tenant = ? AND EXISTS (
+        SELECT 1 FROM projects p WHERE p.tenant = l.tenant AND p.location_id = l.id
+    )
+    ORDER BY l.name
+    """, (db.TENANT,))
+    return dict(rows)
+
+
+def fetch_facets(status, span, location_ids):
+    # -> ({location id: count}, [(year, count)], total)
+    base = "p.tenant = ?"
+    base_params = [db.TENANT]
+    if status != "All":
+        base += " AND p.status = ?"
+        base_params.append(status)
+    span_sql, span_params = range_filter(span, ())
+    loc_sql, loc_params = range_filter(None, location_ids)
+
+    sql = FACETS_SQL.format(base=base + span_sql, filtered=base + span_sql + loc_sql)
+    filtered_params = base_params + span_params + loc_params
+    params = base_params + span_params + filtered_params + filtered_params
+
+    locations, years, total = {}, [], 0
+    for kind, key, count in cache.fetchall(db.get_connection("projects").cursor(), ("projects",), sql, params):
+        if kind == "location":
+            locations[key] = count
+        elif kind == "year":
+            years.append((key, count))
+        else:
+            total = count
+    return locations, sorted(years), total
+
+
+# ---------- LIVE PROJECT LIST ----------
+# Redrawn on its own when projects change, so visitors see new ones
+# without touching the page; the filters above it keep their state
+@live.fragment("projects", "project_images", notice="🆕 Projects were updated")
+def projects_section(search_text, status_filter, span, location_ids):
+    _, timeline, total = fetch_facets(status_filter, span, location_ids)
+
+    # The chart is drawn on request only: charting loads pandas and altair,
+    # which would otherwise double the first paint of this page
+    st.caption(f"{total} projects match")
+    if st.toggle("📅 Show timeline", key="show_timeline"):
+        if timeline:
+            st.bar_chart([{"Year": y, "Projects started": n} for y, n in timeline],
+                         x="Year", y="Projects started")
+        else:
+            st.caption("No dated projects match these filters")
+
+    if search_text.strip():
+        where, where_params = range_filter(span, location_ids)
+        results = search.search_projects(search_text, status_filter, where=where, where_params=where_params)
+        st.caption(f"{len(results)} matching projects")
+
+        for r in results:
+            st.subheader(r[1])
+            st.markdown(r[2])
+            st.markdown(f"📍 Location: {r[4]}")
+            st.write("📅 Status:", r[3])
+            st.markdown("---")
+        return
+
+    # Start again from the first page whenever a filter changes
+    filters = (status_filter, span, tuple(location_ids))
+    if st.session_state.get("page_filter") != filters:
+        st.session_state.page_filter = filters
+        st.session_state.page_cursors = [0]
+
+    cursors = st.session_state.page_cursors
+    projects, has_next = fetch_projects_page(status_filter, cursors[-1], span, location_ids)
+
+    for p in projects:
+        st.subheader(p[1])
+        st.write(p[2])
+        st.write("📍 Location:", p[4])
+        st.write("📅 Status:", p[3])
+        if p[5]:
+            st.caption(f"🗓 {p[5]} → {p[6] or 'ongoing'}")
+
+        for path, variants in json.loads(p[7]):
+            st.image(images.pick(path, variants, 300), width=300)
+
+        st.markdown("---")
+
+    # Buttons move the cursor in callbacks, so the fragment's own rerun
+    # already renders the new page
+    col1, col2, col3 = st.columns([1, 2, 1])
+    col1.button("⬅ Previous", disabled=len(cursors) == 1, on_click=cursors.pop)
+    col2.caption(f"Page {len(cursors)}")
+    col3.button("Next ➡", disabled=not has_next,
+                on_click=cursors.append, args=(projects[-1][0] if projects else 0,))
 
 # ---------- SIDEBAR ----------
 st.sidebar.title("NGO Dashboard")
@@ -42,34 +203,29 @@ if page == "Our Projects":
     st.title("Our Projects")
     st.write("Making a difference through our initiatives")
 
-    status_filter = st.selectbox(
+    search_text = st.text_input("🔍 Search projects", placeholder="Title, description or location")
+
+    col1, col2 = st.columns(2)
+    status_filter = col1.selectbox(
         "Filter by Status",
         ["All", "Ongoing", "Completed", "Upcoming"]
     )
+    # Incomplete ranges (only a start picked so far) do not filter yet
+    picked = col2.date_input("Active between", value=(), format="YYYY-MM-DD")
+    span = (to_day(picked[0]), to_day(picked[1])) if len(picked) == 2 else None
 
-    if status_filter == "All":
-        cur.execute("SELECT * FROM projects")
-    else:
-        cur.execute("SELECT * FROM projects WHERE status=?", (status_filter,))
-
-    projects = cur.fetchall()
-
-    for p in projects:
-        st.subheader(p[1])
-        st.write(p[2])
-        st.write("📍 Location:", p[6])
-        st.write("📅 Status:", p[3])
-
-        cur.execute("SELECT image_path FROM project_images WHERE project_id=?", (p[0],))
-        images = cur.fetchall()
-
-        for img in images:
-            st.image(img[0], width=300)
+    location_names = fetch_locations()
+    selected = st.session_state.get("location_filter", [])
+    location_counts, _, _ = fetch_facets(status_filter, span, selected)
+    location_ids = st.multiselect(
+        "Locations", list(location_names), key="location_filter",
+        format_func=lambda i: f"{location_names.get(i, '?')} ({location_counts.get(i, 0)})"
+    )
 
-        st.markdown("---")
+    projects_section(search_text, status_filter, span, location_ids)
 
 # ================= ADMIN PANEL =================
-if page == "Admin Panel":
+if page == "Admin Panel" and authz.require("projects.edit"):
     st.title("Admin – Manage Projects")
 
     with st.form("add_project"):
@@ -83,16 +239,21 @@ if page == "Admin Panel":
         submit = st.form_submit_button("Add Project")
 
         if submit:
-            cur.execute(
-                "INSERT INTO projects VALUES (NULL,?,?,?,?,?,?)",
-                (title, desc, status, str(start), str(end), location)
-            )
-            conn.commit()
-            st.success("Project Added Successfully")
+            saved, _ = writer.wait(writer.execute(
+                "projects",
+                "INSERT INTO projects (tenant, title, description, status, start_date, end_date, location) "
+                "VALUES (?,?,?,?,?,?,?)",
+                (db.TENANT, title, desc, status, str(start), str(end), location),
+                invalidate=("projects",)
+            ))
+            if saved:
+                st.success("Project Added Successfully")
+            else:
+                st.warning(writer.PENDING)
 
     st.subheader("Upload Project Images")
 
-    cur.execute("SELECT id, title FROM projects")
+    cur.execute("SELECT id, title FROM projects WHERE tenant=?", (db.TENANT,))
     project_list = cur.fetchall()
 
     project_dict = {}
@@ -104,16 +265,29 @@ if page == "Admin Panel":
 
     if st.button("Upload Image"):
         if image:
-            path = f"uploads/{image.name}"
-            with open(path, "wb") as f:
-                f.write(image.read())
-
-            cur.execute(
-                "INSERT INTO project_images VALUES (NULL,?,?)",
-                (project_dict[project_name], path)
-            )
-            conn.commit()
-            st.success("Image Uploaded")
+            path = storage.store(image, image.name)
+
+            saved, image_id = writer.wait(writer.execute(
+                "projects",
+                "INSERT INTO project_images (tenant, project_id, image_path) VALUES (?,?,?)",
+                (db.TENANT, project_dict[project_name], path),
+                invalidate=("project_images",)
+            ))
+            if saved:
+                images.schedule("projects", "project_images", image_id, path)
+                st.success("Image Uploaded")
+            else:
+                # Pages show the original until `python images.py` builds its variants
+                st.warning(writer.PENDING)
+
+    if authz.can("bulk.import"):
+        st.subheader("Bulk Import / Export")
+        with st.expander("Import or export many projects at once"):
+            bulk.render(["projects", "project_images"])
+
+    if authz.can("jobs.run"):
+        st.subheader("Background Jobs")
+        jobs.render()
 
 # ---------- FOOTER ----------
 st.sidebar.info("NGO Project Management System")
\ No newline at end of file
@@ -0,0 +1,144 @@
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+import streamlit as st
+
+# ---------------- SETTINGS ----------------
+WINDOW = 300            # seconds
+USER_ATTEMPTS = 5       # per username per window
+CLIENT_ATTEMPTS = 20    # per client per window
+MAX_KEYS = 100_000      # per limiter; least recently used keys go first
+SWEEP_EVERY = 1000      # hits between idle-key sweeps
+
+# Reverse proxies in front of the app that append to X-Forwarded-For.
+# The header is client-controlled, so it is ignored unless this is set.
+TRUSTED_PROXIES = int(os.environ.get("TRUSTED_PROXIES", 0))
+
+
+# ---------------- SLIDING WINDOW ----------------
+class SlidingWindowLimiter:
+    # Sliding window counter: each key keeps only the attempt counts of the
+    # current and previous fixed window and weights the previous one by how
+    # much of it still overlaps the sliding window. O(1) time and three
+    # numbers of memory per key.
+
+    def __init__(self, limit, window=WINDOW, max_keys=MAX_KEYS):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._entries = OrderedDict()  # key -> [bucket, previous, current]
+        self._lock = threading.Lock()
+        self._hits = 0
+
+    def hit(self, key, now=None):
+        # Count one attempt; returns (allowed, retry_after_seconds)
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entry = self._entry(key, now)
+            retry_after = self._retry_after(entry, now)
+            if retry_after:
+                return False, retry_after
+            entry[2] += 1
+
+            self._hits += 1
+            if self._hits % SWEEP_EVERY == 0:
+                self._sweep(now)
+            return True, 0
+
+    def reset(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _entry(self, key, now):
+        bucket = int(now // self.window)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = [bucket, 0, 0]
+            if len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(key)
+            if bucket == entry[0] + 1:
+                entry[:] = [bucket, entry[2], 0]
+            elif bucket != entry[0]:
+                entry[:] = [bucket, 0, 0]
+        return entry
+
+    def _retry_after(self, entry, now):
+        _, previous, current = entry
+        elapsed = (now % self.window) / self.window
+        if previous * (1 - elapsed) + current < self.limit:
+            return 0
+
+        # Whole seconds until the weighted count is below the limit again.
+        # At exactly `wait` it still equals the limit, hence the + 1.
+        if current >= self.limit:
+            wait = (1 - elapsed) + (1 - self.limit / current)
+        else:
+            wait = (1 - (self.limit - current) / previous) - elapsed
+        return int(wait * self.window) + 1
+
+    def _sweep(self, now):
+        # Keys are kept in least recently used order, so idle keys sit at
+        # the front and the sweep stops at the first active one.
+        bucket = int(now // self.window)
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry[0] >= bucket - 1:
+                break
+            del self._entries[key]
+
+
+_users = SlidingWindowLimiter(USER_ATTEMPTS)
+_clients = SlidingWindowLimiter(CLIENT_ATTEMPTS)
+
+
+# ---------------- LOGIN HELPERS ----------------
+def forwarded_client(forwarded, trusted=TRUSTED_PROXIES):
+    # The address the outermost trusted proxy saw: each proxy appends the
+    # peer it received from, so only the last `trusted` hops are reliable
+    # and anything to their left may be forged by the client.
+    hops = [h.strip() for h in forwarded.split(",") if h.strip()]
+    if trusted <= 0 or len(hops) < trusted:
+        return None
+    return hops[-trusted]
+
+
+def client_address():
+    # The trusted proxies' view of the client, else the socket address;
+    # None when neither is known (e.g. under AppTest, which has no request)
+    headers = st.context.headers
+    forwarded = headers.get("X-Forwarded-For") if headers and TRUSTED_PROXIES else None
+    ip = forwarded_client(forwarded) if isinstance(forwarded, str) else None
+    if not ip:
+        ip = getattr(st.context, "ip_address", None)
+    return ip if isinstance(ip, str) and ip else None
+
+
+def client_key():
+    # Best effort client identity: its address, else the Streamlit session
+    ip = client_address()
+    if ip:
+        return ip
+    if "rate_limit_client" not in st.session_state:
+        st.session_state.rate_limit_client = f"session:{secrets.token_hex(8)}"
+    return st.session_state.rate_limit_client
+
+
+def check_login(scope, username):
+    # Call before checking credentials; returns (allowed, retry_after)
+    user_ok, user_wait = _users.hit(f"{scope}:{username}")
+    client_ok, client_wait = _clients.hit(f"{scope}:{client_key()}")
+    if user_ok and client_ok:
+        return True, 0
+    return False, max(user_wait, client_wait)
+
+
+def login_succeeded(scope, username):
+    _users.reset(f"{scope}:{username}")
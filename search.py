@@ -0,0 +1,93 @@
+import re
+
+import cache
+import db
+
+# ---------------- SETTINGS ----------------
+RESULT_LIMIT = 20
+SNIPPET_TOKENS = 16
+
+PROJECTS_SQL = """
+SELECT p.id,
+       highlight(projects_fts, 0, '**', '**'),
+       snippet(projects_fts, 1, '**', '**', ' … ', ?),
+       p.status,
+       highlight(projects_fts, 2, '**', '**')
+FROM projects_fts
+JOIN projects p ON p.id = projects_fts.rowid
+WHERE projects_fts MATCH ? AND p.tenant = ? {status}
+ORDER BY bm25(projects_fts, 10.0, 1.0, 3.0)
+LIMIT ?
+"""
+
+PRESS_RELEASES_SQL = """
+SELECT pr.id,
+       highlight(press_releases_fts, 0, '**', '**'),
+       snippet(press_releases_fts, 1, '**', '**', ' … ', ?),
+       pr.release_date
+FROM press_releases_fts
+JOIN press_releases pr ON pr.id = press_releases_fts.rowid
+WHERE press_releases_fts MATCH ? AND pr.tenant = ?
+ORDER BY bm25(press_releases_fts, 10.0, 1.0)
+LIMIT ?
+"""
+
+
+# ---------------- QUERIES ----------------
+def to_match(text):
+    # Free text -> FTS5 query: every word must match, the last one as a
+    # prefix so results show up while typing. Words are quoted so FTS
+    # syntax in user input is treated as plain text.
+    words = re.findall(r"\w+", text or "")
+    if not words:
+        return None
+    terms = [f'"{w}"' for w in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def search_projects(text, status="All", limit=RESULT_LIMIT, where="", where_params=()):
+    # -> [(id, title, snippet, status, location)], best match first.
+    # where: extra "AND ..." conditions on projects p, e.g. date range
+    match = to_match(text)
+    if match is None:
+        return []
+
+    if status == "All":
+        sql = PROJECTS_SQL.format(status=where)
+        params = (SNIPPET_TOKENS, match, db.TENANT, *where_params, limit)
+    else:
+        sql = PROJECTS_SQL.format(status="AND p.status = ? " + where)
+        params = (SNIPPET_TOKENS, match, db.TENANT, status, *where_params, limit)
+
+    cur = db.get_connection("projects").cursor()
+    return cache.fetchall(cur, "projects", sql, params)
+
+
+def search_press_releases(text, limit=RESULT_LIMIT):
+    # -> [(id, title, snippet, release_date)], best match first
+    match = to_match(text)
+    if match is None:
+        return []
+
+    cur = db.get_connection("media").cursor()
+    return cache.fetchall(cur, "press_releases", PRESS_RELEASES_SQL, (SNIPPET_TOKENS, match, db.TENANT, limit))
+
+
+# ---------------- MAINTENANCE ----------------
+# Full-text indexes and the database each one lives in
+INDEXES = (("projects", "projects_fts"), ("media", "press_releases_fts"))
+
+
+def reindex(progress=None):
+    # Rebuild every full-text index from its content table -> {index: rows}
+    counts = {}
+    for i, (name, index) in enumerate(INDEXES):
+        conn = db.get_connection(name)
+        conn.execute(f"INSERT INTO {index} ({index}) VALUES ('rebuild')")
+        conn.commit()
+        counts[index] = conn.execute(f"SELECT COUNT(*) FROM {index}").fetchone()[0]
+        if progress:
+            progress(i + 1, len(INDEXES), f"rebuilt {index}")
+    cache.invalidate("projects", "press_releases")
+    return counts
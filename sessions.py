@@ -0,0 +1,297 @@
+import abc
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+
+import streamlit as st
+
+import db
+import migrations
+import rate_limit
+
+# ---------------- SETTINGS ----------------
+SESSION_TTL = 12 * 60 * 60  # seconds
+SWEEP_INTERVAL = 10 * 60    # seconds between expired-session sweeps
+COOKIE_PREFIX = "ngo_session_"  # + scope; the cookie keeps a login across refreshes
+ROTATE_GRACE = 60           # seconds a replaced token still works, for tabs opened together
+RECHECK_INTERVAL = 30       # seconds an open tab trusts its login before asking the store again
+LEGACY_QUERY_PARAM = "session"  # where tokens used to ride; removed, never read
+
+_lock = threading.Lock()
+_store = None
+_secret = None
+
+
+# ---------------- STORES ----------------
+class SessionStore(abc.ABC):
+    # Backends only need these four calls, and cannot be created without
+    # them; every replica behind the load balancer must point at the same
+    # store.
+
+    @abc.abstractmethod
+    def save(self, session_id, scope, username, expires_at, client=None, login=None):
+        # login: id shared by every token of one login (None = session_id)
+        ...
+
+    @abc.abstractmethod
+    def load(self, session_id):
+        # -> (scope, username, expires_at, client, login) or None
+        ...
+
+    @abc.abstractmethod
+    def delete(self, session_id):
+        # End the whole login session_id belongs to
+        ...
+
+    def expire(self, session_id, expires_at):
+        # Cut a session short; backends that cannot simply end it
+        self.delete(session_id)
+
+    @abc.abstractmethod
+    def sweep(self, now):
+        # Remove expired sessions, return how many were removed
+        ...
+
+
+class SqliteSessionStore(SessionStore):
+    def __init__(self, name="sessions"):
+        self.name = name
+        migrations.ensure(name)
+
+    def _conn(self):
+        return db.get_connection(self.name)
+
+    def save(self, session_id, scope, username, expires_at, client=None, login=None):
+        conn = self._conn()
+        conn.execute(
+            "INSERT INTO sessions (id, scope, username, expires_at, client, login) VALUES (?, ?, ?, ?, ?, ?)",
+            (session_id, scope, username, expires_at, client, login or session_id)
+        )
+        conn.commit()
+
+    def load(self, session_id):
+        return self._conn().execute(
+            "SELECT scope, username, expires_at, client, login FROM sessions WHERE id=?",
+            (session_id,)
+        ).fetchone()
+
+    def delete(self, session_id):
+        conn = self._conn()
+        conn.execute(
+            "DELETE FROM sessions WHERE login = (SELECT login FROM sessions WHERE id=?)",
+            (session_id,)
+        )
+        conn.commit()
+
+    def expire(self, session_id, expires_at):
+        conn = self._conn()
+        conn.execute("UPDATE sessions SET expires_at = MIN(expires_at, ?) WHERE id=?", (expires_at, session_id))
+        conn.commit()
+
+    def sweep(self, now):
+        conn = self._conn()
+        removed = conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,)).rowcount
+        conn.commit()
+        return removed
+
+    def shared_secret(self):
+        # First replica to start picks the signing key, the rest reuse it
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR IGNORE INTO session_secret (id, secret) VALUES (1, ?)",
+            (secrets.token_hex(32),)
+        )
+        conn.commit()
+        return conn.execute("SELECT secret FROM session_secret WHERE id=1").fetchone()[0]
+
+
+def set_store(store, secret=None):
+    global _store, _secret
+    with _lock:
+        _store = store
+        _secret = secret.encode() if secret else None
+    _start_sweeper()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _lock:
+            if _store is None:
+                _store = SqliteSessionStore()
+        _start_sweeper()
+    return _store
+
+
+def _signing_key():
+    global _secret
+    if _secret is None:
+        env = os.environ.get("SESSION_SECRET")
+        store = get_store()
+        if env:
+            _secret = env.encode()
+        elif isinstance(store, SqliteSessionStore):
+            _secret = store.shared_secret().encode()
+        else:
+            raise RuntimeError("SESSION_SECRET must be set for non-SQLite session stores")
+    return _secret
+
+
+# ---------------- SWEEPER ----------------
+_sweeper = None
+
+
+def _start_sweeper():
+    global _sweeper
+    with _lock:
+        if _sweeper is not None:
+            return
+        _sweeper = threading.Thread(target=_sweep_forever, name="session-sweeper", daemon=True)
+        _sweeper.start()
+
+
+def _sweep_forever():
+    while True:
+        time.sleep(SWEEP_INTERVAL)
+        try:
+            get_store().sweep(time.time())
+        except Exception:
+            pass  # try again on the next pass
+
+
+# ---------------- TOKENS ----------------
+def _sign(session_id):
+    mac = hmac.new(_signing_key(), session_id.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(mac[:18]).decode()
+
+
+def issue(scope, username, ttl=SESSION_TTL, client=None, login=None):
+    # client: address the token is bound to, if known; login: the login a
+    # new token joins (None starts a new one)
+    session_id = secrets.token_urlsafe(18)
+    expires_at = time.time() + ttl
+    get_store().save(session_id, scope, username, expires_at, client, login)
+    return f"{session_id}.{_sign(session_id)}", expires_at
+
+
+def validate(scope, token, client=None):
+    # -> (username, expires_at) or None. Forged tokens are rejected by the
+    # signature check without touching the store; compared as bytes, since
+    # compare_digest refuses non-ASCII str and cookies can hold anything.
+    session_id, _, signature = (token or "").partition(".")
+    if not session_id or not hmac.compare_digest(signature.encode(), _sign(session_id).encode()):
+        return None
+
+    row = get_store().load(session_id)
+    if row is None or row[0] != scope or row[2] <= time.time():
+        return None
+    # A token bound to an address is refused from anywhere else
+    if row[3] and row[3] != client:
+        return None
+    return row[1], row[2]
+
+
+def branch(scope, token, username, expires_at, client=None):
+    # Another token of the same login, keeping its absolute expiry
+    session_id, _, _ = token.partition(".")
+    row = get_store().load(session_id)
+    new_token, _ = issue(scope, username, expires_at - time.time(), client, row[4] if row else session_id)
+    return new_token
+
+
+def rotate(scope, token, username, expires_at, client=None):
+    # Fresh token for the same login. The old one lingers ROTATE_GRACE
+    # seconds for page loads already under way.
+    new_token = branch(scope, token, username, expires_at, client)
+    session_id, _, _ = token.partition(".")
+    get_store().expire(session_id, time.time() + ROTATE_GRACE)
+    return new_token
+
+
+def revoke(token):
+    # Ends the token's whole login, in every tab
+    session_id, _, _ = (token or "").partition(".")
+    if session_id:
+        get_store().delete(session_id)
+
+
+# ---------------- STREAMLIT HELPERS ----------------
+# The token is kept in a cookie, not the URL, so it stays out of browser
+# history, shared links, Referer headers and proxy logs. Streamlit can
+# only read cookies (st.context.cookies, from the page request), so a
+# small script writes them in the browser. It cannot set HttpOnly.
+def _write_cookie(scope, token, max_age):
+    cookie = f"{COOKIE_PREFIX}{scope}={token}; Path=/; Max-Age={max(int(max_age), 0)}; SameSite=Strict"
+    st.html(
+        f"<script>document.cookie = {json.dumps(cookie)}"
+        " + (location.protocol === 'https:' ? '; Secure' : '');</script>",
+        unsafe_allow_javascript=True
+    )
+
+
+def _cookie(scope):
+    # The page request's session cookie; None without one, or without a
+    # page request at all (AppTest)
+    token = st.context.cookies.get(f"{COOKIE_PREFIX}{scope}")
+    return token if isinstance(token, str) and token else None
+
+
+def _remember(scope, token, expires_at, username, client):
+    # The cookie gets token; this tab keeps its own token of the same
+    # login, which other tabs rotating the cookie never retire
+    tab_token = branch(scope, token, username, expires_at, client)
+    st.session_state[f"session_{scope}"] = (tab_token, expires_at, username, time.time())
+    _write_cookie(scope, token, expires_at - time.time())
+
+
+def login(scope, username):
+    client = rate_limit.client_address()
+    token, expires_at = issue(scope, username, client=client)
+    _remember(scope, token, expires_at, username, client)
+
+
+def restore(scope):
+    # Username for the session cookie, or None. A validated login is
+    # remembered in the Streamlit session, so ordinary reruns do not hit
+    # the store, but it is checked again every RECHECK_INTERVAL seconds:
+    # a logout in another tab or a revoked session ends it here too. Each
+    # page load swaps the cookie for a new token.
+    if LEGACY_QUERY_PARAM in st.query_params:
+        del st.query_params[LEGACY_QUERY_PARAM]
+
+    key = f"session_{scope}"
+    cached = st.session_state.get(key)
+    now = time.time()
+    if cached and cached[1] > now:
+        if now - cached[3] < RECHECK_INTERVAL:
+            return cached[2]
+        if validate(scope, cached[0], rate_limit.client_address()):
+            st.session_state[key] = (*cached[:3], now)
+            return cached[2]
+        # The page request's cookie belongs to the same, ended login
+        del st.session_state[key]
+        return None
+
+    token = _cookie(scope)
+    if not token:
+        return None
+    client = rate_limit.client_address()
+    result = validate(scope, token, client)
+    if result is None:
+        st.session_state.pop(key, None)
+        return None
+    username, expires_at = result
+    _remember(scope, rotate(scope, token, username, expires_at, client), expires_at, username, client)
+    return username
+
+
+def logout(scope):
+    cached = st.session_state.pop(f"session_{scope}", None)
+    revoke(cached[0] if cached else None)
+    revoke(_cookie(scope))
+    _write_cookie(scope, "", 0)
@@ -0,0 +1,88 @@
+import hashlib
+import os
+import tempfile
+
+import db
+import images
+import migrations
+
+# ---------------- SETTINGS ----------------
+BLOB_DIR = os.path.join("uploads", "blobs")
+CHUNK_SIZE = 1024 * 1024
+
+
+# ---------------- STORE ----------------
+def _conn():
+    migrations.ensure("storage")
+    return db.get_connection("storage")
+
+
+def blob_path(digest, ext):
+    return os.path.join(BLOB_DIR, digest[:2], digest + ext)
+
+
+def store(fileobj, filename):
+    # Stream an upload to disk under the hash of its content and take a
+    # reference to it. Identical files are stored once.
+    ext = os.path.splitext(filename)[1].lower()
+    os.makedirs(BLOB_DIR, exist_ok=True)
+
+    if hasattr(fileobj, "seek"):
+        fileobj.seek(0)
+    sha = hashlib.sha256()
+    fd, tmp = tempfile.mkstemp(dir=BLOB_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b""):
+                sha.update(chunk)
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+
+        path = blob_path(sha.hexdigest(), ext)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # The write lock serializes this with release(), so a blob cannot
+        # be collected between the existence check and the new reference.
+        conn = _conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO blobs (path, refs) VALUES (?, 1) "
+                "ON CONFLICT(path) DO UPDATE SET refs = refs + 1",
+                (path,)
+            )
+            if not os.path.exists(path):
+                os.replace(tmp, path)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+    return path
+
+
+def release(path):
+    # Drop one reference; the file and its variants are deleted with the
+    # last one. Paths that were never stored here are left alone.
+    conn = _conn()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            "UPDATE blobs SET refs = refs - 1 WHERE path=? RETURNING refs",
+            (path,)
+        ).fetchone()
+        collect = row is not None and row[0] <= 0
+        if collect:
+            conn.execute("DELETE FROM blobs WHERE path=?", (path,))
+            for p in [path] + [images.variant_path(path, w) for w in images.VARIANT_WIDTHS]:
+                if os.path.exists(p):
+                    os.remove(p)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return collect
@@ -0,0 +1,30 @@
+import itertools
+import os
+import sys
+import tempfile
+
+import pytest
+
+# The apps are flat modules in the repository root, and they open the
+# database named by NGO_DATABASE (and uploads/, spool/) relative to the
+# working directory, so the tests get a scratch directory of their own
+# before anything imports db.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+WORKDIR = tempfile.mkdtemp(prefix="ngo-tests-")
+os.environ["NGO_DATABASE"] = os.path.join(WORKDIR, "ngo_site.db")
+os.chdir(WORKDIR)
+
+_tenants = itertools.count(1)
+
+
+@pytest.fixture
+def tenant(monkeypatch):
+    # A fresh organization per test, so tests sharing the database do not
+    # see each other's rows
+    import db
+
+    name = f"test{next(_tenants)}"
+    monkeypatch.setattr(db, "TENANT", name)
+    return name
@@ -0,0 +1,135 @@
+import os
+import secrets
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import authz
+import user_store
+from conftest import ROOT
+
+PAGE = """
+import streamlit as st
+import authz
+
+if authz.require("media.edit"):
+    st.write("allowed")
+"""
+
+
+@pytest.fixture
+def account():
+    username = f"admin_{secrets.token_hex(4)}"
+    user_store.create_user(username, "pw")
+    return username
+
+
+@pytest.fixture
+def page(tmp_path, monkeypatch):
+    path = tmp_path / "page.py"
+    path.write_text(PAGE)
+    # No browser, so no cookie: the session lives in session_state only
+    monkeypatch.setattr("sessions._cookie", lambda scope: None)
+    return AppTest.from_file(str(path))
+
+
+def _log_in(at, username, password="pw"):
+    at.run()
+    at.text_input[0].input(username)
+    at.text_input[1].input(password)
+    at.button[0].click().run()
+
+
+def _allowed(at):
+    return any(m.value == "allowed" for m in at.markdown)
+
+
+def test_roles_combine_into_permission_bits(account):
+    assert authz.resolve(account) == 0
+    authz.set_roles(account, ["media_manager", "content_editor"])
+
+    assert authz.roles_of(account) == ["content_editor", "media_manager"]
+    bits = authz.resolve(account)
+    assert bits & authz.PERMISSIONS["media.edit"] and bits & authz.PERMISSIONS["about.edit"]
+    assert not bits & authz.PERMISSIONS["users.manage"]
+    assert authz.ROLES["super_admin"] == authz.ALL
+
+
+def test_unknown_roles_are_refused(account):
+    with pytest.raises(ValueError, match="Unknown roles: owner"):
+        authz.set_roles(account, ["owner", "media_manager"])
+    assert authz.roles_of(account) == []
+
+
+def test_login_with_the_permission_opens_the_page_in_the_same_run(page, account):
+    authz.set_roles(account, ["media_manager"])
+    _log_in(page, account)
+
+    assert _allowed(page)
+    assert not page.text_input   # the form is gone
+    assert any(authz.SCOPE in h.proto.body for h in page.get("html"))   # session cookie written
+
+
+def test_wrong_password_keeps_the_form(page, account):
+    _log_in(page, account, "nope")
+    assert not _allowed(page)
+    assert "Invalid username or password" in [e.value for e in page.error]
+
+
+def test_signed_in_without_the_permission(page, account):
+    authz.set_roles(account, ["content_editor"])
+    _log_in(page, account)
+    assert not _allowed(page)
+
+    page.run()
+    assert "media.edit" in page.warning[0].value
+
+
+def test_role_changes_apply_on_the_next_rerun(page, account):
+    authz.set_roles(account, ["media_manager"])
+    _log_in(page, account)
+    assert _allowed(page)
+
+    authz.set_roles(account, [])
+    page.run()
+    assert not _allowed(page)
+
+
+# ---------------- APPAUTH PAGE ----------------
+@pytest.fixture
+def appauth(monkeypatch):
+    monkeypatch.setattr("sessions._cookie", lambda scope: None)
+    at = AppTest.from_file(os.path.join(ROOT, "appauth.py"), default_timeout=30)
+    at.run()
+    return at
+
+
+def _appauth_log_in(at, username, password="pw"):
+    at.text_input[0].input(username)
+    at.text_input[1].input(password)
+    at.button[0].click().run()
+
+
+def test_appauth_logs_in_through_authz_and_drops_stale_permissions(appauth, account):
+    appauth.session_state[authz.SESSION_KEY] = (account, -1, float("inf"), authz.ALL)
+    _appauth_log_in(appauth, account)
+
+    assert "Login successful" in [s.value for s in appauth.success]
+    assert appauth.session_state.current_user == account
+    assert authz.SESSION_KEY not in appauth.session_state
+
+
+def test_appauth_shows_the_authz_error(appauth, account):
+    _appauth_log_in(appauth, account, "nope")
+    assert "Invalid username or password" in [e.value for e in appauth.error]
+    assert not appauth.session_state.logged_in
+
+
+def test_appauth_logout_ends_the_session(appauth, account):
+    _appauth_log_in(appauth, account)
+    token = appauth.session_state[f"session_{authz.SCOPE}"][0]
+    appauth.sidebar.radio[0].set_value("Dashboard").run()
+    appauth.button[0].click().run()
+
+    assert "Logged out successfully" in [s.value for s in appauth.success]
+    assert authz.sessions.validate(authz.SCOPE, token) is None
@@ -0,0 +1,50 @@
+import random
+
+import pytest
+
+import benchmark
+import db
+
+
+@pytest.mark.parametrize("text, expected", [("1k", 1000), ("100K", 100_000), ("1M", 1_000_000),
+                                            ("2.5k", 2500), (" 42 ", 42)])
+def test_parse_scale(text, expected):
+    assert benchmark.parse_scale(text) == expected
+
+
+def test_percentile():
+    values = list(range(1, 101))
+    assert benchmark.percentile(values, 50) == 51
+    assert benchmark.percentile(values, 99) == 100
+    assert benchmark.percentile([], 95) == 0.0
+
+
+def _results(**apps):
+    return {"apps": {app: {"rerun_ms": {"p95": p95}, "cold": {"cold_start_ms": cold, "first_paint_ms": paint}}
+                     for app, (p95, cold, paint) in apps.items()}}
+
+
+def test_compare_flags_only_regressions_past_the_limit():
+    baseline = _results(**{"our.py": (10.0, 0, 0), "abt.py": (10.0, 0, 0)})
+    current = _results(**{"our.py": (12.5, 0, 0), "abt.py": (11.0, 0, 0), "new.py": (99.0, 0, 0)})
+    assert benchmark.compare(current, baseline, 0.2) == ["our.py"]
+
+
+def test_over_budget_checks_both_limits():
+    results = _results(**{"our.py": (0, 900, 300), "abt.py": (0, 1200, 300), "media.py": (0, 900, 700)})
+    assert benchmark.over_budget(results, 1000, 500) == ["abt.py", "media.py"]
+    assert benchmark.over_budget(results, 0, 0) == []
+
+
+def test_seed_fills_every_table_for_the_tenant(tenant):
+    benchmark.seed(30, 10, 5, random.Random(1))
+
+    def count(name, table):
+        return db.get_connection(name).execute(
+            f"SELECT COUNT(*) FROM {table} WHERE tenant=?", (tenant,)
+        ).fetchone()[0]
+
+    assert count("projects", "projects") == 30
+    assert count("projects", "project_images") == 10
+    assert count("media", "press_releases") == 5
+    assert count("media", "image_gallery") == 10
@@ -0,0 +1,120 @@
+import io
+import json
+import zipfile
+
+import pytest
+
+import benchmark
+import bulk
+import db
+import migrations
+
+
+def _csv(text):
+    return io.BytesIO(text.encode())
+
+
+def _jsonl(*rows):
+    return io.BytesIO("".join((r if isinstance(r, str) else json.dumps(r)) + "\n" for r in rows).encode())
+
+
+def _zip(*names):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as archive:
+        for name in names:
+            archive.writestr(name, benchmark.PIXEL_PNG)
+    buf.seek(0)
+    return buf
+
+
+def _rows(table, columns):
+    name = bulk.TABLES[table][0]
+    return db.get_connection(name).execute(
+        f"SELECT {columns} FROM {table} WHERE tenant=? ORDER BY id", (db.TENANT,)
+    ).fetchall()
+
+
+def _refs(path):
+    row = db.get_connection("storage").execute("SELECT refs FROM blobs WHERE path=?", (path,)).fetchone()
+    return row[0] if row else 0
+
+
+def test_csv_projects_with_images(tenant):
+    data = _csv(
+        "title,description,status,start_date,end_date,location,images\n"
+        "Wells,Clean water,Ongoing,2024-01-05,,Pune,a.png|b.png\n"
+        "School,,Completed,2023-06-01,2023-12-31,Satara,\n"
+    )
+    report = bulk.import_rows("projects", data, "csv", _zip("a.png", "b.png"), batch_size=1)
+
+    assert report == {"inserted": 2, "errors": 0, "messages": []}
+    projects = _rows("projects", "id, title, status, start_date, end_date, location")
+    assert [tuple(p)[1:] for p in projects] == [
+        ("Wells", "Ongoing", "2024-01-05", None, "Pune"),
+        ("School", "Completed", "2023-06-01", "2023-12-31", "Satara"),
+    ]
+    images = _rows("project_images", "project_id, image_path")
+    assert [i[0] for i in images] == [projects[0][0]] * 2
+
+
+def test_bad_rows_are_reported_by_line_and_skipped(tenant):
+    data = _jsonl(
+        {"title": "Good"},
+        "{not json",
+        ["a", "list"],
+        {"description": "no title"},
+        {"title": "Bad date", "start_date": "05/01/2024"},
+        {"title": "Bad status", "status": "Paused"},
+        {"title": "Bad images", "images": 5},
+        {"title": "Missing image", "images": ["nope.png"]},
+    )
+    report = bulk.import_rows("projects", data, "jsonl", _zip("x.png"))
+
+    assert report["inserted"] == 1
+    assert [line for line, _ in report["messages"]] == [2, 3, 4, 5, 6, 7, 8]
+    assert "missing title" in report["messages"][2][1]
+    assert "images must be a list" in report["messages"][5][1]
+    assert "not in the images zip: nope.png" in report["messages"][6][1]
+    assert [r[0] for r in _rows("projects", "title")] == ["Good"]
+
+
+def test_project_images_for_other_tenants_projects_are_refused(tenant):
+    migrations.ensure("projects")
+    conn = db.get_connection("projects")
+    own = conn.execute("INSERT INTO projects (tenant, title) VALUES (?, 'own')", (tenant,)).lastrowid
+    foreign = conn.execute("INSERT INTO projects (tenant, title) VALUES ('elsewhere', 'theirs')").lastrowid
+    conn.commit()
+
+    data = _csv(f"project_id,image\n{own},own.png\n{foreign},theirs.png\n999999,gone.png\n")
+    report = bulk.import_rows("project_images", data, "csv", _zip("own.png", "theirs.png", "gone.png"))
+
+    assert report["inserted"] == 1
+    assert report["messages"] == [(3, f"project {foreign} does not exist"), (4, "project 999999 does not exist")]
+    assert [r[0] for r in _rows("project_images", "project_id")] == [own]
+    assert conn.execute("SELECT COUNT(*) FROM project_images WHERE project_id=?", (foreign,)).fetchone()[0] == 0
+    # All three zip entries are the same pixel: only the kept row holds a reference
+    path = _rows("project_images", "image_path")[0][0]
+    assert _refs(path) >= 1
+    before = _refs(path)
+    bulk.import_rows("project_images", _csv(f"project_id,image\n{foreign},theirs.png\n"), "csv", _zip("theirs.png"))
+    assert _refs(path) == before
+
+
+@pytest.mark.parametrize("fmt", bulk.FORMATS)
+def test_export_then_import_round_trips(tenant, monkeypatch, fmt):
+    bulk.import_rows("team", _jsonl({"name": "Amit", "role": "Director"}, {"name": "Pooja, Jr.", "role": None}),
+                     "jsonl")
+    out = io.StringIO()
+    assert bulk.export_table("team", out, fmt) == 2
+
+    monkeypatch.setattr(db, "TENANT", tenant + "_copy")
+    report = bulk.import_rows("team", io.BytesIO(out.getvalue().encode()), fmt)
+    assert report["inserted"] == 2
+    assert [tuple(r) for r in _rows("team", "name, role")] == [("Amit", "Director"), ("Pooja, Jr.", None)]
+
+
+def test_unknown_table_and_format_are_refused():
+    with pytest.raises(ValueError):
+        bulk.import_rows("users", _csv("username\nroot\n"), "csv")
+    with pytest.raises(ValueError):
+        bulk._format("projects.xlsx")
@@ -0,0 +1,104 @@
+import cache
+import db
+import migrations
+import writer
+
+
+class Loader:
+    def __init__(self, value="rows"):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+def setup_function():
+    cache.clear()
+
+
+def test_reads_are_served_from_memory_until_invalidated():
+    load = Loader()
+    assert cache.read("projects", "SELECT 1", (), load) == "rows"
+    assert cache.read("projects", "SELECT 1", (), load) == "rows"
+    assert load.calls == 1
+
+    cache.invalidate("projects")
+    cache.read("projects", "SELECT 1", (), load)
+    assert load.calls == 2
+
+
+def test_a_read_racing_a_write_is_not_kept():
+    # The write commits and invalidates while the read is still loading
+    # the rows from before it
+    def racing():
+        cache.invalidate("projects")
+        return "old"
+
+    assert cache.read("projects", "SELECT 1", (), racing) == "old"
+    assert cache.read("projects", "SELECT 1", (), Loader("new")) == "new"
+
+    other = Loader()
+    cache.read("press_releases", "SELECT 2", (), lambda: cache.invalidate("projects") or "rows")
+    cache.read("press_releases", "SELECT 2", (), other)
+    assert other.calls == 0     # writes to other tables do not matter
+
+
+def test_invalidation_only_drops_reads_of_those_tables():
+    joined, other = Loader(), Loader()
+    cache.read(("projects", "project_images"), "SELECT 1", (), joined)
+    cache.read("press_releases", "SELECT 2", (), other)
+
+    cache.invalidate("project_images")
+    cache.read(("projects", "project_images"), "SELECT 1", (), joined)
+    cache.read("press_releases", "SELECT 2", (), other)
+    assert (joined.calls, other.calls) == (2, 1)
+
+
+def test_params_are_part_of_the_key():
+    load = Loader()
+    cache.read("projects", "SELECT ?", (1,), load)
+    cache.read("projects", "SELECT ?", (2,), load)
+    assert load.calls == 2
+
+
+def test_entries_expire_after_their_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    load = Loader()
+    cache.read("projects", "SELECT 1", (), load, ttl=10)
+    now[0] += 9
+    cache.read("projects", "SELECT 1", (), load, ttl=10)
+    now[0] += 2
+    cache.read("projects", "SELECT 1", (), load, ttl=10)
+    assert load.calls == 2
+
+
+def test_least_recently_used_entry_is_evicted(monkeypatch):
+    monkeypatch.setattr(cache, "MAX_ENTRIES", 2)
+    first, second, third = Loader(), Loader(), Loader()
+    cache.read("t", "SELECT 1", (), first)
+    cache.read("t", "SELECT 2", (), second)
+    cache.read("t", "SELECT 1", (), first)   # now the most recent
+    cache.read("t", "SELECT 3", (), third)
+
+    cache.read("t", "SELECT 1", (), first)
+    cache.read("t", "SELECT 2", (), second)
+    assert (first.calls, second.calls) == (1, 2)
+    assert not cache._by_table.get("t", set()) - set(cache._entries)
+
+
+def test_writes_through_the_writer_invalidate_cached_reads(tenant):
+    migrations.ensure("about")
+    sql = "SELECT value FROM core_values WHERE tenant=?"
+
+    def read():
+        return cache.fetchall(db.get_connection("about").cursor(), ("core_values",), sql, (tenant,))
+
+    assert read() == []
+    writer.execute(
+        "about", "INSERT INTO core_values (tenant, value) VALUES (?, ?)", (tenant, "Openness"),
+        invalidate=("core_values",)
+    ).result(writer.WRITE_TIMEOUT)
+    assert [r[0] for r in read()] == ["Openness"]
@@ -0,0 +1,106 @@
+import io
+import os
+import sqlite3
+
+import pytest
+
+import benchmark
+import consolidate
+import db
+import migrations
+import storage
+
+
+def _legacy(tmp_path, name, *statements):
+    # A per-app file as the old apps left it, already on the current schema
+    path = str(tmp_path / f"{name}.db")
+    conn = sqlite3.connect(path)
+    migrations.migrate(name, conn)
+    for sql, params in statements:
+        conn.execute(sql, params)
+    conn.commit()
+    conn.close()
+    return path
+
+
+def _count(name, table, tenant):
+    return db.get_connection(name).execute(
+        f"SELECT COUNT(*) FROM {table} WHERE tenant=?", (tenant,)
+    ).fetchone()[0]
+
+
+def test_projects_move_in_with_ids_shifted_and_children_remapped(tmp_path, tenant):
+    path = _legacy(
+        tmp_path, "projects",
+        ("INSERT INTO projects (id, title) VALUES (1, 'Wells')", ()),
+        ("INSERT INTO projects (id, title) VALUES (2, 'School')", ()),
+        ("INSERT INTO project_images (project_id, image_path) VALUES (2, 'uploads/school.png')", ()),
+        ("INSERT INTO stats_overrides (label, value) VALUES ('Volunteers', '300')", ()),
+    )
+    migrations.ensure("projects")
+    conn = db.get_connection("projects")
+    conn.execute("INSERT INTO projects (tenant, title) VALUES ('someone_else', 'Theirs')")
+    conn.commit()
+
+    counts = consolidate.consolidate_file("projects", path, tenant)
+
+    assert counts == {"projects": 2, "project_images": 1}
+    rows = conn.execute(
+        "SELECT p.title FROM project_images i JOIN projects p ON p.id = i.project_id WHERE i.tenant=?", (tenant,)
+    ).fetchall()
+    assert [r[0] for r in rows] == ["School"]
+    assert conn.execute(
+        "SELECT value FROM stats_overrides WHERE tenant=? AND label='Volunteers'", (tenant,)
+    ).fetchone()[0] == "300"
+    assert _count("projects", "projects", "someone_else") >= 1
+
+
+def test_existing_content_is_kept_without_replace(tmp_path, tenant):
+    path = _legacy(tmp_path, "media", ("INSERT INTO videos (video_url) VALUES ('https://v/1')", ()))
+    migrations.ensure("media")
+    conn = db.get_connection("media")
+    conn.execute("INSERT INTO videos (tenant, video_url) VALUES (?, 'https://v/current')", (tenant,))
+    conn.commit()
+
+    with pytest.raises(ValueError, match="--replace"):
+        consolidate.consolidate_file("media", path, tenant)
+    with pytest.raises(SystemExit):
+        consolidate.main(["--tenant", tenant, "--dir", str(tmp_path), "--media", "media.db"])
+
+    assert [r[0] for r in conn.execute("SELECT video_url FROM videos WHERE tenant=?", (tenant,))] \
+        == ["https://v/current"]
+    assert os.path.exists(path)   # not retired either
+
+
+def test_replace_releases_the_blobs_of_deleted_images(tmp_path, tenant):
+    blob = storage.store(io.BytesIO(benchmark.PIXEL_PNG + tenant.encode()), "pixel.png")
+    migrations.ensure("media")
+    conn = db.get_connection("media")
+    conn.execute("INSERT INTO image_gallery (tenant, image_path) VALUES (?, ?)", (tenant, blob))
+    conn.commit()
+    path = _legacy(tmp_path, "media", ("INSERT INTO videos (video_url) VALUES ('https://v/1')", ()))
+
+    assert consolidate.main(["--tenant", tenant, "--dir", str(tmp_path), "--media", "media.db", "--replace"]) == 0
+
+    assert _count("media", "image_gallery", tenant) == 0
+    assert _count("media", "videos", tenant) == 1
+    assert not os.path.exists(blob)
+    assert not os.path.exists(path) and os.path.exists(path + ".migrated")
+
+
+def test_users_are_merged_keeping_existing_accounts(tmp_path):
+    migrations.ensure("users")
+    columns = [r[1] for r in db.get_connection("users").execute("PRAGMA table_info(users)")]
+    assert "username" in columns
+    path = _legacy(tmp_path, "users")
+    legacy = sqlite3.connect(path)
+    legacy_columns = [r[1] for r in legacy.execute("PRAGMA table_info(users)")]
+    legacy.execute(
+        f"INSERT INTO users ({', '.join(legacy_columns)}) VALUES ({', '.join('?' * len(legacy_columns))})",
+        ["moved_in_user" if c == "username" else "x" for c in legacy_columns]
+    )
+    legacy.commit()
+    legacy.close()
+
+    assert consolidate.consolidate_file("users", path, "ignored") == {"users": 1}
+    assert consolidate.consolidate_file("users", path, "ignored") == {"users": 0}
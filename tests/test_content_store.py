@@ -0,0 +1,60 @@
+import pytest
+
+import content_store
+import db
+
+
+@pytest.fixture(autouse=True)
+def fresh_snapshot(monkeypatch):
+    # The snapshot is per process and per organization; start each test
+    # from nothing loaded
+    monkeypatch.setattr(content_store, "_version", None)
+    monkeypatch.setattr(content_store, "_checked_at", 0.0)
+
+
+def test_defaults_until_something_is_saved(tenant):
+    version, content = content_store.snapshot()
+    assert version == 0
+    assert content["vision"] == content_store.DEFAULTS["vision"]
+    assert content["initiatives"] == tuple(content_store.DEFAULTS["initiatives"])
+
+
+def test_update_saves_all_keys_as_one_new_version(tenant):
+    version = content_store.update({"vision": "Clean water", "initiatives": ["Wells", "Filters"]}, 0)
+
+    assert version == 1
+    assert content_store.get("vision") == "Clean water"
+    assert content_store.get("initiatives") == ("Wells", "Filters")
+    assert content_store.get("mission") == content_store.DEFAULTS["mission"]
+
+
+def test_stale_version_is_refused_without_saving(tenant):
+    content_store.update({"vision": "first"}, 0)
+    with pytest.raises(content_store.VersionConflict):
+        content_store.update({"vision": "second"}, 0)
+
+    assert content_store.snapshot()[0] == 1
+    assert content_store.get("vision") == "first"
+    # Without an expected version the save always goes through
+    assert content_store.update({"vision": "third"}) == 2
+
+
+def test_other_processes_saves_are_seen_after_the_check_interval(tenant, monkeypatch):
+    content_store.snapshot()
+    db.get_connection("projects").execute(
+        "INSERT INTO content_version (tenant, version) VALUES (?, 5)", (tenant,)
+    )
+    db.get_connection("projects").execute(
+        "INSERT INTO site_content (tenant, key, value) VALUES (?, 'vision', '\"elsewhere\"')", (tenant,)
+    )
+    db.get_connection("projects").commit()
+    assert content_store.get("vision") == content_store.DEFAULTS["vision"]
+
+    monkeypatch.setattr(content_store, "_checked_at", -content_store.VERSION_CHECK_INTERVAL)
+    assert content_store.get("vision") == "elsewhere"
+
+
+def test_content_is_read_only(tenant):
+    content = content_store.snapshot()[1]
+    with pytest.raises(TypeError):
+        content["vision"] = "changed"
@@ -0,0 +1,66 @@
+import gc
+import threading
+
+import db
+
+
+def _in_thread(fn):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(fn()))
+    thread.start()
+    thread.join()
+    del thread
+    gc.collect()
+    return result[0]
+
+
+def test_one_connection_per_thread_shared_by_every_name():
+    conn = db.get_connection("projects")
+    assert db.get_connection("media") is conn
+    assert _in_thread(lambda: db.get_connection("projects")) is not conn
+
+
+def test_connections_use_wal():
+    assert db.get_connection("projects").execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_finished_threads_hand_their_connection_back(monkeypatch):
+    monkeypatch.setattr(db, "_idle", {})
+    first = _in_thread(lambda: db.get_connection("projects"))
+    assert db._idle[db.DATABASE] == [first]
+    assert _in_thread(lambda: db.get_connection("projects")) is first
+
+
+def test_open_transactions_are_rolled_back_on_hand_back(monkeypatch):
+    monkeypatch.setattr(db, "_idle", {})
+
+    def leave_open():
+        conn = db.get_connection("projects")
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("CREATE TABLE IF NOT EXISTS left_open (id INTEGER)")
+        return conn
+
+    conn = _in_thread(leave_open)
+    assert not conn.in_transaction
+    assert not db.get_connection("projects").execute(
+        "SELECT 1 FROM sqlite_master WHERE name='left_open'"
+    ).fetchone()
+
+
+def test_idle_pool_is_capped(monkeypatch):
+    monkeypatch.setattr(db, "_idle", {})
+    monkeypatch.setattr(db, "MAX_IDLE", 1)
+    barrier = threading.Barrier(3)
+
+    def hold():
+        db.get_connection("projects")
+        barrier.wait()
+
+    threads = [threading.Thread(target=hold) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    del threads, t
+    gc.collect()
+    assert len(db._idle[db.DATABASE]) == 1
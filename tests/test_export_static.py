@@ -0,0 +1,98 @@
+import os
+
+import pytest
+
+import benchmark
+import db
+import export_static
+import migrations
+
+
+@pytest.fixture
+def out(tmp_path, tenant):
+    for name in ("projects", "about", "media", "changes"):
+        migrations.ensure(name)
+    return str(tmp_path / "site")
+
+
+def _write(name, sql, params=()):
+    conn = db.get_connection(name)
+    conn.execute(sql, params)
+    conn.commit()
+
+
+def _read(out, filename):
+    with open(os.path.join(out, filename), encoding="utf-8") as f:
+        return f.read()
+
+
+def _add_project(title, image=None):
+    conn = db.get_connection("projects")
+    project = conn.execute(
+        "INSERT INTO projects (tenant, title, status) VALUES (?, ?, 'Ongoing')", (db.TENANT, title)
+    ).lastrowid
+    if image:
+        conn.execute(
+            "INSERT INTO project_images (tenant, project_id, image_path) VALUES (?, ?, ?)",
+            (db.TENANT, project, image)
+        )
+    conn.commit()
+
+
+def test_first_export_writes_every_page(out):
+    written = export_static.export(out)
+    assert sorted(written) == ["about.html", "index.html", "media.html", "projects.html"]
+    assert os.path.exists(os.path.join(out, export_static.STATE_FILE))
+    assert 'href="assets/site.' in _read(out, "index.html")
+
+
+def test_content_is_escaped(out):
+    _add_project("<script>alert(1)</script>")
+    export_static.export(out)
+    page = _read(out, "projects.html")
+    assert "<script>alert" not in page
+    assert "&lt;script&gt;alert(1)&lt;/script&gt;" in page
+
+
+def test_only_pages_built_from_changed_tables_are_rebuilt(out):
+    export_static.export(out)
+    assert export_static.export(out) == []
+
+    _write("about", "INSERT INTO team (tenant, name, role) VALUES (?, 'Amit', 'Director')", (db.TENANT,))
+    assert export_static.export(out) == ["about.html"]
+
+    _add_project("Wells")
+    assert sorted(export_static.export(out)) == ["index.html", "projects.html"]
+    assert sorted(export_static.export(out, full=True)) == ["about.html", "index.html", "media.html", "projects.html"]
+
+
+def test_projects_are_paged_and_stale_pages_removed(out, monkeypatch):
+    monkeypatch.setattr(export_static, "PROJECTS_PER_PAGE", 2)
+    for i in range(5):
+        _add_project(f"Project {i}")
+    export_static.export(out)
+
+    assert [f for f in sorted(os.listdir(out)) if f.startswith("projects")] == \
+        ["projects-2.html", "projects-3.html", "projects.html"]
+    assert 'href="projects-2.html">Next' in _read(out, "projects.html")
+    assert 'href="projects.html">⬅ Previous' in _read(out, "projects-2.html")
+    assert "Next ➡" not in _read(out, "projects-3.html")
+
+    _write("projects", "DELETE FROM projects WHERE tenant=? AND title IN ('Project 3', 'Project 4')", (db.TENANT,))
+    export_static.export(out)
+    assert not os.path.exists(os.path.join(out, "projects-3.html"))
+
+
+def test_images_are_copied_under_content_hashed_names(out):
+    os.makedirs("uploads", exist_ok=True)
+    pixel = os.path.join("uploads", "export_pixel.png")
+    with open(pixel, "wb") as f:
+        f.write(benchmark.PIXEL_PNG)
+    _add_project("With image", pixel)
+    _add_project("Missing image", os.path.join("uploads", "gone.png"))
+    export_static.export(out)
+
+    assets = [f for f in os.listdir(os.path.join(out, "assets")) if f.endswith(".png")]
+    assert len(assets) == 1
+    page = _read(out, "projects.html")
+    assert page.count("<img ") == 1 and f"assets/{assets[0]}" in page
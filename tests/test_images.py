@@ -0,0 +1,50 @@
+import io
+import json
+import os
+
+import pytest
+
+import images
+import storage
+
+PIL = pytest.importorskip("PIL.Image")
+
+
+def _stored(size, mode="RGB"):
+    buf = io.BytesIO()
+    PIL.new(mode, size).save(buf, "PNG")
+    return storage.store(buf, "photo.png")
+
+
+def test_variants_are_only_made_narrower_than_the_original():
+    path = _stored((1000, 500))
+    variants = images.make_variants(path)
+
+    assert sorted(variants, key=int) == ["150", "300"]
+    for width, variant in variants.items():
+        with PIL.open(variant) as im:
+            assert im.format == images.VARIANT_FORMAT
+            assert im.size == (int(width), int(width) // 2)
+
+
+def test_existing_variants_are_reused():
+    path = _stored((400, 400), mode="L")
+    first = images.make_variants(path)
+    mtimes = {w: os.path.getmtime(p) for w, p in first.items()}
+
+    assert images.make_variants(path) == first
+    assert {w: os.path.getmtime(p) for w, p in first.items()} == mtimes
+
+
+@pytest.mark.parametrize("width, expected", [(100, "150"), (150, "150"), (200, "300"), (1000, None)])
+def test_pick_takes_the_smallest_variant_wide_enough(width, expected):
+    path = _stored((500, 500))
+    variants = images.make_variants(path)
+
+    picked = images.pick(path, json.dumps(variants), width)
+    assert picked == (variants[expected] if expected else path)
+
+
+def test_pick_falls_back_to_the_original():
+    assert images.pick("uploads/a.png", None, 300) == "uploads/a.png"
+    assert images.pick("uploads/a.png", {"300": "uploads/variants/missing_300.webp"}, 300) == "uploads/a.png"
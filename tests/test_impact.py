@@ -0,0 +1,84 @@
+import cache
+import db
+import impact
+import migrations
+
+
+def _projects(*statements):
+    migrations.ensure("projects")
+    conn = db.get_connection("projects")
+    for sql, params in statements:
+        conn.execute(sql, params)
+    conn.commit()
+    cache.clear()
+
+
+def _add(status):
+    return ("INSERT INTO projects (tenant, title, status) VALUES (?, 'p', ?)", (db.TENANT, status))
+
+
+def _recount():
+    # What the counters must always equal
+    conn = db.get_connection("projects")
+    rows = conn.execute(
+        "SELECT 'status:' || status, COUNT(*) FROM projects WHERE tenant=? GROUP BY status", (db.TENANT,)
+    ).fetchall()
+    total = conn.execute("SELECT COUNT(*) FROM projects WHERE tenant=?", (db.TENANT,)).fetchone()[0]
+    return {**dict(rows), "total": total}
+
+
+def _counters():
+    rows = db.get_connection("projects").execute(
+        "SELECT key, value FROM project_stats WHERE tenant=? AND value != 0", (db.TENANT,)
+    ).fetchall()
+    return dict(rows)
+
+
+def test_counters_follow_inserts_updates_and_deletes(tenant):
+    _projects(_add("Ongoing"), _add("Ongoing"), _add("Completed"))
+    assert _counters() == _recount() == {"status:Ongoing": 2, "status:Completed": 1, "total": 3}
+
+    _projects(("UPDATE projects SET status='Completed' WHERE tenant=? AND status='Ongoing' "
+               "AND id=(SELECT MIN(id) FROM projects WHERE tenant=?)", (tenant, tenant)))
+    assert _counters() == _recount()
+
+    _projects(("DELETE FROM projects WHERE tenant=? AND status='Completed'", (tenant,)))
+    assert _counters() == _recount() == {"status:Ongoing": 1, "total": 1}
+
+
+def test_media_counters_cover_every_media_table(tenant):
+    migrations.ensure("media")
+    conn = db.get_connection("media")
+    conn.execute("INSERT INTO press_releases (tenant, title, description, release_date) VALUES (?, 'r', 'd', '2024-01-01')", (tenant,))
+    conn.execute("INSERT INTO image_gallery (tenant, image_path) VALUES (?, 'x.png')", (tenant,))
+    conn.execute("INSERT INTO image_gallery (tenant, image_path) VALUES (?, 'y.png')", (tenant,))
+    conn.commit()
+    cache.clear()
+
+    stats = impact.computed()
+    assert stats["Press Releases"] == 1
+    assert stats["Media Items"] == 2
+
+
+def test_counters_are_kept_per_tenant(tenant, monkeypatch):
+    _projects(_add("Ongoing"))
+    monkeypatch.setattr(db, "TENANT", tenant + "_other")
+    _projects(_add("Ongoing"), _add("Ongoing"))
+    assert impact.computed()["Ongoing Projects"] == 2
+
+    monkeypatch.setattr(db, "TENANT", tenant)
+    cache.clear()
+    assert impact.computed()["Ongoing Projects"] == 1
+
+
+def test_overrides_replace_counters_with_the_same_label(tenant):
+    _projects(_add("Ongoing"))
+    impact.set_override("Ongoing Projects", "10+")
+    impact.set_override("Volunteers", "300")
+
+    stats = impact.impact_stats()
+    assert stats["Ongoing Projects"] == "10+"
+    assert stats["Volunteers"] == "300"
+
+    impact.remove_override("Ongoing Projects")
+    assert impact.impact_stats()["Ongoing Projects"] == 1
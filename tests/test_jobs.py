@@ -0,0 +1,198 @@
+import io
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import bulk
+import cache
+import db
+import jobs
+from conftest import ROOT
+
+
+@pytest.fixture(autouse=True)
+def no_worker_pool(monkeypatch):
+    # Jobs are run here, in this process, one _claim/_run at a time
+    monkeypatch.setattr(jobs, "ensure_workers", lambda: None)
+    yield
+    conn = db.get_connection("jobs")
+    conn.execute("UPDATE jobs SET status='failed' WHERE status IN ('queued', 'running')")
+    conn.commit()
+
+
+def _run_next(job_id):
+    conn = db.get_connection("jobs")
+    claimed = jobs._claim(conn, os.getpid())
+    assert claimed is not None and claimed[0] == job_id
+    jobs._run(conn, *claimed)
+    return jobs.get(job_id)
+
+
+def _make_due(job_id):
+    conn = db.get_connection("jobs")
+    conn.execute("UPDATE jobs SET run_after=0 WHERE id=?", (job_id,))
+    conn.commit()
+
+
+def _failing(payload, progress):
+    raise RuntimeError("disk full")
+
+
+def test_finished_job_keeps_its_result_and_invalidates_on_sync(tenant, monkeypatch):
+    monkeypatch.setitem(jobs.HANDLERS, "search_reindex", (lambda payload, progress: {"rows": 3}, 3))
+    cache.read("jobs_test_table", "q", (), lambda: 1)
+    job_id = jobs.enqueue("search_reindex", {}, invalidate=("jobs_test_table",), start=False)
+    assert jobs.get(job_id)["status"] == "queued"
+
+    job = _run_next(job_id)
+    assert (job["status"], job["result"], job["attempts"], job["tenant"]) == ("done", {"rows": 3}, 1, tenant)
+
+    jobs.sync()
+    assert "jobs_test_table" not in cache._by_table
+
+
+def test_failures_back_off_then_fail_after_the_last_attempt(tenant, monkeypatch):
+    monkeypatch.setitem(jobs.HANDLERS, "search_reindex", (_failing, 2))
+    job_id = jobs.enqueue("search_reindex", {}, start=False)
+
+    job = _run_next(job_id)
+    assert job["status"] == "queued"
+    assert job["error"] == "RuntimeError: disk full"
+    assert job["run_after"] >= job["started_at"] + jobs.RETRY_BACKOFF - 1
+    assert jobs._claim(db.get_connection("jobs"), os.getpid()) is None   # not due yet
+
+    _make_due(job_id)
+    job = _run_next(job_id)
+    assert (job["status"], job["attempts"]) == ("failed", 2)
+
+
+def test_retry_requeues_only_retryable_failed_jobs(tenant, monkeypatch):
+    monkeypatch.setitem(jobs.HANDLERS, "search_reindex", (_failing, 2))
+    monkeypatch.setitem(jobs.HANDLERS, "bulk_import", (_failing, 1))
+    reindex = jobs.enqueue("search_reindex", {}, start=False)
+    _run_next(reindex)
+    _make_due(reindex)
+    _run_next(reindex)
+    upload = jobs.enqueue("bulk_import", {}, start=False)
+    assert _run_next(upload)["status"] == "failed"   # a single attempt, no backoff
+
+    assert not jobs.retryable("bulk_import")
+    assert jobs.retry(upload) is False
+    assert jobs.get(upload)["status"] == "failed"
+
+    assert jobs.retry(reindex) is True
+    job = jobs.get(reindex)
+    assert (job["status"], job["attempts"], job["error"]) == ("queued", 0, None)
+    assert jobs.retry(reindex) is False   # already queued
+
+
+def test_jobs_of_a_dead_worker_are_retried(tenant):
+    job_id = jobs.enqueue("search_reindex", {}, start=False)
+    conn = db.get_connection("jobs")
+    assert jobs._claim(conn, 12345)[0] == job_id
+
+    jobs._retry_or_fail(conn, "worker=?", (12345,), "worker exited with code -9")
+    job = jobs.get(job_id)
+    assert (job["status"], job["error"], job["worker"]) == ("queued", "worker exited with code -9", None)
+
+
+def _workers(pid):
+    # Live (not zombie) job workers whose parent is pid; the spawn
+    # context's resource tracker is a child too, but not a worker
+    found = []
+    for entry in os.listdir("/proc"):
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            with open(f"/proc/{entry}/cmdline", "rb") as f:
+                cmdline = f.read()
+        except (OSError, IndexError):
+            continue
+        if fields[0] != "Z" and int(fields[1]) == pid and b"spawn_main" in cmdline:
+            found.append(int(entry))
+    return found
+
+
+def _alive(pid):
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except OSError:
+        return False
+
+
+def _wait_for(condition, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.2)
+    return False
+
+
+@pytest.fixture
+def pool():
+    # A worker pool in its own supervisor process -> (supervisor, worker pids)
+    supervisor = subprocess.Popen([sys.executable, os.path.join(ROOT, "jobs.py"), "work", "--workers", "2"])
+    workers = []
+    try:
+        assert _wait_for(lambda: len(_workers(supervisor.pid)) == 2)
+        workers = _workers(supervisor.pid)
+        yield supervisor, workers
+    finally:
+        for pid in [supervisor.pid, *workers]:
+            if _alive(pid):
+                os.kill(pid, signal.SIGKILL)
+        supervisor.wait()
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc"), reason="reads the process table from /proc")
+def test_sigterm_to_the_supervisor_stops_its_workers(pool):
+    supervisor, workers = pool
+    supervisor.send_signal(signal.SIGTERM)
+    assert supervisor.wait(30) == 128 + signal.SIGTERM
+    assert _wait_for(lambda: not any(_alive(pid) for pid in workers))
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc"), reason="reads the process table from /proc")
+def test_workers_exit_when_the_supervisor_is_killed(pool):
+    supervisor, workers = pool
+    supervisor.kill()
+    supervisor.wait()
+    assert _wait_for(lambda: not any(_alive(pid) for pid in workers))
+
+
+def test_export_job_writes_a_spool_file(tenant):
+    bulk.import_rows("programs", io.BytesIO(b"program\nLibrary\nClinic\n"), "csv")
+    job = _run_next(jobs.enqueue("bulk_export", {"table": "programs", "format": "csv"}, start=False))
+
+    assert job["result"]["rows"] == 2
+    assert os.path.dirname(job["result"]["path"]) == os.path.abspath(jobs.SPOOL_DIR)
+    with open(job["result"]["path"], encoding="utf-8") as f:
+        rows = f.read().splitlines()
+    assert len(rows) == 3 and "Library" in rows[1] and "Clinic" in rows[2]
+
+
+FAILED_JOB = """
+import streamlit as st
+import jobs
+
+jobs._show(st.session_state.job)
+"""
+
+
+@pytest.mark.parametrize("kind, has_retry", [("bulk_import", False), ("search_reindex", True)])
+def test_retry_button_only_for_retryable_jobs(tmp_path, kind, has_retry):
+    path = tmp_path / "page.py"
+    path.write_text(FAILED_JOB)
+    at = AppTest.from_file(str(path))
+    at.session_state["job"] = {"id": 1, "kind": kind, "status": "failed", "attempts": 1, "error": "boom"}
+    at.run()
+
+    assert bool(at.button) == has_retry
+    assert bool(at.caption) != has_retry
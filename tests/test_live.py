@@ -0,0 +1,67 @@
+from collections import deque
+
+import pytest
+
+import cache
+import db
+import live
+
+
+@pytest.fixture(autouse=True)
+def fresh_feed(monkeypatch, tenant):
+    # Every call polls, and the feed starts from the tenant's current head
+    monkeypatch.setattr(live, "POLL_INTERVAL", 0)
+    monkeypatch.setattr(live, "_head", None)
+    monkeypatch.setattr(live, "_polls", deque(maxlen=live.HISTORY))
+    live.head()
+
+
+def _write(name, sql, params=()):
+    conn = db.get_connection(name)
+    conn.execute(sql, params)
+    conn.commit()
+
+
+def test_nothing_new_since_the_head():
+    seq = live.head()
+    assert live.changes_since(seq) == (seq, frozenset())
+
+
+def test_changes_name_their_tables_and_derived_counters(tenant):
+    seq = live.head()
+    _write("projects", "INSERT INTO projects (tenant, title) VALUES (?, 'p')", (tenant,))
+    _write("about", "INSERT INTO team (tenant, name) VALUES (?, 'Amit')", (tenant,))
+
+    newest, changed = live.changes_since(seq)
+    assert newest > seq
+    assert changed == {"projects", "project_stats", "team"}
+    assert live.changes_since(newest) == (newest, frozenset())
+
+
+def test_other_tenants_changes_are_not_seen(tenant):
+    seq = live.head()
+    _write("media", "INSERT INTO videos (tenant, video_url) VALUES ('someone_else', 'https://v')")
+    assert live.changes_since(seq) == (seq, frozenset())
+
+
+def test_sessions_older_than_the_history_redraw_everything(tenant, monkeypatch):
+    monkeypatch.setattr(live, "_polls", deque(maxlen=1))
+    seq = live.head()
+    _write("about", "INSERT INTO programs (tenant, program) VALUES (?, 'a')", (tenant,))
+    live.head()
+    _write("about", "INSERT INTO programs (tenant, program) VALUES (?, 'b')", (tenant,))
+
+    newest, changed = live.changes_since(seq)
+    assert changed is None
+    assert live.changes_since(None) == (newest, None)
+
+
+def test_polls_drop_cached_reads_of_changed_tables(tenant):
+    cache.read("story", "q", (), lambda: 1)
+    cache.read("programs", "q", (), lambda: 1)
+    # Written straight to the database, as another process would
+    _write("about", "INSERT INTO story (tenant, text) VALUES (?, 'new')", (tenant,))
+    live.head()
+
+    assert "story" not in cache._by_table
+    assert "programs" in cache._by_table
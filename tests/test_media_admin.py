@@ -0,0 +1,152 @@
+import io
+import os
+import secrets
+import threading
+import time
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import authz
+import cache
+import db
+import migrations
+import sessions
+import storage
+import user_store
+import writer
+from conftest import ROOT
+
+PIL = pytest.importorskip("PIL.Image")
+
+
+def _signed_in(username):
+    # A fresh AppTest session (browser tab) on the Admin menu
+    token, expires_at = sessions.issue(authz.SCOPE, username)
+    at = AppTest.from_file(os.path.join(ROOT, "media.py"), default_timeout=30)
+    at.session_state[f"session_{authz.SCOPE}"] = (token, expires_at, username, time.time())
+    at.run()
+    at.sidebar.radio[0].set_value("Admin").run()
+    assert not at.exception
+    return at
+
+
+@pytest.fixture
+def media_manager(tenant, monkeypatch):
+    monkeypatch.setattr(sessions, "_cookie", lambda scope: None)
+    username = f"media_{secrets.token_hex(4)}"
+    user_store.create_user(username, "pw")
+    authz.set_roles(username, ["media_manager"])
+    return username
+
+
+@pytest.fixture
+def admin(media_manager):
+    return _signed_in(media_manager)
+
+
+def _gallery(*colors):
+    migrations.ensure("media")
+    paths = []
+    for color in colors:
+        buf = io.BytesIO()
+        PIL.new("RGB", (20, 20), color).save(buf, "PNG")
+        paths.append(storage.store(buf, "g.png"))
+
+    conn = db.get_connection("media")
+    rows = [(conn.execute(
+        "INSERT INTO image_gallery (tenant, image_path) VALUES (?, ?)", (db.TENANT, path)
+    ).lastrowid, path) for path in paths]
+    conn.commit()
+    cache.invalidate("image_gallery")
+    return rows
+
+
+def _remaining():
+    return [r[0] for r in db.get_connection("media").execute(
+        "SELECT id FROM image_gallery WHERE tenant=? ORDER BY id", (db.TENANT,)
+    )]
+
+
+def test_selected_images_are_deleted_together_and_released(admin):
+    (keep, kept_path), (first, first_path), (second, second_path) = _gallery("#010101", "#020202", "#030303")
+    admin.run()
+
+    admin.checkbox(key=f"img_sel_{first}").check()
+    admin.checkbox(key=f"img_sel_{second}").check()
+    admin.button(key="img_delete").click().run()
+
+    assert _remaining() == [keep]
+    assert os.path.exists(kept_path)
+    assert not os.path.exists(first_path) and not os.path.exists(second_path)
+    assert "Deleted 2 images" in [s.value for s in admin.success]
+    assert f"img_sel_{first}" not in admin.session_state
+
+
+def test_deleting_a_row_twice_keeps_a_shared_blob(media_manager):
+    # Two tabs delete the same row; the second delete removes nothing and
+    # must not drop the reference held by the duplicate upload
+    (first, path), (duplicate, same_path) = _gallery("#060606", "#060606")
+    assert path == same_path
+    tab1, tab2 = _signed_in(media_manager), _signed_in(media_manager)
+    tab1.checkbox(key=f"img_sel_{first}").check()
+    tab2.checkbox(key=f"img_sel_{first}").check()
+
+    tab1.button(key="img_delete").click().run()
+    tab2.button(key="img_delete").click().run()
+
+    assert _remaining() == [duplicate]
+    assert os.path.exists(path)
+    assert "Deleted 0 images" in [s.value for s in tab2.success]
+
+
+def test_pending_delete_warns_and_releases_once_committed(admin, monkeypatch):
+    (img_id, path), = _gallery("#070707")
+    admin.run()
+    admin.checkbox(key=f"img_sel_{img_id}").check()
+
+    started, release = threading.Event(), threading.Event()
+    hold = writer.submit("media", lambda conn: started.set() or release.wait(writer.WRITE_TIMEOUT))
+    assert started.wait(writer.WRITE_TIMEOUT)
+    monkeypatch.setattr(writer, "WRITE_TIMEOUT", 0.05)
+    try:
+        admin.button(key="img_delete").click().run()
+    finally:
+        release.set()
+    hold.result(10)
+
+    assert writer.PENDING in [w.value for w in admin.warning]
+    assert not admin.exception
+    writer.stop()   # applies the queued delete and its release
+    assert _remaining() == [] and not os.path.exists(path)
+
+
+def test_nothing_selected_deletes_nothing(admin):
+    rows = _gallery("#040404")
+    admin.run()
+    admin.button(key="img_delete").click().run()
+    assert _remaining() == [rows[0][0]]
+
+
+def test_other_tenants_rows_are_out_of_reach(admin, tenant, monkeypatch):
+    monkeypatch.setattr(db, "TENANT", tenant + "_other")
+    (theirs, _), = _gallery("#050505")
+    monkeypatch.setattr(db, "TENANT", tenant)
+    admin.run()
+
+    assert not [c for c in admin.checkbox if c.key == f"img_sel_{theirs}"]
+    assert "No images uploaded yet." in [i.value for i in admin.info]
+
+
+def test_signed_out_visitors_get_the_login_form(tenant):
+    at = AppTest.from_file(os.path.join(ROOT, "media.py"), default_timeout=30).run()
+    at.sidebar.radio[0].set_value("Admin").run()
+    assert "🔐 Admin Login" in [s.value for s in at.subheader]
+    assert not [b for b in at.button if b.key == "img_delete"]
+
+
+def test_sessions_past_their_expiry_are_signed_out(admin):
+    username = admin.session_state[f"session_{authz.SCOPE}"][2]
+    admin.session_state[f"session_{authz.SCOPE}"] = ("x.y", time.time() - 1, username, time.time())
+    admin.run()
+    assert "🔐 Admin Login" in [s.value for s in admin.subheader]
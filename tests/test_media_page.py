@@ -0,0 +1,94 @@
+import os
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import benchmark
+import db
+import migrations
+from conftest import ROOT
+
+GALLERY_PAGE_SIZE = 24
+VIDEO_PAGE_SIZE = 6
+
+
+def _seed(table, column, values):
+    migrations.ensure("media")
+    conn = db.get_connection("media")
+    conn.executemany(f"INSERT INTO {table} (tenant, {column}) VALUES (?, ?)", [(db.TENANT, v) for v in values])
+    conn.commit()
+
+
+def _pixel():
+    os.makedirs("uploads", exist_ok=True)
+    path = os.path.join("uploads", "pixel.png")
+    with open(path, "wb") as f:
+        f.write(benchmark.PIXEL_PNG)
+    return path
+
+
+def _page():
+    return AppTest.from_file(os.path.join(ROOT, "media.py"), default_timeout=30).run()
+
+
+def _button(at, key):
+    return next(b for b in at.button if b.key == key)
+
+
+def _images(at):
+    # The gallery is one st.image call with a list of images
+    return sum(len(im.proto.imgs) for im in at.get("image"))
+
+
+def test_gallery_pages_through_windows_of_images(tenant):
+    _seed("image_gallery", "image_path", [_pixel()] * (GALLERY_PAGE_SIZE + 5))
+    at = _page()
+    assert not at.exception
+    assert _images(at) == GALLERY_PAGE_SIZE
+
+    _button(at, "gallery_cursors_next").click().run()
+    assert _images(at) == 5
+    assert _button(at, "gallery_cursors_next").disabled
+
+
+def test_only_the_clicked_video_gets_a_player(tenant):
+    urls = [f"https://www.youtube.com/watch?v=abcdefghij{i}" for i in range(3)] + ["https://vimeo.com/1"]
+    _seed("videos", "video_url", urls)
+    at = _page()
+
+    assert not at.get("video")
+    thumbnails = [im.proto.imgs[0].url for im in at.get("image") if "img.youtube.com" in im.proto.imgs[0].url]
+    assert thumbnails == [f"https://img.youtube.com/vi/abcdefghij{i}/hqdefault.jpg" for i in range(3)]
+    assert "https://vimeo.com/1" in [c.value for c in at.caption]
+
+    play = [b for b in at.button if b.label == "▶ Play"]
+    assert len(play) == 4
+    play[1].click().run()
+    assert len(at.get("video")) == 1
+    assert len([b for b in at.button if b.label == "▶ Play"]) == 3
+
+
+def test_videos_are_paged(tenant):
+    _seed("videos", "video_url", [f"https://youtu.be/abcdefghij{i % 10}" for i in range(VIDEO_PAGE_SIZE + 1)])
+    at = _page()
+    assert len([b for b in at.button if b.label == "▶ Play"]) == VIDEO_PAGE_SIZE
+    _button(at, "video_cursors_next").click().run()
+    assert len([b for b in at.button if b.label == "▶ Play"]) == 1
+
+
+@pytest.mark.parametrize("url, video_id", [
+    ("https://www.youtube.com/watch?v=dQw4w9WgXcQ", "dQw4w9WgXcQ"),
+    ("https://www.youtube.com/watch?feature=share&v=dQw4w9WgXcQ", "dQw4w9WgXcQ"),
+    ("https://youtu.be/dQw4w9WgXcQ?t=10", "dQw4w9WgXcQ"),
+    ("https://www.youtube.com/embed/dQw4w9WgXcQ", "dQw4w9WgXcQ"),
+    ("https://www.youtube.com/shorts/dQw4w9WgXcQ", "dQw4w9WgXcQ"),
+    ("https://vimeo.com/76979871", None),
+])
+def test_youtube_ids_are_recognised(tenant, url, video_id):
+    _seed("videos", "video_url", [url])
+    at = _page()
+    urls = [im.proto.imgs[0].url for im in at.get("image")]
+    if video_id:
+        assert f"https://img.youtube.com/vi/{video_id}/hqdefault.jpg" in urls
+    else:
+        assert not any("img.youtube.com" in u for u in urls)
@@ -0,0 +1,95 @@
+import sqlite3
+
+import pytest
+
+import db
+import migrations
+
+# "changes" builds on the content schemas, so they go first (as in live.py)
+ORDER = ["projects", "about", "media", "changes", "users", "sessions", "storage", "jobs"]
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(tmp_path / "fresh.db")
+    yield conn
+    conn.close()
+
+
+def _schema(conn):
+    return conn.execute(
+        "SELECT type, name, sql FROM sqlite_master WHERE name NOT LIKE 'sqlite_%' ORDER BY type, name"
+    ).fetchall()
+
+
+def _counts(conn):
+    tables = [r[0] for r in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' "
+        "AND name NOT LIKE '%_fts%' AND name != 'schema_migrations'"
+    )]
+    return {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in tables}
+
+
+def test_every_database_covers_its_migrations():
+    assert sorted(migrations.MIGRATIONS) == sorted(db.DATABASES)
+
+
+def test_migrating_twice_changes_nothing(conn):
+    for name in ORDER:
+        migrations.migrate(name, conn)
+    schema, counts = _schema(conn), _counts(conn)
+    applied = conn.execute("SELECT app, version FROM schema_migrations ORDER BY app, version").fetchall()
+
+    for name in ORDER:
+        migrations.migrate(name, conn)
+
+    assert _schema(conn) == schema
+    assert _counts(conn) == counts   # seed rows are not added again
+    assert conn.execute("SELECT app, version FROM schema_migrations ORDER BY app, version").fetchall() == applied
+    assert sorted(applied) == sorted((name, v) for name in ORDER for v, _ in migrations.MIGRATIONS[name])
+
+
+def test_versions_are_unique_and_increasing():
+    for name, steps in migrations.MIGRATIONS.items():
+        versions = [v for v, _ in steps]
+        assert versions == sorted(set(versions)), name
+
+
+def test_a_failing_step_is_rolled_back_and_not_recorded(conn, monkeypatch):
+    monkeypatch.setitem(migrations.MIGRATIONS, "projects", migrations.MIGRATIONS["projects"] + [
+        (999, ["CREATE TABLE half_done (id INTEGER)", "THIS IS NOT SQL"]),
+    ])
+    with pytest.raises(sqlite3.OperationalError):
+        migrations.migrate("projects", conn)
+
+    assert not conn.execute("SELECT 1 FROM sqlite_master WHERE name='half_done'").fetchone()
+    assert not conn.execute("SELECT 1 FROM schema_migrations WHERE version=999").fetchone()
+    assert conn.execute("SELECT COUNT(*) FROM schema_migrations WHERE app='projects'").fetchone()[0] \
+        == len(migrations.MIGRATIONS["projects"]) - 1
+
+
+def test_day_columns_follow_the_dates(conn):
+    migrations.migrate("projects", conn)
+    conn.execute(
+        "INSERT INTO projects (title, start_date, end_date) VALUES ('a', '1970-01-02', '2024-02-29')"
+    )
+    conn.execute("INSERT INTO projects (title, start_date) VALUES ('b', '2024-03-01')")
+
+    rows = conn.execute("SELECT title, start_day, end_day FROM projects ORDER BY id").fetchall()
+    assert rows[0] == ("a", 1, 19782)
+    # No end date: still running, so it overlaps every later range
+    assert rows[1][1] == 19783 and rows[1][2] == 2932896
+
+    conn.execute("UPDATE projects SET end_date='2024-03-02' WHERE title='b'")
+    assert conn.execute("SELECT end_day FROM projects WHERE title='b'").fetchone()[0] == 19784
+
+
+def test_ensure_runs_each_database_once(monkeypatch):
+    calls = []
+    monkeypatch.setattr(migrations, "_done", set())
+    monkeypatch.setattr(migrations, "migrate", lambda name, conn=None: calls.append(name))
+
+    migrations.ensure("media")
+    migrations.ensure("media")
+    migrations.ensure("about")
+    assert calls == ["media", "about"]
@@ -0,0 +1,79 @@
+import os
+from datetime import date
+
+from streamlit.testing.v1 import AppTest
+
+import db
+import migrations
+from conftest import ROOT
+
+PROJECTS = [
+    # title, status, start, end, location
+    ("Wells", "Ongoing", "2022-03-01", None, "Pune"),
+    ("School", "Completed", "2021-01-01", "2021-06-30", "Satara"),
+    ("Clinic", "Completed", "2023-05-01", "2023-05-31", "Pune"),
+    ("Library", "Upcoming", None, None, "Nashik"),
+]
+
+
+def _page():
+    migrations.ensure("projects")
+    conn = db.get_connection("projects")
+    conn.executemany(
+        "INSERT INTO projects (tenant, title, description, status, start_date, end_date, location) "
+        "VALUES (?, ?, '', ?, ?, ?, ?)",
+        [(db.TENANT, *p) for p in PROJECTS]
+    )
+    conn.commit()
+    return AppTest.from_file(os.path.join(ROOT, "our.py"), default_timeout=30).run()
+
+
+def _titles(at):
+    return sorted(s.value for s in at.subheader)
+
+
+def _total(at):
+    return next(c.value for c in at.caption if c.value.endswith("projects match"))
+
+
+def _labels(at):
+    # Options as shown: "name (projects under the other filters)"
+    return sorted(at.multiselect[0].options)
+
+
+def _location_id(name):
+    return db.get_connection("projects").execute(
+        "SELECT id FROM locations WHERE tenant=? AND name=?", (db.TENANT, name)
+    ).fetchone()[0]
+
+
+def test_range_matches_projects_active_on_any_day_of_it(tenant):
+    at = _page()
+    at.date_input[0].set_value((date(2021, 6, 30), date(2022, 3, 1))).run()
+    # School ends on the first day, Wells starts on the last; Wells has no
+    # end so it is still running
+    assert _titles(at) == ["School", "Wells"]
+    assert _total(at) == "2 projects match"
+
+    at.date_input[0].set_value((date(2023, 6, 1), date(2030, 1, 1))).run()
+    assert _titles(at) == ["Wells"]
+
+
+def test_undated_projects_only_show_without_a_range(tenant):
+    at = _page()
+    assert _titles(at) == ["Clinic", "Library", "School", "Wells"]
+    at.date_input[0].set_value((date(2020, 1, 1), date(2030, 1, 1))).run()
+    assert "Library" not in _titles(at)
+
+
+def test_location_filter_and_its_counts(tenant):
+    at = _page()
+    assert _labels(at) == ["Nashik (1)", "Pune (2)", "Satara (1)"]
+
+    at.multiselect[0].set_value([_location_id("Pune")]).run()
+    assert _titles(at) == ["Clinic", "Wells"]
+
+    # Location counts follow the other filters, not the location one
+    at.selectbox[0].set_value("Completed").run()
+    assert _titles(at) == ["Clinic"]
+    assert _labels(at) == ["Nashik (0)", "Pune (1)", "Satara (1)"]
@@ -0,0 +1,78 @@
+import os
+
+from streamlit.testing.v1 import AppTest
+
+import benchmark
+import db
+import migrations
+from conftest import ROOT
+
+PAGE_SIZE = 20
+
+
+def _seed(count, images_per_project=2):
+    migrations.ensure("projects")
+    os.makedirs("uploads", exist_ok=True)
+    pixel = os.path.join("uploads", "pixel.png")
+    with open(pixel, "wb") as f:
+        f.write(benchmark.PIXEL_PNG)
+
+    conn = db.get_connection("projects")
+    ids = []
+    for i in range(count):
+        ids.append(conn.execute(
+            "INSERT INTO projects (tenant, title, description, status, location) VALUES (?, ?, '', 'Ongoing', 'Pune')",
+            (db.TENANT, f"Project {i}")
+        ).lastrowid)
+        conn.executemany(
+            "INSERT INTO project_images (tenant, project_id, image_path) VALUES (?, ?, ?)",
+            [(db.TENANT, ids[-1], pixel)] * images_per_project
+        )
+    conn.commit()
+    return ids
+
+
+def _titles(at):
+    return [s.value for s in at.subheader if s.value.startswith("Project ")]
+
+
+def _button(at, label):
+    return next(b for b in at.button if b.label == label)
+
+
+def test_pages_split_on_id_boundaries(tenant):
+    _seed(PAGE_SIZE * 2 + 1)
+    at = AppTest.from_file(os.path.join(ROOT, "our.py"), default_timeout=30).run()
+    assert not at.exception
+
+    seen = []
+    for expected in (PAGE_SIZE, PAGE_SIZE, 1):
+        titles = _titles(at)
+        assert len(titles) == expected
+        seen += titles
+        if expected == PAGE_SIZE:
+            _button(at, "Next ➡").click().run()
+
+    # Every project exactly once, in id order, and no page after the last
+    assert seen == [f"Project {i}" for i in range(PAGE_SIZE * 2 + 1)]
+    assert _button(at, "Next ➡").disabled
+
+    _button(at, "⬅ Previous").click().run()
+    assert _titles(at)[0] == f"Project {PAGE_SIZE}"
+
+
+def test_exactly_one_full_page_has_no_next(tenant):
+    _seed(PAGE_SIZE)
+    at = AppTest.from_file(os.path.join(ROOT, "our.py"), default_timeout=30).run()
+
+    assert len(_titles(at)) == PAGE_SIZE
+    assert _button(at, "Next ➡").disabled
+    assert _button(at, "⬅ Previous").disabled
+
+
+def test_page_query_returns_every_image_of_its_projects(tenant):
+    _seed(3, images_per_project=3)
+    at = AppTest.from_file(os.path.join(ROOT, "our.py"), default_timeout=30).run()
+
+    assert len(_titles(at)) == 3
+    assert len(at.get("image")) == 9
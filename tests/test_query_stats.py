@@ -0,0 +1,45 @@
+import pytest
+
+import db
+import migrations
+
+
+@pytest.fixture
+def stats():
+    db.reset_stats()
+    yield
+    db.reset_stats()
+
+
+@pytest.mark.parametrize("sql, expected", [
+    ("SELECT * FROM t WHERE id = 42", "SELECT * FROM t WHERE id = ?"),
+    ("SELECT 'it''s', 3.5 FROM t2", "SELECT ?, ? FROM t2"),
+    ("SELECT  a\n  FROM   t", "SELECT a FROM t"),
+])
+def test_literals_and_spacing_are_normalized(sql, expected):
+    assert db.normalize(sql) == expected
+
+
+def test_statements_are_counted_with_rows_and_callers(stats):
+    conn = db.get_connection("projects")
+    for n in (1, 2, 3):
+        conn.execute(f"SELECT value FROM json_each('[1,2,3]') WHERE value >= {n}").fetchall()
+
+    entry = next(s for s in db.query_stats() if "json_each" in s["sql"])
+    assert entry["calls"] == 3
+    assert entry["rows"] == 3 + 2 + 1
+    assert entry["callers"] == {"test_query_stats.py:test_statements_are_counted_with_rows_and_callers": 3}
+    assert sum(entry["histogram"]) == 3
+    assert db.run_stats()["queries"] == 3
+
+
+def test_slow_queries_are_logged_with_their_plan(stats, monkeypatch):
+    migrations.ensure("projects")
+    monkeypatch.setattr(db, "SLOW_QUERY_MS", 0)
+    db.get_connection("projects").execute(
+        "SELECT id FROM projects WHERE tenant=? AND id > ?", ("x", 0)
+    ).fetchall()
+
+    slow = db.slow_queries()
+    assert slow[-1]["sql"] == "SELECT id FROM projects WHERE tenant=? AND id > ?"
+    assert any("projects" in step for step in slow[-1]["plan"])
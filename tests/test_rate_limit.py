@@ -0,0 +1,110 @@
+import random
+
+import pytest
+
+import rate_limit
+from rate_limit import SlidingWindowLimiter, forwarded_client
+
+
+def _allowed(limiter, key, times):
+    return [limiter.hit(key, now=t)[0] for t in times]
+
+
+def test_limit_within_one_window():
+    limiter = SlidingWindowLimiter(5, window=100)
+    assert _allowed(limiter, "alice", range(6)) == [True] * 5 + [False]
+    # Other keys are counted on their own
+    assert limiter.hit("bob", now=6) == (True, 0)
+
+
+def test_denied_attempts_are_not_counted():
+    limiter = SlidingWindowLimiter(2, window=100)
+    _allowed(limiter, "alice", [0, 1, 2, 3, 4, 5])
+    assert limiter._entries["alice"] == [0, 0, 2]
+
+
+def test_previous_window_is_weighted_by_its_overlap():
+    limiter = SlidingWindowLimiter(5, window=100)
+    _allowed(limiter, "alice", [10, 20, 30, 40])
+    # Half way through the next window the 4 earlier attempts weigh 2,
+    # leaving room for 3 more
+    assert _allowed(limiter, "alice", [150, 150, 150, 150]) == [True, True, True, False]
+
+
+def test_windows_skipped_entirely_forget_the_past():
+    limiter = SlidingWindowLimiter(5, window=100)
+    _allowed(limiter, "alice", range(5))
+    assert not limiter.hit("alice", now=99)[0]
+    assert _allowed(limiter, "alice", [200, 201, 202, 203, 204]) == [True] * 5
+
+
+def test_retry_after_when_the_current_window_is_full():
+    limiter = SlidingWindowLimiter(5, window=100)
+    _allowed(limiter, "alice", range(5))
+    allowed, retry_after = limiter.hit("alice", now=5)
+    assert not allowed
+    # At 100 the full previous window still weighs 5; just after, less
+    assert retry_after == 96
+    assert not limiter.hit("alice", now=100)[0]
+    assert limiter.hit("alice", now=5 + retry_after)[0]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_retry_after_is_the_first_whole_second_allowed(seed):
+    rng = random.Random(seed)
+    limit, window = rng.randint(1, 10), rng.choice([10, 60, 300])
+    history = []
+    t = 0.0
+    while True:
+        t += rng.expovariate(limit / window * 2)
+        history.append(t)
+        limiter = SlidingWindowLimiter(limit, window)
+        _allowed(limiter, "k", history)
+        allowed, retry_after = limiter.hit("k", now=t)
+        if not allowed:
+            break
+
+    def allowed_at(delay):
+        replay = SlidingWindowLimiter(limit, window)
+        _allowed(replay, "k", history)
+        return replay.hit("k", now=t + delay)[0]
+
+    assert retry_after >= 1
+    assert allowed_at(retry_after)
+    assert retry_after == 1 or not allowed_at(retry_after - 1)
+
+
+def test_reset_forgets_a_key():
+    limiter = SlidingWindowLimiter(1, window=100)
+    limiter.hit("alice", now=0)
+    limiter.reset("alice")
+    assert limiter.hit("alice", now=1) == (True, 0)
+
+
+def test_least_recently_used_keys_are_dropped_beyond_max_keys():
+    limiter = SlidingWindowLimiter(5, window=100, max_keys=2)
+    for key in ("a", "b", "a", "c"):
+        limiter.hit(key, now=0)
+    assert list(limiter._entries) == ["a", "c"]
+
+
+def test_sweep_drops_keys_idle_for_a_whole_window(monkeypatch):
+    monkeypatch.setattr(rate_limit, "SWEEP_EVERY", 3)
+    limiter = SlidingWindowLimiter(5, window=100)
+    limiter.hit("old", now=0)
+    limiter.hit("recent", now=150)
+    limiter.hit("new", now=250)   # third hit: sweeps everything before bucket 1
+    assert list(limiter._entries) == ["recent", "new"]
+
+
+@pytest.mark.parametrize("header, trusted, expected", [
+    ("203.0.113.7", 1, "203.0.113.7"),
+    ("1.1.1.1, 203.0.113.7", 1, "203.0.113.7"),        # left part is client-written
+    ("1.1.1.1, 203.0.113.7, 10.0.0.2", 2, "203.0.113.7"),
+    (" 203.0.113.7 ,, ", 1, "203.0.113.7"),
+    ("203.0.113.7", 2, None),                          # fewer hops than proxies
+    ("203.0.113.7", 0, None),                          # no proxy trusted
+    ("", 1, None),
+])
+def test_forwarded_client_trusts_only_proxy_hops(header, trusted, expected):
+    assert forwarded_client(header, trusted) == expected
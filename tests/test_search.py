@@ -0,0 +1,91 @@
+import pytest
+
+import db
+import migrations
+import search
+import writer
+
+
+def _write(name, sql, params, table):
+    return writer.execute(name, sql, params, invalidate=(table,)).result(writer.WRITE_TIMEOUT)
+
+
+def _add_project(title, description="", status="Ongoing", location="Pune"):
+    migrations.ensure("projects")
+    return _write(
+        "projects",
+        "INSERT INTO projects (tenant, title, description, status, location) VALUES (?, ?, ?, ?, ?)",
+        (db.TENANT, title, description, status, location), "projects"
+    )
+
+
+def _found(text, **kwargs):
+    return [row[0] for row in search.search_projects(text, **kwargs)]
+
+
+@pytest.mark.parametrize("text, expected", [
+    (None, None),
+    ("", None),
+    ("  ?! ", None),
+    ("water", '"water"*'),
+    ("clean water", '"clean" "water"*'),
+    ('water" OR title:*', '"water" "OR" "title"*'),
+    ("NEAR(a b) -c ^d", '"NEAR" "a" "b" "c" "d"*'),
+])
+def test_to_match_quotes_every_word(text, expected):
+    assert search.to_match(text) == expected
+
+
+@pytest.mark.parametrize("text", ['"', "a AND", "OR", "(x", "*", "title:", "NOT water", "a + b", "ünïcödé"])
+def test_fts_syntax_in_user_input_is_plain_text(tenant, text):
+    _add_project("Clean water for schools")
+    search.search_projects(text)
+
+
+def test_last_word_matches_as_a_prefix(tenant):
+    project = _add_project("Clean water for schools")
+    assert _found("clean wat") == [project]
+    assert _found("cle water") == []
+
+
+def test_triggers_keep_the_index_in_step_with_the_table(tenant):
+    project = _add_project("Rainwater harvesting", "Tanks for the village", location="Satara")
+    assert _found("harvesting") == [project]
+    assert _found("Satara") == [project]
+
+    _write("projects", "UPDATE projects SET title='Solar lamps' WHERE id=?", (project,), "projects")
+    assert _found("harvesting") == []
+    assert _found("solar") == [project]
+    assert _found("tanks") == [project]
+
+    _write("projects", "DELETE FROM projects WHERE id=?", (project,), "projects")
+    assert _found("solar") == []
+
+
+def test_results_are_limited_to_the_tenant_and_status(tenant, monkeypatch):
+    ongoing = _add_project("Library books", status="Ongoing")
+    done = _add_project("Library shelves", status="Completed")
+    monkeypatch.setattr(db, "TENANT", tenant + "_other")
+    _add_project("Library for another organization")
+    monkeypatch.setattr(db, "TENANT", tenant)
+
+    assert sorted(_found("library")) == sorted([ongoing, done])
+    assert _found("library", status="Completed") == [done]
+
+
+def test_title_matches_rank_above_description_matches(tenant):
+    in_description = _add_project("Health camp", "Vaccination drive in the district")
+    in_title = _add_project("Vaccination drive", "Health camp in the district")
+    assert _found("vaccination") == [in_title, in_description]
+
+
+def test_press_releases_are_searchable(tenant):
+    migrations.ensure("media")
+    release = _write(
+        "media",
+        "INSERT INTO press_releases (tenant, title, description, release_date) VALUES (?, ?, ?, ?)",
+        (db.TENANT, "Annual report", "Our year in numbers", "2024-01-01"), "press_releases"
+    )
+    rows = search.search_press_releases("numbers")
+    assert [r[0] for r in rows] == [release]
+    assert "**numbers**" in rows[0][2]
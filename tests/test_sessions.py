@@ -0,0 +1,223 @@
+import re
+import time
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import sessions
+
+SCOPE = "tests"
+
+
+def test_issued_token_validates_for_its_scope_only():
+    token, expires_at = sessions.issue(SCOPE, "alice", ttl=60)
+    assert sessions.validate(SCOPE, token) == ("alice", expires_at)
+    assert sessions.validate("other", token) is None
+
+
+@pytest.mark.parametrize("mangle", [
+    lambda t: t[:-1] + ("A" if t[-1] != "A" else "B"),   # signature changed
+    lambda t: "x" + t,                                     # session id changed
+    lambda t: t.partition(".")[0],                         # unsigned
+    lambda t: t.partition(".")[0] + ".déf",                # non-ASCII signature
+    lambda t: "abc.déf",
+    lambda t: "",
+    lambda t: None,
+])
+def test_forged_tokens_are_refused(mangle):
+    token, _ = sessions.issue(SCOPE, "alice", ttl=60)
+    assert sessions.validate(SCOPE, mangle(token)) is None
+
+
+def test_expired_token_is_refused_and_swept():
+    token, _ = sessions.issue(SCOPE, "alice", ttl=-1)
+    assert sessions.validate(SCOPE, token) is None
+    assert sessions.get_store().sweep(time.time()) >= 1
+    assert sessions.get_store().load(token.partition(".")[0]) is None
+
+
+def test_token_bound_to_a_client_is_refused_elsewhere():
+    bound, _ = sessions.issue(SCOPE, "alice", ttl=60, client="203.0.113.7")
+    assert sessions.validate(SCOPE, bound, "203.0.113.7")
+    assert sessions.validate(SCOPE, bound, "198.51.100.1") is None
+    assert sessions.validate(SCOPE, bound) is None
+
+    unbound, _ = sessions.issue(SCOPE, "alice", ttl=60)
+    assert sessions.validate(SCOPE, unbound, "198.51.100.1")
+
+
+def test_rotation_keeps_the_expiry_and_retires_the_old_token(monkeypatch):
+    old, expires_at = sessions.issue(SCOPE, "alice", ttl=3600, client="203.0.113.7")
+    new = sessions.rotate(SCOPE, old, "alice", expires_at, "203.0.113.7")
+
+    username, new_expiry = sessions.validate(SCOPE, new, "203.0.113.7")
+    assert username == "alice" and new_expiry == pytest.approx(expires_at, abs=1)
+    # The old one lasts the grace period, then no longer
+    assert sessions.validate(SCOPE, old, "203.0.113.7")
+    later = time.time() + sessions.ROTATE_GRACE + 1
+    monkeypatch.setattr(sessions.time, "time", lambda: later)
+    assert sessions.validate(SCOPE, old, "203.0.113.7") is None
+    assert sessions.validate(SCOPE, new, "203.0.113.7")
+
+
+def test_rotation_never_extends_a_session_ending_within_the_grace_period():
+    old, expires_at = sessions.issue(SCOPE, "alice", ttl=5)
+    sessions.rotate(SCOPE, old, "alice", expires_at)
+    assert sessions.get_store().load(old.partition(".")[0])[2] == pytest.approx(expires_at)
+
+
+def test_revoked_token_is_refused():
+    token, _ = sessions.issue(SCOPE, "alice", ttl=60)
+    sessions.revoke(token)
+    assert sessions.validate(SCOPE, token) is None
+    sessions.revoke(None)
+
+
+def test_revoking_one_token_ends_its_whole_login():
+    first, expires_at = sessions.issue(SCOPE, "alice", ttl=60)
+    rotated = sessions.rotate(SCOPE, first, "alice", expires_at)
+    branched = sessions.branch(SCOPE, rotated, "alice", expires_at)
+    other, _ = sessions.issue(SCOPE, "alice", ttl=60)
+
+    sessions.revoke(branched)
+    assert [sessions.validate(SCOPE, t) for t in (first, rotated, branched)] == [None] * 3
+    assert sessions.validate(SCOPE, other)
+
+
+def test_incomplete_store_fails_when_created():
+    class NoSweep(sessions.SessionStore):
+        def save(self, session_id, scope, username, expires_at, client=None, login=None):
+            pass
+
+        def load(self, session_id):
+            return None
+
+        def delete(self, session_id):
+            pass
+
+    with pytest.raises(TypeError, match="sweep"):
+        NoSweep()
+
+
+def test_stores_without_expire_end_the_session(monkeypatch):
+    class MemoryStore(sessions.SessionStore):
+        def __init__(self):
+            self.rows = {}
+
+        def save(self, session_id, scope, username, expires_at, client=None, login=None):
+            self.rows[session_id] = (scope, username, expires_at, client, login or session_id)
+
+        def load(self, session_id):
+            return self.rows.get(session_id)
+
+        def delete(self, session_id):
+            self.rows.pop(session_id, None)
+
+        def sweep(self, now):
+            return 0
+
+    monkeypatch.setattr(sessions, "_store", MemoryStore())
+    monkeypatch.setattr(sessions, "_secret", b"memory")
+    old, expires_at = sessions.issue(SCOPE, "alice", ttl=60)
+    new = sessions.rotate(SCOPE, old, "alice", expires_at)
+    assert sessions.validate(SCOPE, old) is None
+    assert sessions.validate(SCOPE, new)
+
+
+# ---------------- BROWSER HELPERS ----------------
+PAGE = f"""
+import streamlit as st
+import sessions
+
+user = sessions.restore({SCOPE!r})
+st.write(f"user={{user}}")
+if user and st.button("Log out"):
+    sessions.logout({SCOPE!r})
+"""
+
+
+@pytest.fixture
+def page(tmp_path, monkeypatch):
+    path = tmp_path / "page.py"
+    path.write_text(PAGE)
+    cookies = {}
+    monkeypatch.setattr(sessions, "_cookie", lambda scope: cookies.get(scope))
+    return AppTest.from_file(str(path)), cookies
+
+
+def _user(at):
+    return at.markdown[0].value
+
+
+def _written_cookie(at):
+    # Token of the last cookie the page wrote
+    bodies = [h.proto.body for h in at.get("html")]
+    return re.findall(rf"{sessions.COOKIE_PREFIX}{SCOPE}=([^;]*);", bodies[-1])[0]
+
+
+def test_restore_reads_the_cookie_and_rotates_it(page):
+    at, cookies = page
+    token, _ = sessions.issue(SCOPE, "alice", ttl=60)
+    cookies[SCOPE] = token
+    at.run()
+
+    assert _user(at) == "user=alice"
+    rotated = _written_cookie(at)
+    assert rotated != token and sessions.validate(SCOPE, rotated)
+    # The tab keeps a token of its own, not the cookie's
+    tab_token = at.session_state[f"session_{SCOPE}"][0]
+    assert tab_token not in (token, rotated) and sessions.validate(SCOPE, tab_token)
+
+
+def test_restore_never_reads_the_url(page):
+    at, _ = page
+    token, _ = sessions.issue(SCOPE, "alice", ttl=60)
+    at.query_params[sessions.LEGACY_QUERY_PARAM] = token
+    at.run()
+
+    assert _user(at) == "user=None"
+    assert sessions.LEGACY_QUERY_PARAM not in at.query_params
+
+
+def test_open_tab_notices_a_revoked_login_at_its_next_check(page, monkeypatch):
+    at, cookies = page
+    token, _ = sessions.issue(SCOPE, "alice", ttl=60)
+    cookies[SCOPE] = token
+    at.run()
+    sessions.revoke(token)          # e.g. logged out in another tab
+
+    at.run()
+    assert _user(at) == "user=alice"   # trusted until the next check
+    monkeypatch.setattr(sessions, "RECHECK_INTERVAL", 0)
+    at.run()
+    assert _user(at) == "user=None"
+
+
+def test_another_tab_rotating_the_cookie_keeps_this_tab_signed_in(page, tmp_path, monkeypatch):
+    at, cookies = page
+    token, _ = sessions.issue(SCOPE, "alice", ttl=60)
+    cookies[SCOPE] = token
+    monkeypatch.setattr(sessions, "ROTATE_GRACE", 0)
+    at.run()
+
+    cookies[SCOPE] = _written_cookie(at)
+    other = AppTest.from_file(str(tmp_path / "page.py"))
+    other.run()
+    assert _user(other) == "user=alice"
+
+    monkeypatch.setattr(sessions, "RECHECK_INTERVAL", 0)
+    at.run()
+    assert _user(at) == "user=alice"
+
+
+def test_logout_revokes_and_clears_the_cookie(page):
+    at, cookies = page
+    token, _ = sessions.issue(SCOPE, "alice", ttl=60)
+    cookies[SCOPE] = token
+    at.run()
+    rotated = at.session_state[f"session_{SCOPE}"][0]
+
+    at.button[0].click().run()
+    assert sessions.validate(SCOPE, token) is None
+    assert sessions.validate(SCOPE, rotated) is None
+    assert any("Max-Age=0" in h.proto.body for h in at.get("html"))
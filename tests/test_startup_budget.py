@@ -0,0 +1,17 @@
+import pytest
+
+import benchmark
+
+RUNS = 3        # fresh processes per app; the budget applies to the median
+TIMEOUT = 60
+
+
+@pytest.mark.parametrize("app", benchmark.APPS)
+def test_startup_within_budget(app):
+    cold = benchmark.cold_start(app, RUNS, TIMEOUT)
+
+    assert cold["errors"] == []
+    assert cold["cold_start_ms"] <= benchmark.COLD_START_BUDGET_MS
+    assert cold["first_paint_ms"] <= benchmark.FIRST_PAINT_BUDGET_MS
+    if benchmark.resource is not None:
+        assert cold["peak_rss_mb"] > 0
@@ -0,0 +1,66 @@
+import glob
+import io
+import os
+
+import pytest
+
+import db
+import images
+import storage
+
+PIL = pytest.importorskip("PIL.Image")
+
+
+def _png(color, size=(400, 200)):
+    buf = io.BytesIO()
+    PIL.new("RGB", size, color).save(buf, "PNG")
+    buf.seek(0)
+    return buf
+
+
+def _refs(path):
+    row = db.get_connection("storage").execute("SELECT refs FROM blobs WHERE path=?", (path,)).fetchone()
+    return row[0] if row else None
+
+
+def test_identical_uploads_share_one_file():
+    first = storage.store(_png("red"), "a.PNG")
+    second = storage.store(_png("red"), "other name.png")
+
+    assert first == second
+    assert first.endswith(".png") and os.path.exists(first)
+    assert _refs(first) == 2
+    assert not glob.glob(os.path.join(storage.BLOB_DIR, "*.part"))
+
+
+def test_different_content_gets_different_paths():
+    assert storage.store(_png("green"), "a.png") != storage.store(_png("blue"), "a.png")
+
+
+def test_last_release_deletes_the_file_and_its_variants():
+    path = storage.store(_png("yellow"), "a.png")
+    storage.store(_png("yellow"), "b.png")
+    variants = images.make_variants(path)
+    assert sorted(variants) == ["150", "300"]
+
+    assert storage.release(path) is False
+    assert os.path.exists(path) and _refs(path) == 1
+
+    assert storage.release(path) is True
+    assert _refs(path) is None
+    assert not any(os.path.exists(p) for p in [path, *variants.values()])
+
+
+def test_release_leaves_files_it_never_stored(tmp_path):
+    stray = tmp_path / "legacy.png"
+    stray.write_bytes(b"x")
+    assert storage.release(str(stray)) is False
+    assert stray.exists()
+
+
+def test_store_streams_from_the_start_of_the_file():
+    upload = _png("purple")
+    upload.read(10)
+    path = storage.store(upload, "a.png")
+    with open(path, "rb") as f:
+        assert f.read() == _png("purple").getvalue()
@@ -0,0 +1,75 @@
+import secrets
+import threading
+
+import pytest
+
+import user_store
+
+
+@pytest.fixture
+def username():
+    return f"user_{secrets.token_hex(4)}"
+
+
+@pytest.fixture
+def hashes(monkeypatch):
+    # Number of expensive hashes computed during the test
+    count = []
+    monkeypatch.setattr(user_store, "_hooks", [lambda event, seconds: event == "hash" and count.append(1)])
+    return count
+
+
+def test_hash_records_its_cost_and_checks_only_the_right_password():
+    stored = user_store.hash_password("s3cret")
+    scheme, n, r, p, salt, digest = stored.split("$")
+    assert (scheme, int(n), int(r), int(p)) == ("scrypt", user_store.SCRYPT_N, user_store.SCRYPT_R, user_store.SCRYPT_P)
+    assert stored != user_store.hash_password("s3cret")   # salted
+
+    assert user_store.check_password("s3cret", stored)
+    assert not user_store.check_password("s3cret ", stored)
+
+
+def test_hashes_made_at_an_older_cost_still_verify(monkeypatch):
+    monkeypatch.setattr(user_store, "SCRYPT_N", 2 ** 10)
+    stored = user_store.hash_password("s3cret")
+    monkeypatch.undo()
+    assert user_store.check_password("s3cret", stored)
+
+
+def test_usernames_are_unique(username):
+    assert user_store.create_user(username, "a")
+    assert not user_store.create_user(username, "b")
+    assert user_store.verify(username, "a")
+    assert not user_store.verify(username, "b")
+
+
+def test_unknown_user_costs_a_hash_too(hashes):
+    user_store._dummy_hash()
+    hashes.clear()
+    assert not user_store.verify("nobody_" + secrets.token_hex(4), "x")
+    assert len(hashes) == 1
+
+
+def test_repeat_logins_from_one_session_skip_the_hash(username, hashes):
+    user_store.create_user(username, "right")
+    hashes.clear()
+    assert user_store.verify(username, "right", "session-1")
+    assert user_store.verify(username, "right", "session-1")
+    assert len(hashes) == 1
+
+    # A wrong password, another session or a forgotten one hash again
+    assert not user_store.verify(username, "wrong", "session-1")
+    assert user_store.verify(username, "right", "session-2")
+    user_store.forget_session("session-1")
+    assert user_store.verify(username, "right", "session-1")
+    assert len(hashes) == 4
+
+
+def test_logins_beyond_the_pending_limit_are_turned_away(monkeypatch):
+    monkeypatch.setattr(user_store, "_slots", threading.BoundedSemaphore(1))
+    monkeypatch.setattr(user_store, "PENDING_WAIT", 0.01)
+    user_store._slots.acquire()
+    with pytest.raises(user_store.HashingBusy):
+        user_store.hash_password("x")
+    user_store._slots.release()
+    assert user_store.hash_password("x")
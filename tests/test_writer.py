@@ -0,0 +1,121 @@
+import threading
+
+import pytest
+
+import cache
+import db
+import migrations
+import writer
+
+
+def _insert(value):
+    def fn(conn):
+        return conn.execute(
+            "INSERT INTO core_values (tenant, value) VALUES (?, ?)", (db.TENANT, value)
+        ).lastrowid
+    return fn
+
+
+def _values():
+    return [r[0] for r in db.get_connection("about").execute(
+        "SELECT value FROM core_values WHERE tenant=? ORDER BY id", (db.TENANT,)
+    )]
+
+
+@pytest.fixture
+def blocked_writer():
+    # Holds the writer thread in a mutation until released, so everything
+    # submitted meanwhile is applied as one batch
+    migrations.ensure("about")
+    started, release = threading.Event(), threading.Event()
+
+    def hold(conn):
+        started.set()
+        release.wait(writer.WRITE_TIMEOUT)
+
+    first = writer.submit("about", hold)
+    assert started.wait(writer.WRITE_TIMEOUT)
+    yield release
+    release.set()
+    first.result(writer.WRITE_TIMEOUT)
+
+
+def test_wait_reports_a_pending_write_that_still_commits(tenant, blocked_writer):
+    future = writer.submit("about", _insert("late"))
+    assert writer.wait(future, timeout=0.05) == (False, None)
+
+    blocked_writer.set()
+    saved, row_id = writer.wait(future)
+    assert saved and row_id
+    assert _values() == ["late"]
+
+
+def test_wait_still_raises_a_failing_mutation(tenant):
+    def fail(conn):
+        raise ValueError("no")
+
+    with pytest.raises(ValueError, match="no"):
+        writer.wait(writer.submit("about", fail))
+
+
+def test_failing_mutation_only_rolls_back_itself(tenant, blocked_writer):
+    def half_then_fail(conn):
+        _insert("half")(conn)
+        raise ValueError("no")
+
+    commits = writer.metrics()["commits"]
+    futures = [
+        writer.submit("about", _insert("first")),
+        writer.submit("about", half_then_fail),
+        writer.submit("about", _insert("last")),
+    ]
+    blocked_writer.set()
+
+    assert futures[0].result(writer.WRITE_TIMEOUT)
+    with pytest.raises(ValueError, match="no"):
+        futures[1].result(writer.WRITE_TIMEOUT)
+    assert futures[2].result(writer.WRITE_TIMEOUT) > futures[0].result()
+    assert _values() == ["first", "last"]
+    # The blocked batch and the three queued behind it: two commits
+    assert writer.metrics()["commits"] == commits + 2
+
+
+def test_failed_mutations_do_not_invalidate_their_tables(tenant, blocked_writer):
+    cache.clear()
+    cache.read("ok_table", "q", (), lambda: 1)
+    cache.read("failed_table", "q", (), lambda: 1)
+
+    def fail(conn):
+        raise RuntimeError
+
+    ok = writer.submit("about", _insert("x"), invalidate=("ok_table",))
+    bad = writer.submit("about", fail, invalidate=("failed_table",))
+    blocked_writer.set()
+    ok.result(writer.WRITE_TIMEOUT)
+    with pytest.raises(RuntimeError):
+        bad.result(writer.WRITE_TIMEOUT)
+
+    assert "ok_table" not in cache._by_table
+    assert "failed_table" in cache._by_table
+
+
+def test_execute_returns_lastrowid_after_commit(tenant):
+    migrations.ensure("about")
+    row_id = writer.execute(
+        "about", "INSERT INTO core_values (tenant, value) VALUES (?, ?)", (tenant, "y")
+    ).result(writer.WRITE_TIMEOUT)
+
+    # Visible from another connection, so it was committed
+    assert db.get_connection("about").execute(
+        "SELECT value FROM core_values WHERE id=?", (row_id,)
+    ).fetchone()[0] == "y"
+
+
+def test_stop_applies_what_is_queued(tenant):
+    migrations.ensure("about")
+    futures = [writer.submit("about", _insert(str(i))) for i in range(50)]
+    writer.stop()
+    assert all(f.done() and f.exception() is None for f in futures)
+    assert _values() == [str(i) for i in range(50)]
+    # and the next submission starts a new writer thread
+    writer.submit("about", _insert("again")).result(writer.WRITE_TIMEOUT)
@@ -0,0 +1,188 @@
+import hashlib
+import hmac
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import db
+import migrations
+
+# ---------------- SETTINGS ----------------
+# scrypt cost: N (CPU/memory), r (block size), p (parallelism).
+# Memory per hash is about 128 * N * r bytes (16 MiB with the defaults).
+SCRYPT_N = int(os.environ.get("AUTH_SCRYPT_N", 2 ** 14))
+SCRYPT_R = int(os.environ.get("AUTH_SCRYPT_R", 8))
+SCRYPT_P = int(os.environ.get("AUTH_SCRYPT_P", 1))
+
+# At most HASH_WORKERS hashes run at once and at most MAX_PENDING logins may
+# wait for one, so a burst of logins cannot take over the server threads.
+HASH_WORKERS = int(os.environ.get("AUTH_HASH_WORKERS", 2))
+MAX_PENDING = int(os.environ.get("AUTH_MAX_PENDING", 16))
+PENDING_WAIT = 2.0  # seconds to wait for a free slot
+
+VERIFIED_TTL = 60  # seconds a verified login is remembered per session
+MAX_VERIFIED = 10000
+
+_pool = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="pwhash")
+_slots = threading.BoundedSemaphore(MAX_PENDING)
+_lock = threading.Lock()
+_verified = {}  # (session_key, username) -> (expires_at, password digest)
+_cache_key = secrets.token_bytes(32)
+
+_samples = {"hash": deque(maxlen=1000), "login": deque(maxlen=1000)}  # (finished_at, seconds)
+_hooks = []
+
+# Hash of a random password, used so unknown usernames cost the same
+# as known ones.
+_DUMMY_HASH = None
+
+
+class HashingBusy(Exception):
+    pass
+
+
+# ---------------- HASHING ----------------
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(
+        password.encode(), salt=salt, n=n, r=r, p=p,
+        maxmem=256 * n * r * p + 1024 * 1024, dklen=32
+    )
+
+
+def _run_hash(password, salt, n, r, p):
+    if not _slots.acquire(timeout=PENDING_WAIT):
+        raise HashingBusy("Too many logins in progress, please try again")
+    try:
+        start = time.perf_counter()
+        digest = _pool.submit(_scrypt, password, salt, n, r, p).result()
+        _report("hash", time.perf_counter() - start)
+        return digest
+    finally:
+        _slots.release()
+
+
+def hash_password(password):
+    salt = os.urandom(16)
+    digest = _run_hash(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${salt.hex()}${digest.hex()}"
+
+
+def check_password(password, stored):
+    # The cost is stored with each hash, so raising it later does not
+    # break existing accounts.
+    _, n, r, p, salt, digest = stored.split("$")
+    computed = _run_hash(password, bytes.fromhex(salt), int(n), int(r), int(p))
+    return hmac.compare_digest(computed, bytes.fromhex(digest))
+
+
+def _dummy_hash():
+    global _DUMMY_HASH
+    if _DUMMY_HASH is None:
+        _DUMMY_HASH = hash_password(secrets.token_hex(16))
+    return _DUMMY_HASH
+
+
+# ---------------- USERS ----------------
+def _conn():
+    migrations.ensure("users")
+    return db.get_connection("users")
+
+
+def create_user(username, password):
+    password_hash = hash_password(password)
+    conn = _conn()
+    try:
+        conn.execute(
+            "INSERT INTO users (username, password_hash) VALUES (?, ?)",
+            (username, password_hash)
+        )
+        conn.commit()
+    except sqlite3.IntegrityError:
+        conn.rollback()
+        return False
+    return True
+
+
+def user_exists(username):
+    row = _conn().execute("SELECT 1 FROM users WHERE username=?", (username,)).fetchone()
+    return row is not None
+
+
+def verify(username, password, session_key=None):
+    start = time.perf_counter()
+    key = (session_key, username)
+    cheap = hmac.new(_cache_key, password.encode(), hashlib.sha256).digest()
+
+    # Repeat logins from the same session skip the expensive hash
+    if session_key is not None:
+        with _lock:
+            entry = _verified.get(key)
+        if entry and entry[0] > time.monotonic() and hmac.compare_digest(entry[1], cheap):
+            _report("login", time.perf_counter() - start)
+            return True
+
+    row = _conn().execute(
+        "SELECT password_hash FROM users WHERE username=?", (username,)
+    ).fetchone()
+
+    if row is None:
+        check_password(password, _dummy_hash())
+        ok = False
+    else:
+        ok = check_password(password, row[0])
+
+    if ok and session_key is not None:
+        with _lock:
+            if len(_verified) >= MAX_VERIFIED:
+                _prune_verified()
+            if len(_verified) >= MAX_VERIFIED:
+                del _verified[next(iter(_verified))]
+            _verified[key] = (time.monotonic() + VERIFIED_TTL, cheap)
+
+    _report("login", time.perf_counter() - start)
+    return ok
+
+
+def forget_session(session_key):
+    with _lock:
+        for key in [k for k in _verified if k[0] == session_key]:
+            del _verified[key]
+
+
+def _prune_verified():
+    now = time.monotonic()
+    for key in [k for k, (expires, _) in _verified.items() if expires <= now]:
+        del _verified[key]
+
+
+# ---------------- METRICS ----------------
+def add_metrics_hook(hook):
+    # hook(event, seconds) is called for every "hash" and "login"
+    _hooks.append(hook)
+
+
+def _report(event, seconds):
+    with _lock:
+        _samples[event].append((time.monotonic(), seconds))
+    for hook in _hooks:
+        hook(event, seconds)
+
+
+def login_metrics():
+    with _lock:
+        logins = sorted(s for _, s in _samples["login"])
+        hashes = list(_samples["hash"])
+
+    metrics = {"p50_ms": 0.0, "p99_ms": 0.0, "hashes_per_sec": 0.0}
+    if logins:
+        metrics["p50_ms"] = logins[len(logins) // 2] * 1000
+        metrics["p99_ms"] = logins[min(len(logins) - 1, int(len(logins) * 0.99))] * 1000
+    if hashes:
+        window = time.monotonic() - hashes[0][0]
+        if window > 0:
+            metrics["hashes_per_sec"] = len(hashes) / window
+    return metrics
@@ -0,0 +1,179 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as WaitTimeout
+
+import cache
+import db
+
+# ---------------- SETTINGS ----------------
+# One background thread owns every admin write. Mutations queued close
+# together share one transaction (group commit), so the write lock is
+# taken once per batch instead of once per button press.
+MAX_BATCH = 200
+LINGER_MS = 2        # how long a batch waits for more mutations
+WRITE_TIMEOUT = 10   # seconds callers wait for their acknowledgement
+PENDING = ("Still saving: the database is busy. The change is queued and will appear "
+           "shortly, so please do not submit it again.")
+
+logger = logging.getLogger(__name__)
+
+_queue = queue.Queue()
+_lock = threading.Lock()
+_thread = None
+_counts = {"submitted": 0, "applied": 0, "failed": 0, "commits": 0}
+_samples = {"commit": deque(maxlen=1000), "wait": deque(maxlen=1000), "batch": deque(maxlen=1000)}
+
+
+# ---------------- SUBMIT ----------------
+def submit(name, fn, invalidate=()):
+    # Queue fn(conn) to run on the writer thread inside its own savepoint.
+    # fn must not commit. -> Future with fn's return value once committed;
+    # a failing fn only rolls back its own changes.
+    future = Future()
+    with _lock:
+        _counts["submitted"] += 1
+    _start()
+    _queue.put((name, fn, tuple(invalidate), future, time.perf_counter()))
+    return future
+
+
+def execute(name, sql, params=(), invalidate=()):
+    # One statement -> Future with its lastrowid
+    return submit(name, lambda conn: conn.execute(sql, params).lastrowid, invalidate)
+
+
+def wait(future, timeout=None):
+    # -> (True, result) once committed, or (False, None) if the mutation
+    # is still queued after timeout. It commits later all the same, so
+    # pages show PENDING instead of a traceback the admin would answer
+    # by submitting the change twice. A failing mutation still raises.
+    try:
+        return True, future.result(WRITE_TIMEOUT if timeout is None else timeout)
+    except WaitTimeout:
+        return False, None
+
+
+def _start():
+    global _thread
+    if _thread is not None:
+        return
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_run, name="db-writer", daemon=True)
+            _thread.start()
+
+
+def stop(timeout=WRITE_TIMEOUT):
+    # Apply what is queued, then end the writer thread
+    global _thread
+    thread = _thread
+    if thread is None:
+        return
+    _queue.put(None)
+    thread.join(timeout)
+    with _lock:
+        _thread = None
+
+
+atexit.register(stop)
+
+
+# ---------------- WRITER THREAD ----------------
+def _next_batch():
+    batch = [_queue.get()]
+    deadline = time.monotonic() + LINGER_MS / 1000
+    while batch[-1] is not None and len(batch) < MAX_BATCH:
+        try:
+            batch.append(_queue.get(timeout=max(deadline - time.monotonic(), 0)))
+        except queue.Empty:
+            break
+    return batch
+
+
+def _run():
+    while True:
+        batch = _next_batch()
+        done = batch[-1] is None
+        if done:
+            batch.pop()
+
+        # Names that share a database file share its transaction
+        by_file = {}
+        for item in batch:
+            by_file.setdefault(db.DATABASES[item[0]], []).append(item)
+        for items in by_file.values():
+            _apply(items)
+
+        if done:
+            return
+
+
+def _apply(items):
+    conn = db.get_connection(items[0][0])
+    start = time.perf_counter()
+    results = []
+    committed = False
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        for name, fn, invalidate, future, _ in items:
+            conn.execute("SAVEPOINT mutation")
+            try:
+                results.append((fn(conn), None))
+            except Exception as e:
+                conn.execute("ROLLBACK TO mutation")
+                results.append((None, e))
+            conn.execute("RELEASE mutation")
+        conn.commit()
+        committed = True
+    except Exception as e:
+        logger.exception("write batch of %d failed", len(items))
+        if conn.in_transaction:
+            conn.rollback()
+        results = [(None, e)] * len(items)
+
+    finished = time.perf_counter()
+    tables = {t for item, (_, error) in zip(items, results) if error is None for t in item[2]}
+    if tables:
+        cache.invalidate(*tables)
+
+    with _lock:
+        if committed:
+            _counts["commits"] += 1
+            _samples["commit"].append(finished - start)
+            _samples["batch"].append(len(items))
+        for (_, _, _, _, queued_at), (_, error) in zip(items, results):
+            _counts["failed" if error else "applied"] += 1
+            _samples["wait"].append(finished - queued_at)
+
+    for (_, _, _, future, _), (value, error) in zip(items, results):
+        if error is None:
+            future.set_result(value)
+        else:
+            future.set_exception(error)
+
+
+# ---------------- METRICS ----------------
+def _percentile(values, pct):
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] * 1000 if values else 0.0
+
+
+def metrics():
+    with _lock:
+        counts = dict(_counts)
+        commits = sorted(_samples["commit"])
+        waits = sorted(_samples["wait"])
+        batches = list(_samples["batch"])
+
+    return {
+        "queue_depth": _queue.qsize(),
+        **counts,
+        "avg_batch": sum(batches) / len(batches) if batches else 0.0,
+        "commit_p50_ms": _percentile(commits, 50),
+        "commit_p99_ms": _percentile(commits, 99),
+        "ack_p50_ms": _percentile(waits, 50),
+        "ack_p99_ms": _percentile(waits, 99),
+    }